@@ -0,0 +1,129 @@
+"""
+Cache endereçado por conteúdo das saídas das etapas de análise (SpotBugs,
+RefactoringMiner e CK).
+
+A chave de cada entrada é o SHA-256 de um JSON com o nome da etapa, os commits
+analisados, a versão da ferramenta (hash do executável/jar) e as flags usadas.
+Se nada disso mudou, a saída guardada é restaurada e a etapa não roda de novo.
+A chave não inclui a tag nem os caminhos de saída: duas tags no mesmo commit
+compartilham a entrada, e cada uma restaura as saídas nos próprios caminhos.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+
+CACHE_DIR = '.artifact-cache'
+
+# Formato do meta.json; entradas de outro formato contam como ausentes e são regravadas
+CACHE_FORMAT = 2
+
+
+@lru_cache(maxsize=None)
+def tool_fingerprint(tool):
+    """
+    Identifica a versão de uma ferramenta pelo hash do arquivo (jar ou executável
+    encontrado no PATH). Se não for possível localizar o arquivo, usa o próprio nome.
+    """
+    path = tool if os.path.isfile(tool) else shutil.which(tool)
+    if not path:
+        return tool
+    digest = hashlib.sha256()
+    with open(os.path.realpath(path), 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Guarda cópias das saídas de cada etapa em "<root>/<key[:2]>/<key>/", uma por
+    índice ("0", "1", ...). O "meta.json" lista em "blobs" o índice e o tipo
+    (arquivo ou pasta) de cada saída, na ordem em que foram guardadas.
+    """
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(stage, **parts):
+        payload = json.dumps({'stage': stage, **parts}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _meta(self, key):
+        """meta.json da entrada, ou None se ela não existe ou é de outro formato."""
+        try:
+            with open(os.path.join(self._entry(key), 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta if meta.get('format') == CACHE_FORMAT else None
+
+    def has(self, key):
+        return self._meta(key) is not None
+
+    def restore(self, key, outputs):
+        """
+        Copia as saídas guardadas para os caminhos em outputs (na ordem em que
+        foram guardadas), substituindo o que já existir neles.
+        Retorna False se a chave não estiver no cache ou se o número de saídas
+        pedidas for diferente do guardado.
+        """
+        meta = self._meta(key)
+        if meta is None or len(meta['blobs']) != len(outputs):
+            return False
+        entry = self._entry(key)
+        for blob, dest in zip(meta['blobs'], outputs):
+            src = os.path.join(entry, blob['blob'])
+            parent = os.path.dirname(dest)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            if os.path.isdir(dest) and not os.path.islink(dest):
+                shutil.rmtree(dest)
+            elif os.path.lexists(dest):
+                os.remove(dest)
+            if blob['kind'] == 'dir':
+                shutil.copytree(src, dest)
+            else:
+                shutil.copy2(src, dest)
+        return True
+
+    def store(self, key, outputs, **meta):
+        """
+        Copia as saídas (arquivos ou pastas) para o cache. A entrada só aparece
+        depois de completa, então uma execução interrompida não deixa lixo válido.
+        """
+        entry = self._entry(key)
+        if self.has(key):
+            return
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.root, prefix='tmp-')
+        try:
+            blobs = []
+            for i, src in enumerate(outputs):
+                dest = os.path.join(tmp, str(i))
+                if os.path.isdir(src):
+                    shutil.copytree(src, dest)
+                    kind = 'dir'
+                else:
+                    shutil.copy2(src, dest)
+                    kind = 'file'
+                # "source" é só informativo: restore grava nos caminhos de quem pede
+                blobs.append({'blob': str(i), 'kind': kind, 'source': src})
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'format': CACHE_FORMAT, 'blobs': blobs, 'created': time.time(), **meta}, f, indent=2)
+            if os.path.isdir(entry):
+                # entrada de um formato anterior
+                shutil.rmtree(entry)
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not self.has(key):
+                raise
@@ -0,0 +1,213 @@
+"""
+Geradores de entradas sintéticas para os benchmarks.
+
+Produzem, para N releases, os mesmos formatos que main.py coleta do traccar:
+  spotbugs/spotbugs_<v>.xml                       -- BugCollection com BugInstance completos
+  refactoring-miner/refactoring_v<a>_to_v<b>.json -- {"commits": [{"sha1", "refactorings": [...]}]}
+  ck_metrics_output/v<v>/ck_metrics.csv<g>.csv    -- class, method, variable e field
+
+A escala 1 tem o tamanho aproximado de uma release do traccar (~1000 classes,
+~1200 bugs, ~4000 métodos, ~200 refatorações por intervalo); a escala multiplica
+classes e commits. A mesma seed gera sempre os mesmos arquivos.
+
+Uso:
+    python generate.py /tmp/bench --scale 10 --releases 3
+"""
+import argparse
+import json
+import os
+import random
+from xml.sax.saxutils import quoteattr
+
+CLASSES_PER_SCALE = 1000
+COMMITS_PER_SCALE = 100
+
+BUG_TYPES = [
+    ('EI_EXPOSE_REP2', 'MALICIOUS_CODE'), ('EI_EXPOSE_REP', 'MALICIOUS_CODE'),
+    ('RV_RETURN_VALUE_IGNORED_NO_SIDE_EFFECT', 'STYLE'), ('DLS_DEAD_LOCAL_STORE', 'STYLE'),
+    ('NP_NULL_ON_SOME_PATH', 'CORRECTNESS'), ('BSHIFT_WRONG_ADD_PRIORITY', 'CORRECTNESS'),
+    ('DM_DEFAULT_ENCODING', 'I18N'), ('PREDICTABLE_RANDOM', 'SECURITY'),
+    ('SE_BAD_FIELD', 'BAD_PRACTICE'), ('URF_UNREAD_FIELD', 'PERFORMANCE'),
+]
+REFACTORING_TYPES = [
+    'Rename Method', 'Extract Method', 'Change Variable Type', 'Rename Variable',
+    'Move Class', 'Change Return Type', 'Add Parameter', 'Extract Variable',
+]
+PACKAGES = ['protocol', 'model', 'database', 'handler', 'helper', 'api', 'notification', 'storage']
+
+CK_CLASS_HEADER = (
+    'file,class,type,cbo,cboModified,fanin,fanout,wmc,dit,noc,rfc,lcom,lcom*,tcc,lcc,totalMethodsQty,'
+    'staticMethodsQty,publicMethodsQty,privateMethodsQty,protectedMethodsQty,defaultMethodsQty,'
+    'visibleMethodsQty,abstractMethodsQty,finalMethodsQty,synchronizedMethodsQty,totalFieldsQty,'
+    'staticFieldsQty,publicFieldsQty,privateFieldsQty,protectedFieldsQty,defaultFieldsQty,finalFieldsQty,'
+    'synchronizedFieldsQty,nosi,loc,returnQty,loopQty,comparisonsQty,tryCatchQty,parenthesizedExpsQty,'
+    'stringLiteralsQty,numbersQty,assignmentsQty,mathOperationsQty,variablesQty,maxNestedBlocksQty,'
+    'anonymousClassesQty,innerClasses'
+)
+CK_METHOD_HEADER = (
+    'file,class,method,constructor,line,cbo,cboModified,fanin,fanout,wmc,rfc,loc,returnsQty,variablesQty,'
+    'parametersQty,methodsInvokedQty,methodsInvokedLocalQty,methodsInvokedIndirectLocalQty,loopQty,'
+    'comparisonsQty,tryCatchQty,parenthesizedExpsQty,stringLiteralsQty,numbersQty,assignmentsQty,'
+    'mathOperationsQty,maxNestedBlocksQty,anonymousClassesQty,innerClassesQty,lambdasQty,uniqueWordsQty,'
+    'modifiers,logStatementsQty,hasJavaDoc'
+)
+
+
+def release_names(n):
+    return [f'1.{i}' for i in range(n)]
+
+
+def class_names(n, rng):
+    return [f'org.bench.{rng.choice(PACKAGES)}.Class{i}' for i in range(n)]
+
+
+def _source(cls):
+    return cls.replace('.', '/') + '.java'
+
+
+def write_spotbugs_xml(path, classes, rng, bugs_per_class=1.2):
+    """BugCollection com ~bugs_per_class BugInstance por classe. Retorna o nº de bugs."""
+    n_bugs = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n\n'
+                '<BugCollection version="4.9.3" sequence="0" timestamp="0" analysisTimestamp="0" release="">\n'
+                '  <Project projectName="">\n    <Jar>bench/target/bench.jar</Jar>\n  </Project>\n')
+        for cls in classes:
+            count = int(bugs_per_class) + (rng.random() < bugs_per_class % 1)
+            if rng.random() < 0.1:
+                cls = f'{cls}$Inner'
+            src = _source(cls.split('$')[0])
+            sourcefile = src.rsplit('/', 1)[-1]
+            for _ in range(count):
+                bug_type, category = rng.choice(BUG_TYPES)
+                start = rng.randint(20, 400)
+                line = (f'classname={quoteattr(cls)} start="{start}" end="{start + rng.randint(0, 60)}" '
+                        f'sourcefile="{sourcefile}" sourcepath="{src}"')
+                f.write(
+                    f'  <BugInstance type="{bug_type}" priority="{rng.randint(1, 3)}" rank="{rng.randint(1, 20)}" '
+                    f'abbrev="{bug_type[:3]}" category="{category}">\n'
+                    f'    <Class classname={quoteattr(cls)}>\n      <SourceLine {line} />\n    </Class>\n'
+                    f'    <Method classname={quoteattr(cls)} name="method{rng.randint(0, 20)}" '
+                    f'signature="(Ljava/lang/String;)V" isStatic="false">\n      <SourceLine {line} />\n    </Method>\n'
+                    f'    <SourceLine {line} />\n  </BugInstance>\n'
+                )
+                n_bugs += 1
+        f.write(f'  <Errors errors="0" missingClasses="0"></Errors>\n'
+                f'  <FindBugsSummary total_classes="{len(classes)}" total_bugs="{n_bugs}"></FindBugsSummary>\n'
+                '  <ClassFeatures></ClassFeatures>\n  <History></History>\n</BugCollection>\n')
+    return n_bugs
+
+
+def write_refactoring_json(path, classes, rng, n_commits, refs_per_commit=2.0):
+    """JSON do RefactoringMiner com n_commits commits. Retorna o nº de refatorações."""
+    n_refs = 0
+    commits = []
+    for _ in range(n_commits):
+        refs = []
+        for _ in range(rng.randint(0, int(2 * refs_per_commit))):
+            cls = rng.choice(classes)
+            rtype = rng.choice(REFACTORING_TYPES)
+            start = rng.randint(20, 400)
+
+            def location(description):
+                return {
+                    'filePath': f'src/main/java/{_source(cls)}', 'startLine': start,
+                    'endLine': start + 10, 'startColumn': 5, 'endColumn': 6,
+                    'codeElementType': 'METHOD_DECLARATION', 'description': description,
+                    'codeElement': 'private method(data byte[]) : int',
+                }
+
+            refs.append({
+                'type': rtype,
+                'description': f'{rtype} private method(data byte[]) : int in class {cls}',
+                'leftSideLocations': [location('original declaration')],
+                'rightSideLocations': [location('refactored declaration')],
+            })
+        n_refs += len(refs)
+        sha = '%040x' % rng.getrandbits(160)
+        commits.append({
+            'repository': 'https://example.org/bench.git', 'sha1': sha,
+            'url': f'https://example.org/bench/commit/{sha}', 'refactorings': refs,
+        })
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'commits': commits}, f, indent=1)
+    return n_refs
+
+
+def write_ck_csvs(release_dir, classes, rng, methods_per_class=3, vars_per_method=3, fields_per_class=2.5):
+    """CSVs do CK (class, method, variable, field). Retorna o nº total de linhas."""
+    os.makedirs(release_dir, exist_ok=True)
+    prefix = os.path.join(release_dir, 'ck_metrics.csv')
+    n_class_cols = CK_CLASS_HEADER.count(',') - 2
+    n_method_cols = CK_METHOD_HEADER.count(',') - 7
+    rows = 0
+    with open(prefix + 'class.csv', 'w', encoding='utf-8') as fc, \
+            open(prefix + 'method.csv', 'w', encoding='utf-8') as fm, \
+            open(prefix + 'variable.csv', 'w', encoding='utf-8') as fv, \
+            open(prefix + 'field.csv', 'w', encoding='utf-8') as ff:
+        fc.write(CK_CLASS_HEADER + '\n')
+        fm.write(CK_METHOD_HEADER + '\n')
+        fv.write('file,class,method,variable,usage\n')
+        ff.write('file,class,method,variable,usage\n')
+        for cls in classes:
+            file_path = f'/bench/src/main/java/{_source(cls)}'
+            values = ','.join(str(rng.randint(0, 60)) for _ in range(n_class_cols))
+            fc.write(f'{file_path},{cls},class,{values}\n')
+            rows += 1
+            for m in range(rng.randint(1, 2 * methods_per_class - 1)):
+                method = f'method{m}/1[java.lang.String]'
+                values = ','.join(str(rng.randint(0, 40)) for _ in range(n_method_cols))
+                fm.write(f'{file_path},{cls},"{method}",false,{rng.randint(10, 500)},{values},public,0,false\n')
+                rows += 1
+                for v in range(rng.randint(0, 2 * vars_per_method)):
+                    fv.write(f'{file_path},{cls},"{method}",var{v},{rng.randint(1, 5)}\n')
+                    rows += 1
+            for fld in range(rng.randint(0, int(2 * fields_per_class))):
+                ff.write(f'{file_path},{cls},"method0/1[java.lang.String]",field{fld},{rng.randint(1, 5)}\n')
+                rows += 1
+    return rows
+
+
+def generate_workspace(root, scale=1, releases=3, seed=0):
+    """
+    Gera as entradas de todas as releases em root. Retorna um dict com as
+    contagens geradas (bugs, refactorings, ck_rows, ck_class_rows) e as releases.
+    """
+    rng = random.Random(seed)
+    n_classes = max(1, int(CLASSES_PER_SCALE * scale))
+    n_commits = max(1, int(COMMITS_PER_SCALE * scale))
+    classes = class_names(n_classes, rng)
+    names = release_names(releases)
+
+    for d in ('spotbugs', 'refactoring-miner', 'ck_metrics_output'):
+        os.makedirs(os.path.join(root, d), exist_ok=True)
+
+    counts = {'bugs': 0, 'refactorings': 0, 'ck_rows': 0, 'ck_class_rows': 0}
+    for i, v in enumerate(names):
+        # cada release troca ~5% das classes, como numa release real
+        if i:
+            for j in rng.sample(range(n_classes), max(1, n_classes // 20)):
+                classes[j] = f'org.bench.{rng.choice(PACKAGES)}.Class{n_classes * (i + 1) + j}'
+            counts['refactorings'] += write_refactoring_json(
+                os.path.join(root, 'refactoring-miner', f'refactoring_v{names[i - 1]}_to_v{v}.json'),
+                classes, rng, n_commits)
+        counts['bugs'] += write_spotbugs_xml(os.path.join(root, 'spotbugs', f'spotbugs_{v}.xml'), classes, rng)
+        counts['ck_rows'] += write_ck_csvs(os.path.join(root, 'ck_metrics_output', f'v{v}'), classes, rng)
+        counts['ck_class_rows'] += len(classes)
+    counts['releases'] = names
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera entradas sintéticas de SpotBugs, RefactoringMiner e CK.')
+    parser.add_argument('root', help='pasta de destino')
+    parser.add_argument('--scale', type=float, default=1, help='multiplicador do tamanho (1 ~ traccar)')
+    parser.add_argument('--releases', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    counts = generate_workspace(args.root, args.scale, args.releases, args.seed)
+    print(json.dumps(counts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Benchmarks dos scripts de normalização/análise sobre entradas sintéticas.
+
+Para cada escala, gera um workspace com as entradas (generate.py), copia os
+scripts de scripts/ para ele (eles usam caminhos "../") e roda cada script em um
+processo filho. De cada execução mede tempo de parede, pico de RSS do processo
+(os.wait4; processos netos, como o pool de gráficos, não entram) e vazão em MB/s
+e itens/s. Os resultados são acrescentados a benchmarks/results.jsonl e comparados
+com a mediana das execuções anteriores na mesma máquina, escala e nº de releases:
+passar do limite (--threshold) marca regressão.
+
+Uso:
+    python benchmarks/run.py --scale 10 100
+    python benchmarks/run.py --scale 10 --scripts normalize_outputs analyze_heavy --fail-on-regression
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from generate import generate_workspace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS_SRC = os.path.join(ROOT_DIR, 'scripts')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results.jsonl')
+
+# execuções anteriores usadas como linha de base
+BASELINE_RUNS = 5
+
+
+def _dir_size(*paths):
+    total = 0
+    for path in paths:
+        if os.path.isfile(path):
+            total += os.path.getsize(path)
+            continue
+        for dirpath, _, files in os.walk(path):
+            total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+    return total
+
+
+def benchmarks(ws, counts):
+    """
+    (nome, comandos, entradas, itens) de cada script. Os comandos rodam em
+    ws/scripts, na ordem, e os de normalização geram as entradas de analyze_heavy.
+    """
+    releases = counts['releases']
+    py = sys.executable
+    ck_class_csvs = [os.path.join(ws, 'ck_metrics_output', f'v{v}', 'ck_metrics.csvclass.csv') for v in releases]
+    return [
+        ('normalize_outputs',
+         [[py, 'normalize_outputs.py', '--version', v] for v in releases],
+         [os.path.join(ws, 'spotbugs'), os.path.join(ws, 'refactoring-miner')],
+         counts['bugs'] + counts['refactorings']),
+        ('normalize_refactoring',
+         [[py, 'normalize_refactoring.py']],
+         [os.path.join(ws, 'refactoring-miner')],
+         counts['refactorings']),
+        ('analyze_spotbugs_data',
+         [[py, 'analyze_spotbugs_data.py']],
+         [os.path.join(ws, 'spotbugs')],
+         counts['bugs']),
+        ('analyze_heavy',
+         [[py, 'analyze_heavy.py', '--ref-dir', os.path.join(ws, 'normalized_refactoring'),
+           '--sb-dir', os.path.join(ws, 'normalized_spotbugs_output')]],
+         [os.path.join(ws, 'normalized_refactoring'), os.path.join(ws, 'normalized_spotbugs_output')],
+         counts['bugs'] + counts['refactorings']),
+        ('extract-metrics-ck',
+         [[py, 'extract-metrics-ck.py', '--force']],
+         ck_class_csvs,
+         counts['ck_class_rows']),
+    ]
+
+
+def collect_normalized(ws):
+    """Move as saídas dos scripts de normalização para as pastas que analyze_heavy lê."""
+    scripts = os.path.join(ws, 'scripts')
+    for src_dir, prefix, dest in ((scripts, 'normalized_spotbugs_', 'normalized_spotbugs_output'),
+                                  (ws, 'refactoring_v', 'normalized_refactoring')):
+        os.makedirs(os.path.join(ws, dest), exist_ok=True)
+        for fname in os.listdir(src_dir):
+            if fname.startswith(prefix) and fname.endswith('.csv'):
+                os.replace(os.path.join(src_dir, fname), os.path.join(ws, dest, fname))
+
+
+def _maxrss_mb(rusage):
+    # Linux informa KB; macOS, bytes
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def measure(cmds, cwd, log):
+    """Roda os comandos em sequência. Retorna (segundos, pico de RSS em MB, código de saída)."""
+    wall = 0.0
+    peak = 0.0
+    for cmd in cmds:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        _, status, rusage = os.wait4(proc.pid, 0)
+        wall += time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        peak = max(peak, _maxrss_mb(rusage))
+        if proc.returncode != 0:
+            return wall, peak, proc.returncode
+    return wall, peak, 0
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline(history, record):
+    """Mediana de tempo e RSS das últimas execuções bem-sucedidas comparáveis."""
+    same = [
+        r for r in history
+        if r['status'] == 0 and r['script'] == record['script'] and r['scale'] == record['scale']
+        and r['releases'] == record['releases'] and r['host'] == record['host']
+    ][-BASELINE_RUNS:]
+    if not same:
+        return None
+    return {
+        'wall_s': statistics.median(r['wall_s'] for r in same),
+        'max_rss_mb': statistics.median(r['max_rss_mb'] for r in same),
+        'runs': len(same),
+    }
+
+
+def check_regression(record, base, threshold):
+    flags = []
+    if base is None or record['status'] != 0:
+        return flags
+    for key in ('wall_s', 'max_rss_mb'):
+        if base[key] and record[key] > base[key] * (1 + threshold):
+            flags.append(f'{key} {record[key]:.2f} vs {base[key]:.2f}')
+    return flags
+
+
+def run_scale(scale, args, history):
+    workdir = tempfile.mkdtemp(prefix=f'bench-x{scale:g}-', dir=args.workdir)
+    try:
+        print(f'\n== Escala {scale:g} ({args.releases} releases) em {workdir}')
+        start = time.perf_counter()
+        counts = generate_workspace(workdir, scale, args.releases, args.seed)
+        print(f'   entradas geradas em {time.perf_counter() - start:.1f}s: '
+              f'{counts["bugs"]} bugs, {counts["refactorings"]} refatorações, {counts["ck_rows"]} linhas CK')
+        shutil.copytree(SCRIPTS_SRC, os.path.join(workdir, 'scripts'),
+                        ignore=shutil.ignore_patterns('__pycache__', '*.png', '*.csv', '*.json'))
+        os.makedirs(os.path.join(workdir, 'tabelas-graficos'), exist_ok=True)
+
+        records = []
+        with open(os.path.join(workdir, 'bench.log'), 'w', encoding='utf-8') as log:
+            for name, cmds, inputs, items in benchmarks(workdir, counts):
+                if name == 'analyze_heavy':
+                    collect_normalized(workdir)
+                if args.scripts and name not in args.scripts:
+                    if name.startswith('normalize_') and 'analyze_heavy' in args.scripts:
+                        # gera as entradas de analyze_heavy sem medir
+                        measure(cmds, os.path.join(workdir, 'scripts'), log)
+                    continue
+                input_mb = _dir_size(*inputs) / (1024 * 1024)
+                log.write(f'### {name}\n')
+                log.flush()
+                wall, rss, status = measure(cmds, os.path.join(workdir, 'scripts'), log)
+                record = {
+                    'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                    'commit': git_commit(),
+                    'host': platform.node(),
+                    'python': platform.python_version(),
+                    'scale': scale,
+                    'releases': args.releases,
+                    'script': name,
+                    'status': status,
+                    'wall_s': round(wall, 3),
+                    'max_rss_mb': round(rss, 1),
+                    'input_mb': round(input_mb, 2),
+                    'mb_per_s': round(input_mb / wall, 2) if wall else None,
+                    'items': items,
+                    'items_per_s': round(items / wall, 1) if wall else None,
+                }
+                record['regressions'] = check_regression(record, baseline(history, record), args.threshold)
+                records.append(record)
+        if any(r['status'] for r in records):
+            print(f'   (houve falhas; saída dos scripts em {os.path.join(workdir, "bench.log")})')
+            args.keep = True
+        return records
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_table(records):
+    header = f'{"script":<24}{"escala":>8}{"tempo (s)":>11}{"RSS (MB)":>10}{"MB/s":>9}{"itens/s":>11}  status'
+    print('\n' + header + '\n' + '-' * len(header))
+    for r in records:
+        if r['status']:
+            status = f'FALHOU ({r["status"]})'
+        elif r['regressions']:
+            status = 'REGRESSÃO: ' + '; '.join(r['regressions'])
+        else:
+            status = 'ok'
+        print(f'{r["script"]:<24}{r["scale"]:>8g}{r["wall_s"]:>11.2f}{r["max_rss_mb"]:>10.1f}'
+              f'{r["mb_per_s"] or 0:>9.2f}{r["items_per_s"] or 0:>11.0f}  {status}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks dos scripts de análise com entradas sintéticas.')
+    parser.add_argument('--scale', type=float, nargs='+', default=[10],
+                        help='escalas a medir (1 ~ tamanho do traccar)')
+    parser.add_argument('--releases', type=int, default=3, help='releases sintéticas por escala')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scripts', nargs='+', help='roda só estes benchmarks')
+    parser.add_argument('--results', default=RESULTS_PATH, help='arquivo JSON lines com o histórico')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='aumento relativo de tempo/RSS sobre a linha de base considerado regressão')
+    parser.add_argument('--workdir', help='pasta dos workspaces temporários (padrão: a do sistema)')
+    parser.add_argument('--keep', action='store_true', help='mantém os workspaces gerados')
+    parser.add_argument('--fail-on-regression', action='store_true', help='sai com código 1 se houver regressão')
+    args = parser.parse_args()
+
+    history = load_results(args.results)
+    records = []
+    for scale in args.scale:
+        records.extend(run_scale(scale, args, history))
+
+    with open(args.results, 'a', encoding='utf-8') as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + '\n')
+    print_table(records)
+    print(f'\nResultados acrescentados a {args.results}')
+
+    failed = any(r['status'] for r in records)
+    regressed = any(r['regressions'] for r in records)
+    if failed or (regressed and args.fail_on_regression):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+import subprocess
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def repo_with_shared_commit(tmp_path, monkeypatch):
+    """Repositório com as tags v1.2-rc1 e v1.2 no mesmo commit, cwd no tmp_path."""
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    git = ['git', '-c', 'user.name=t', '-c', 'user.email=t@t', '-C', str(repo)]
+    subprocess.run(['git', 'init', '-q', str(repo)], check=True)
+    subprocess.run(git + ['commit', '-q', '--allow-empty', '-m', 'release'], check=True)
+    subprocess.run(git + ['tag', 'v1.2-rc1'], check=True)
+    subprocess.run(git + ['tag', 'v1.2'], check=True)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, 'LOCAL_REPO_PATH', str(repo))
+    monkeypatch.setattr(main, 'SPOTBUGS_INCREMENTAL', False)
+    main.resolve_commit.cache_clear()
+    yield
+    main.resolve_commit.cache_clear()
@@ -0,0 +1,201 @@
+"""
+SpotBugs incremental entre tags.
+
+Em vez de analisar o jar inteiro a cada release, descobre pelo git diff entre a
+tag anterior e a atual quais arquivos .java mudaram sob a raiz dos fontes
+(source_root, --java-source-root no main.py), soma as classes que os referenciam
+(dependentes) e roda o SpotBugs só nelas ("-onlyAnalyze"). Os bugs das classes
+intocadas são copiados do spotbugs_<v>.xml da tag anterior e o resultado é um
+relatório completo, no mesmo formato do SpotBugs.
+
+Observação: o <FindBugsSummary> do relatório mesclado vem da execução parcial;
+só as contagens de bugs (total_bugs/bugs e priority_N do resumo e dos
+<PackageStats>/<ClassStats> que ele lista) são recalculadas.
+"""
+import os
+import subprocess
+import xml.etree.ElementTree as ET
+import zipfile
+from xml.sax.saxutils import quoteattr
+
+SOURCE_ROOT = 'src/main/java/'
+
+
+def class_from_source(path, source_root=SOURCE_ROOT):
+    """"src/main/java/org/traccar/Foo.java" -> "org.traccar.Foo"."""
+    if path.startswith(source_root):
+        path = path[len(source_root):]
+    if path.endswith('.java'):
+        path = path[:-5]
+    return path.replace('/', '.')
+
+
+def outer_class(classname):
+    return classname.split('$', 1)[0]
+
+
+def has_source_root(repo_path, tag, source_root=SOURCE_ROOT):
+    """Se a pasta source_root existe em tag (sem ela o diff e o grep saem vazios)."""
+    result = subprocess.run(
+        ['git', 'cat-file', '-e', f'{tag}:{source_root.rstrip("/")}'],
+        cwd=repo_path, capture_output=True
+    )
+    return result.returncode == 0
+
+
+def changed_classes(repo_path, prev_tag, tag, source_root=SOURCE_ROOT):
+    """
+    Retorna (alteradas, removidas): classes de nível superior com fonte
+    adicionado/modificado em tag e classes cujo fonte deixou de existir.
+    """
+    result = subprocess.run(
+        ['git', 'diff', '--name-status', '--no-renames', prev_tag, tag, '--', source_root],
+        cwd=repo_path, check=True, capture_output=True, text=True
+    )
+    changed, removed = set(), set()
+    for line in result.stdout.splitlines():
+        status, path = line.split('\t', 1)
+        if not path.endswith('.java'):
+            continue
+        (removed if status.startswith('D') else changed).add(class_from_source(path, source_root))
+    return changed, removed
+
+
+def dependent_classes(repo_path, tag, classes, source_root=SOURCE_ROOT):
+    """
+    Classes em tag cujo fonte cita o nome simples de alguma das classes dadas
+    (cobre imports e referências dentro do mesmo pacote).
+    """
+    names = sorted({c.rsplit('.', 1)[-1] for c in classes})
+    if not names:
+        return set()
+    cmd = ['git', 'grep', '-l', '-w', '-F']
+    for name in names:
+        cmd += ['-e', name]
+    cmd += [tag, '--', source_root]
+    result = subprocess.run(cmd, cwd=repo_path, capture_output=True, text=True)
+    if result.returncode not in (0, 1):  # 1 = nenhuma ocorrência
+        raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+    prefix = f'{tag}:'
+    return {
+        class_from_source(line[len(prefix):] if line.startswith(prefix) else line, source_root)
+        for line in result.stdout.splitlines()
+    }
+
+
+def binary_classes(jar_path, outer_classes):
+    """
+    Nomes binários no jar (incluindo classes internas Foo$Bar) das classes dadas.
+    """
+    wanted = set(outer_classes)
+    names = []
+    with zipfile.ZipFile(jar_path) as jar:
+        for entry in jar.namelist():
+            if not entry.endswith('.class'):
+                continue
+            name = entry[:-len('.class')].replace('/', '.')
+            if outer_class(name) in wanted:
+                names.append(name)
+    return sorted(names)
+
+
+def _iter_top_level(xml_path):
+    """
+    Gera (atributos da raiz, filho direto da raiz) em streaming, descartando cada
+    filho depois de consumido.
+    """
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(xml_path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield root.attrib, elem
+            root.clear()
+
+
+def _bug_class(bug):
+    cls = bug.find('Class')
+    return cls.get('classname') if cls is not None else None
+
+
+def _set_priorities(elem, total_attr, counts):
+    """Regrava o total e os priority_N de um elemento de estatísticas. Os priority_N
+    antigos são removidos antes: uma prioridade que zerou não fica com o valor velho.
+    """
+    for attr in [a for a in elem.attrib if a.startswith('priority_')]:
+        del elem.attrib[attr]
+    elem.set(total_attr, str(sum(counts.values())))
+    for p, n in sorted(counts.items()):
+        elem.set(f'priority_{p}', str(n))
+
+
+def merge_reports(partial_xml, previous_xml, output_xml, reanalyzed):
+    """
+    Gera output_xml com os bugs de partial_xml mais os bugs de previous_xml cujas
+    classes (de nível superior) não estão em reanalyzed. Sem partial_xml (nenhuma
+    classe a reanalisar, só remoções), cabeçalho e seções finais vêm de previous_xml.
+    """
+    priorities = {}
+    by_package = {}
+    by_class = {}
+    total = 0
+    trailer = []
+    opened = False
+
+    def write_header(out, attrs):
+        nonlocal opened
+        if not opened:
+            attr_text = ''.join(f' {k}={quoteattr(v)}' for k, v in attrs.items())
+            out.write(f'<?xml version="1.0" encoding="UTF-8"?>\n\n<BugCollection{attr_text}>\n  ')
+            opened = True
+
+    def write_bug(out, bug):
+        nonlocal total
+        total += 1
+        p = bug.get('priority')
+        priorities[p] = priorities.get(p, 0) + 1
+        cls = _bug_class(bug)
+        if cls:
+            for counts, name in ((by_class, cls), (by_package, cls.rpartition('.')[0])):
+                bucket = counts.setdefault(name, {})
+                bucket[p] = bucket.get(p, 0) + 1
+        out.write(ET.tostring(bug, encoding='unicode'))
+
+    tmp = output_xml + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as out:
+        # (arquivo, fornece cabeçalho/seções finais, bugs já filtrados)
+        sources = [(partial_xml, True, True)] if partial_xml else []
+        sources.append((previous_xml, not partial_xml, False))
+        for path, primary, fresh in sources:
+            for attrs, elem in _iter_top_level(path):
+                if primary:
+                    write_header(out, attrs)
+                if elem.tag == 'BugInstance':
+                    cls = _bug_class(elem)
+                    if fresh or cls is None or outer_class(cls) not in reanalyzed:
+                        write_bug(out, elem)
+                elif not primary:
+                    continue
+                elif elem.tag == 'Project':
+                    out.write(ET.tostring(elem, encoding='unicode'))
+                else:
+                    # seções finais (Errors, FindBugsSummary, ...) vão depois dos bugs herdados
+                    trailer.append(elem)
+        write_header(out, {})
+
+        for elem in trailer:
+            if elem.tag == 'FindBugsSummary':
+                _set_priorities(elem, 'total_bugs', priorities)
+                for pkg in elem.iter('PackageStats'):
+                    _set_priorities(pkg, 'total_bugs', by_package.get(pkg.get('package'), {}))
+                    for cls in pkg.iter('ClassStats'):
+                        _set_priorities(cls, 'bugs', by_class.get(cls.get('class'), {}))
+            out.write(ET.tostring(elem, encoding='unicode'))
+        out.write('</BugCollection>\n')
+    os.replace(tmp, output_xml)
+    return total
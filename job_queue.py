@@ -0,0 +1,172 @@
+"""
+Fila de jobs local e durável (SQLite) para dividir uma varredura entre vários
+processos de main.py, na mesma máquina ou em máquinas com um sistema de arquivos
+compartilhado.
+
+main.py --enqueue grava um job por tag (etapas que leem os fontes) e um por
+intervalo (RefactoringMiner); cada main.py --worker repete:
+
+    claim     -- pega o job pendente mais antigo (ou um cujo lease expirou)
+    heartbeat -- renova o lease enquanto o job roda
+    complete  -- marca como concluído
+    fail      -- volta para a fila, ou falha de vez depois de MAX_ATTEMPTS tentativas
+
+Um worker que morre sem concluir deixa de renovar o lease, e o job volta a ser
+pego por outro depois que ele expira. Toda operação é uma transação curta com
+"BEGIN IMMEDIATE" em uma conexão própria, então a fila pode ser usada por várias
+threads e processos ao mesmo tempo. O journal fica no modo padrão (sem WAL), que
+funciona em sistemas de arquivos de rede com trava POSIX; os leases usam o
+relógio de cada máquina, que devem estar sincronizados.
+"""
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+QUEUE_FILE = 'job_queue.db'
+
+# Segundos sem heartbeat até outro worker poder pegar o job
+LEASE_SECONDS = 600
+
+# Tentativas de um job (falhas e leases expirados) antes de falhar de vez
+MAX_ATTEMPTS = 3
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    created REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_state ON jobs (state, id);
+"""
+
+Job = namedtuple('Job', ['id', 'key', 'payload', 'attempts'])
+
+
+class JobQueue:
+    def __init__(self, path=QUEUE_FILE, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # isolation_level=None: as transações são abertas explicitamente
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def _transaction(self, func, *args):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(conn, *args)
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+            return result
+        finally:
+            conn.close()
+
+    def enqueue(self, jobs):
+        """
+        Acrescenta jobs [(key, payload)]. Keys já existentes são mantidas, exceto
+        as que falharam de vez, que voltam para a fila. Retorna quantos entraram.
+        """
+        def insert(conn):
+            added = 0
+            now = time.time()
+            for key, payload in jobs:
+                cur = conn.execute(
+                    'INSERT INTO jobs (key, payload, created) VALUES (?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET state = ?, attempts = 0, error = NULL, '
+                    'worker = NULL, lease_until = NULL, finished = NULL WHERE state = ?',
+                    (key, json.dumps(payload), now, PENDING, FAILED))
+                added += cur.rowcount
+            return added
+        return self._transaction(insert)
+
+    def claim(self, worker):
+        """
+        Pega o próximo job e o marca como do worker, com lease de lease_seconds.
+        Jobs cujo lease expirou depois da última tentativa falham de vez.
+        Retorna None se não houver job disponível.
+        """
+        def take(conn):
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET state = ?, error = 'lease expirou (worker parou de responder)', finished = ? "
+                'WHERE state = ? AND lease_until < ? AND attempts >= ?',
+                (FAILED, now, RUNNING, now, self.max_attempts))
+            row = conn.execute(
+                'SELECT id, key, payload, attempts FROM jobs '
+                'WHERE state = ? OR (state = ? AND lease_until < ?) ORDER BY id LIMIT 1',
+                (PENDING, RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE jobs SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1 '
+                         'WHERE id = ?', (RUNNING, worker, now + self.lease_seconds, row[0]))
+            return Job(row[0], row[1], json.loads(row[2]), row[3] + 1)
+        return self._transaction(take)
+
+    def _update_own(self, sql, params, job, worker):
+        def update(conn):
+            cur = conn.execute(f'{sql} WHERE id = ? AND worker = ? AND state = ?',
+                               (*params, job.id, worker, RUNNING))
+            return cur.rowcount == 1
+        return self._transaction(update)
+
+    def heartbeat(self, job, worker):
+        """Renova o lease. Retorna False se o job não é mais deste worker."""
+        return self._update_own('UPDATE jobs SET lease_until = ?', (time.time() + self.lease_seconds,), job, worker)
+
+    def complete(self, job, worker):
+        return self._update_own('UPDATE jobs SET state = ?, lease_until = NULL, finished = ?',
+                                (DONE, time.time()), job, worker)
+
+    def fail(self, job, worker, error):
+        """Devolve o job à fila ou, na última tentativa, marca como falho."""
+        state = FAILED if job.attempts >= self.max_attempts else PENDING
+        return self._update_own('UPDATE jobs SET state = ?, lease_until = NULL, error = ?, finished = ?',
+                                (state, error, time.time() if state == FAILED else None), job, worker)
+
+    def release(self, job, worker):
+        """Devolve o job à fila sem contar a tentativa (ex.: worker interrompido)."""
+        return self._update_own('UPDATE jobs SET state = ?, lease_until = NULL, attempts = attempts - 1',
+                                (PENDING,), job, worker)
+
+    def counts(self):
+        """{estado: quantidade}."""
+        conn = self._connect()
+        try:
+            return dict(conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state'))
+        finally:
+            conn.close()
+
+    def failures(self):
+        """[(key, error)] dos jobs que falharam de vez."""
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT key, error FROM jobs WHERE state = ? ORDER BY id', (FAILED,)).fetchall()
+        finally:
+            conn.close()
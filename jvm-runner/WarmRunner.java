@@ -0,0 +1,148 @@
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.security.Permission;
+import java.util.Arrays;
+
+/**
+ * JVM de longa duração para as ferramentas Java do pipeline (SpotBugs, CK).
+ *
+ * Roda no classpath da ferramenta e recebe pedidos pela entrada padrão, um por
+ * linha, com os campos separados por TAB:
+ *
+ *   pedido:   arquivo de saída (ou "-")  TAB  classe main  TAB  arg1  TAB  arg2 ...
+ *   resposta: DONE  TAB  status  TAB  heap usado em MB (depois de um GC)
+ *
+ * Cada pedido chama classe.main(args) na mesma JVM, com System.out/System.err
+ * redirecionados para o arquivo de saída ("-": a saída de erro da JVM). Ao iniciar,
+ * a JVM escreve "READY TAB 1" se consegue interceptar System.exit (a chamada vira o
+ * status do pedido) ou "READY TAB 0" se não (Java 18+ sem
+ * -Djava.security.manager=allow, Java 24+): nesse caso um System.exit da
+ * ferramenta encerra a JVM e o status é o código de saída do processo.
+ * A JVM termina quando a entrada padrão é fechada.
+ */
+public final class WarmRunner {
+
+    /** Lançada no lugar de System.exit enquanto um pedido roda. */
+    static final class ExitTrapped extends SecurityException {
+        final int status;
+
+        ExitTrapped(int status) {
+            super("System.exit(" + status + ")");
+            this.status = status;
+        }
+    }
+
+    private static volatile boolean closing;
+
+    private WarmRunner() {
+    }
+
+    public static void main(String[] argv) throws IOException {
+        // o protocolo usa o stdout original; a saída solta das ferramentas vai para o stderr
+        PrintStream protocol = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+        PrintStream console = System.err;
+        System.setOut(console);
+
+        boolean trapsExit = installExitTrap(console);
+        protocol.println("READY\t" + (trapsExit ? 1 : 0));
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            int status = runJob(line.split("\t", -1), console);
+            System.setOut(console);
+            System.setErr(console);
+
+            System.gc();
+            Runtime runtime = Runtime.getRuntime();
+            long usedMb = (runtime.totalMemory() - runtime.freeMemory()) / (1024 * 1024);
+            protocol.println("DONE\t" + status + "\t" + usedMb);
+        }
+
+        // threads não daemon deixadas pelas ferramentas não seguram a JVM
+        closing = true;
+        System.exit(0);
+    }
+
+    @SuppressWarnings({"removal", "deprecation"})
+    private static boolean installExitTrap(PrintStream console) {
+        try {
+            System.setSecurityManager(new SecurityManager() {
+                @Override
+                public void checkPermission(Permission perm) {
+                }
+
+                @Override
+                public void checkPermission(Permission perm, Object context) {
+                }
+
+                @Override
+                public void checkExit(int status) {
+                    if (!closing) {
+                        throw new ExitTrapped(status);
+                    }
+                }
+            });
+            return true;
+        } catch (UnsupportedOperationException | SecurityException e) {
+            console.println("WarmRunner: System.exit não será interceptado (" + e + ")");
+            return false;
+        }
+    }
+
+    private static int runJob(String[] fields, PrintStream console) {
+        PrintStream output = null;
+        try {
+            if (fields.length < 2) {
+                console.println("WarmRunner: pedido inválido: " + String.join("\t", fields));
+                return 2;
+            }
+            if (!fields[0].equals("-")) {
+                output = new PrintStream(new FileOutputStream(fields[0], true), true, "UTF-8");
+                System.setOut(output);
+                System.setErr(output);
+            }
+            Method main = Class.forName(fields[1]).getMethod("main", String[].class);
+            main.invoke(null, (Object) Arrays.copyOfRange(fields, 2, fields.length));
+            return 0;
+        } catch (InvocationTargetException e) {
+            ExitTrapped exit = findExit(e.getCause());
+            if (exit != null) {
+                return exit.status;
+            }
+            e.getCause().printStackTrace();
+            return 1;
+        } catch (ExitTrapped e) {
+            return e.status;
+        } catch (Exception | LinkageError e) {
+            e.printStackTrace();
+            return 1;
+        } finally {
+            System.out.flush();
+            System.err.flush();
+            if (output != null) {
+                output.close();
+            }
+        }
+    }
+
+    /** A ferramenta pode ter embrulhado a exceção de System.exit em outra. */
+    private static ExitTrapped findExit(Throwable error) {
+        for (Throwable t = error; t != null; t = t.getCause()) {
+            if (t instanceof ExitTrapped) {
+                return (ExitTrapped) t;
+            }
+        }
+        return null;
+    }
+}
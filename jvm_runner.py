@@ -0,0 +1,208 @@
+"""
+JVMs aquecidos para as ferramentas Java do pipeline (main.py --warm-jvm).
+
+Sem ele, cada tag abre um "java" novo para o SpotBugs e outro para o CK, e em
+releases pequenas a partida da JVM, o carregamento das classes e o aquecimento
+do JIT são boa parte do tempo. Com ele, cada ferramenta fica em uma JVM de longa
+duração (jvm-runner/WarmRunner.java) que recebe os pedidos pela entrada padrão e
+chama o main da ferramenta (o Main-Class do jar) na mesma JVM.
+
+Uma JVM atende um pedido por vez (System.out é global); pedidos simultâneos
+(--jobs, --dag) abrem JVMs adicionais, que ficam no pool para os próximos. Uma
+JVM é reciclada (encerrada e trocada por uma nova no próximo pedido) depois de
+max_jobs pedidos, quando o heap usado após o GC passa de recycle_heap_mb, ou
+quando a ferramenta encerra o processo (System.exit não interceptado, erro fatal).
+O estado estático que as ferramentas deixam entre execuções é o motivo da
+reciclagem periódica.
+
+O WarmRunner é compilado (javac) na primeira vez, em jvm-runner/classes/.
+"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
+from functools import lru_cache
+
+RUNNER_DIR = 'jvm-runner'
+RUNNER_SOURCE = os.path.join(RUNNER_DIR, 'WarmRunner.java')
+RUNNER_CLASSES = os.path.join(RUNNER_DIR, 'classes')
+RUNNER_MAIN = 'WarmRunner'
+
+# Pedidos atendidos por uma JVM antes de ser reciclada
+MAX_JOBS = 50
+
+# Fração do -Xmx que, ocupada depois do GC ao fim de um pedido, faz reciclar a JVM
+RECYCLE_HEAP_FRACTION = 0.75
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def java_major(java='java'):
+    """Versão principal do Java instalado ("1.8.0_392" -> 8, "17.0.9" -> 17)."""
+    result = subprocess.run([java, '-version'], capture_output=True, text=True, check=True)
+    m = re.search(r'version "(\d+)(?:\.(\d+))?', result.stderr)
+    if not m:
+        return 0
+    major = int(m.group(1))
+    return int(m.group(2) or 0) if major == 1 else major
+
+
+@lru_cache(maxsize=None)
+def jar_main_class(jar):
+    """Main-Class do manifesto do jar (a classe que "java -jar" executaria)."""
+    with zipfile.ZipFile(jar) as zf:
+        manifest = zf.read('META-INF/MANIFEST.MF').decode('utf-8')
+    # linhas longas continuam na linha seguinte, iniciada por um espaço
+    manifest = manifest.replace('\r\n', '\n').replace('\n ', '')
+    for line in manifest.splitlines():
+        key, _, value = line.partition(':')
+        if key.strip() == 'Main-Class':
+            return value.strip()
+    raise ValueError(f'{jar}: manifesto sem Main-Class')
+
+
+def compile_runner():
+    """Compila o WarmRunner se a classe não existe ou é mais antiga que o fonte."""
+    target = os.path.join(RUNNER_CLASSES, f'{RUNNER_MAIN}.class')
+    with _lock:
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(RUNNER_SOURCE):
+            return
+        os.makedirs(RUNNER_CLASSES, exist_ok=True)
+        subprocess.run(['javac', '-encoding', 'UTF-8', '-d', RUNNER_CLASSES, RUNNER_SOURCE], check=True)
+
+
+class WarmJvm:
+    """Uma JVM com o WarmRunner e o classpath de uma ferramenta."""
+
+    def __init__(self, classpath, heap_mb):
+        cmd = ['java', f'-Xmx{heap_mb}m']
+        if java_major() >= 12:
+            # Java 18+ só aceita instalar o SecurityManager (que intercepta System.exit) com isso
+            cmd.append('-Djava.security.manager=allow')
+        cmd += ['-cp', os.pathsep.join([RUNNER_CLASSES, *classpath]), RUNNER_MAIN]
+        self.cmd = cmd
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     text=True, encoding='utf-8', bufsize=1)
+        self.jobs = 0
+        self.heap_used_mb = 0
+        ready = self.proc.stdout.readline()
+        if not ready.startswith('READY'):
+            self.close()
+            raise RuntimeError(f'JVM aquecida não iniciou: {" ".join(cmd)}')
+        self.traps_exit = ready.rstrip('\n').split('\t')[1] == '1'
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def run(self, main_class, args, output='-'):
+        """
+        Chama main_class.main(args) com a saída da ferramenta em output ("-": stderr).
+        Retorna o status: 0, o código de System.exit ou 1 se o main lançou exceção.
+        """
+        fields = [output, main_class, *map(str, args)]
+        bad = [f for f in fields if '\t' in f or '\n' in f]
+        if bad:
+            raise ValueError(f'argumentos com TAB ou quebra de linha não são suportados: {bad}')
+        self.jobs += 1
+        try:
+            self.proc.stdin.write('\t'.join(fields) + '\n')
+            self.proc.stdin.flush()
+            reply = self.proc.stdout.readline()
+        except (BrokenPipeError, OSError):
+            reply = ''
+        if not reply:
+            # a ferramenta encerrou a JVM: o código de saída do processo é o status
+            return self.proc.wait()
+        _, status, heap_mb = reply.rstrip('\n').split('\t')
+        self.heap_used_mb = int(heap_mb)
+        return int(status)
+
+    def close(self):
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+        try:
+            self.proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class JvmPool:
+    """
+    JVMs ociosas por (ferramenta, classpath, heap). run() pega uma (ou inicia),
+    atende o pedido e a devolve, a não ser que deva ser reciclada.
+    """
+
+    def __init__(self, max_jobs=MAX_JOBS, recycle_heap_mb=None):
+        self.max_jobs = max_jobs
+        self.recycle_heap_mb = recycle_heap_mb
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.recycled = 0
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                jvm = idle.pop()
+                if jvm.alive():
+                    return jvm
+                jvm.close()
+        compile_runner()
+        jvm = WarmJvm(key[1], key[2])
+        with self._lock:
+            self.started += 1
+        return jvm
+
+    def _release(self, key, jvm):
+        limit = self.recycle_heap_mb or key[2] * RECYCLE_HEAP_FRACTION
+        if not jvm.alive() or jvm.jobs >= self.max_jobs or jvm.heap_used_mb >= limit:
+            jvm.close()
+            with self._lock:
+                self.recycled += 1
+            return
+        with self._lock:
+            self._idle.setdefault(key, []).append(jvm)
+
+    def run(self, tool, classpath, main_class, args, heap_mb, log=None):
+        """
+        Roda main_class.main(args) em uma JVM de tool. A saída da ferramenta vai
+        para log (arquivo aberto) ou, sem log, para o terminal. Retorna o status.
+        """
+        key = (tool, tuple(classpath), heap_mb)
+        jvm = self._acquire(key)
+        try:
+            if log is None:
+                status = jvm.run(main_class, args)
+            else:
+                # a JVM grava em um arquivo próprio, copiado depois para o log
+                # (escrever direto no log atropelaria a posição do arquivo no Python)
+                fd, output = tempfile.mkstemp(prefix=f'{tool}-', suffix='.log')
+                os.close(fd)
+                try:
+                    status = jvm.run(main_class, args, os.path.abspath(output))
+                    with open(output, encoding='utf-8', errors='replace') as f:
+                        shutil.copyfileobj(f, log)
+                    log.flush()
+                finally:
+                    os.remove(output)
+        except BaseException:
+            jvm.close()
+            raise
+        self._release(key, jvm)
+        return status
+
+    def close(self):
+        with self._lock:
+            jvms = [jvm for idle in self._idle.values() for jvm in idle]
+            self._idle.clear()
+        for jvm in jvms:
+            jvm.close()
@@ -1,16 +1,65 @@
+import argparse
+import json
 import os
+import re
+import shlex
+import socket
+import sqlite3
 import subprocess
 import sys
-from pydriller.git import Git
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 import shutil
 
+from artifact_cache import CACHE_DIR, ArtifactCache, tool_fingerprint
+import incremental_spotbugs
+import job_queue
+import jvm_runner
+import multi_repo
+from scripts.refactoring_reader import iter_commits
+from stage_scheduler import Scheduler, Task
+from stage_trace import Tracer
+
 REPO_URL = 'https://github.com/traccar/traccar.git'
 
 LOCAL_REPO_PATH = 'traccar'
 
+# Object store compartilhado usado como "git clone --reference" (--reference;
+# o modo --manifest aponta todos os repositórios para o mesmo)
+REPO_REFERENCE = None
+
 SPOTBUGS_CMD = 'spotbugs'
 
+# Jar do SpotBugs, usado no lugar de SPOTBUGS_CMD quando roda em JVM aquecida
+SPOTBUGS_JAR = './spotbugs.jar'
+
+# Pool de JVMs aquecidas para SpotBugs e CK (--warm-jvm); None: um "java" novo por execução
+WARM_JVM = None
+
+# Flags de cada ferramenta; também fazem parte da chave do cache de artefatos
+SPOTBUGS_FLAGS = ['-textui', '-effort:max']
+
+# SpotBugs incremental: reanalisa só as classes alteradas (e dependentes) desde a
+# tag anterior e reaproveita o resto do XML dela (ativado com --spotbugs-incremental)
+SPOTBUGS_INCREMENTAL = False
+
+# Aquisição do repositório (--acquire): "full" clona todo o histórico e busca
+# todas as tags; "partial" faz um clone parcial sem o conteúdo dos arquivos e
+# busca só as tags que passam nos filtros de seleção. Os arquivos vêm sob demanda
+# (checkout/worktree das tags escolhidas e prefetch antes do RefactoringMiner)
+ACQUIRE_MODE = 'full'
+PARTIAL_CLONE_FILTER = 'blob:none'
+
+# Máximo de objetos pedidos por "git fetch" no prefetch do modo parcial
+PREFETCH_BATCH = 5000
+REFACTORING_MINER_FLAGS = ['-bt']
+CK_FLAGS = ['true', '0', 'true']
+
 # Caminho absoluto para o jar do plugin FindSecBugs
 FINDBUGS_PLUGIN_JAR = './findsecbugs-plugin-1.12.0.jar'
 
@@ -23,170 +72,725 @@ CK_METRICS_JAR = './ck-0.7.1-SNAPSHOT-jar-with-dependencies.jar'
 # Pasta onde os CSVs do CK serão salvos
 CK_OUTPUT_DIR = 'ck_metrics_output'
 
+# Pastas de saída do SpotBugs e do RefactoringMiner
+SPOTBUGS_OUTPUT_DIR = 'spotbugs'
+REFACTORING_MINER_OUTPUT_DIR = 'refactoring-miner'
+
 # Comando de build (Gradle Wrapper) pulando os testes
 BUILD_CMD = ['./gradlew', 'assemble']
 
+# Jar analisado pelo SpotBugs e pasta de fontes analisada pelo CK, relativos à
+# raiz do repositório (--jar / --source-dir para outros projetos)
+SPOTBUGS_TARGET = os.path.join('target', 'tracker-server.jar')
+CK_SOURCE_DIR = os.path.join('src', 'main', 'java', 'org', 'traccar')
+
+# Raiz dos fontes Java (onde começam os pacotes), relativa ao repositório, usada pelo
+# SpotBugs incremental para achar as classes alteradas (--java-source-root)
+JAVA_SOURCE_ROOT = incremental_spotbugs.SOURCE_ROOT
+
+# Build cache local do Gradle compartilhado entre todas as tags/worktrees
+GRADLE_BUILD_CACHE_DIR = '.gradle-build-cache'
+
+# Pasta com os worktrees isolados (um por tag) usados no modo paralelo
+WORKTREES_DIR = 'worktrees'
+
+# Pasta com os logs separados de cada tag no modo paralelo
+LOGS_DIR = 'logs'
+
+# Trace (formato Chrome trace) com tempo, CPU e pico de RSS de cada etapa e
+# subprocesso, gravado em LOGS_DIR
+TRACE_FILE = 'trace.json'
+TRACER = Tracer()
+
+# Pasta do cache de artefatos (fica dentro de --output-root, quando informado)
+ARTIFACT_CACHE_DIR = CACHE_DIR
+
+# Intervalo (s) entre consultas de um worker à fila quando não há job disponível
+QUEUE_POLL_SECONDS = 10
+
+# Pasta dos scripts de normalização/análise (rodam com cwd nela, pois usam caminhos "../")
+SCRIPTS_DIR = 'scripts'
+
+# Estimativa de heap (MB) de cada JVM, usada pelo escalonador do modo --dag
+JVM_HEAP_MB = {'build': 2048, 'spotbugs': 4096, 'refactoringminer': 4096, 'ck': 2048}
+
+# Etapas de análise que podem ser selecionadas via "--stages"
+STAGES = ('spotbugs', 'refactoringminer', 'ck')
+
+# Tags no formato [v]MAJOR.MINOR[.PATCH][-pré-release]
+SEMVER_TAG = re.compile(r'^v?(?P<version>\d+\.\d+(?:\.\d+)?)(?:[-+.]?(?P<pre>[0-9A-Za-z][0-9A-Za-z.+-]*))?$')
+
+TagRef = namedtuple('TagRef', ['name', 'sha', 'date'])
+
+# O que cada etapa precisa da tag: "sources" (checkout dos fontes),
+# "jar" (projeto compilado) ou "history" (só o histórico do git)
+STAGE_REQUIREMENTS = {
+    'spotbugs': {'sources', 'jar'},
+    'refactoringminer': {'history'},
+    'ck': {'sources'},
+}
+
 
 # ----------------------------
 #  FUNÇÕES AUXILIARES
 # ----------------------------
 
+def log_message(msg, log=None):
+    """
+    Escreve a mensagem no log da tag (modo paralelo) ou no terminal.
+    """
+    if log is None:
+        print(msg)
+    else:
+        log.write(msg + '\n')
+        log.flush()
+
+
+def run_command(cmd, cwd=None, log=None):
+    """
+    Executa o comando com check=True. Se um log for informado, stdout e stderr
+    do processo são redirecionados para ele em vez do terminal.
+    O uso de recursos do processo entra no trace (TRACER).
+    """
+    if log is None:
+        TRACER.run(cmd, cwd=cwd)
+    else:
+        TRACER.run(cmd, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+
+
+def run_java_tool(tool, jar, args, cmd, log=None):
+    """
+    Roda uma ferramenta Java: com WARM_JVM, chama o Main-Class do jar com args em
+    uma JVM aquecida da ferramenta; senão executa cmd em um processo novo.
+    Levanta CalledProcessError (com cmd) se a ferramenta terminar com erro.
+    """
+    if WARM_JVM is None:
+        run_command(cmd, log=log)
+        return
+    status = WARM_JVM.run(tool, [jar], jvm_runner.jar_main_class(jar), args, JVM_HEAP_MB[tool], log)
+    if status != 0:
+        raise subprocess.CalledProcessError(status, cmd)
+
+
+def spotbugs_output_path(tag):
+    return os.path.join(SPOTBUGS_OUTPUT_DIR, f'spotbugs_{tag.removeprefix("v")}.xml')
+
+
+def refactoring_output_path(prev_tag, tag):
+    return os.path.join(REFACTORING_MINER_OUTPUT_DIR, f'refactoring_{prev_tag}_to_{tag}.json')
+
+
+def ck_output_dir(tag):
+    return os.path.join(CK_OUTPUT_DIR, tag)
+
+
+@lru_cache(maxsize=None)
+def resolve_commit(tag):
+    """
+    Retorna o SHA do commit apontado pela tag.
+    """
+    result = subprocess.run(
+        ['git', 'rev-parse', f'{tag}^{{commit}}'],
+        cwd=LOCAL_REPO_PATH, check=True, capture_output=True, text=True
+    )
+    return result.stdout.strip()
+
+
+def stage_cache_entry(stage, tag, prev_tag, spotbugs_mode='full'):
+    """
+    Retorna (chave, saídas) da etapa para a tag, ou None se a etapa não se aplica.
+    A chave combina commit(s), versão da ferramenta, flags e o que é analisado
+    (jar e comando de build do SpotBugs, pasta de fontes do CK). spotbugs_mode é o
+    caminho que gerou (ou geraria) o XML: "incremental" inclui na chave o commit
+    da tag anterior, de cujo XML os bugs são herdados.
+    """
+    if stage == 'spotbugs':
+        parts = {}
+        if spotbugs_mode == 'incremental':
+            parts['incremental_from'] = resolve_commit(prev_tag)
+            parts['source_root'] = JAVA_SOURCE_ROOT
+        # com --warm-jvm quem roda é o jar, não o executável "spotbugs" do PATH
+        tool = SPOTBUGS_JAR if WARM_JVM is not None else SPOTBUGS_CMD
+        key = ArtifactCache.key(stage, commit=resolve_commit(tag),
+                                tool=tool_fingerprint(tool), flags=SPOTBUGS_FLAGS,
+                                target=SPOTBUGS_TARGET, build=BUILD_CMD, **parts)
+        return key, [spotbugs_output_path(tag)]
+    if stage == 'refactoringminer':
+        if not prev_tag:
+            return None
+        key = ArtifactCache.key(stage, commits=[resolve_commit(prev_tag), resolve_commit(tag)],
+                                tool=tool_fingerprint(REFACTORING_MINER_JAR), flags=REFACTORING_MINER_FLAGS)
+        return key, [refactoring_output_path(prev_tag, tag)]
+    if stage == 'ck':
+        key = ArtifactCache.key(stage, commit=resolve_commit(tag),
+                                tool=tool_fingerprint(CK_METRICS_JAR), flags=CK_FLAGS, source_dir=CK_SOURCE_DIR)
+        return key, [ck_output_dir(tag)]
+    raise ValueError(f'Etapa desconhecida: {stage}')
+
+
+def cache_candidates(stage, tag, prev_tag):
+    """
+    Entradas do cache que servem para a etapa, na ordem de preferência. Para o
+    SpotBugs, um XML completo sempre serve; com SPOTBUGS_INCREMENTAL, um XML
+    incremental a partir de prev_tag também.
+    """
+    entry = stage_cache_entry(stage, tag, prev_tag)
+    if entry is None:
+        return []
+    candidates = [entry]
+    if stage == 'spotbugs' and SPOTBUGS_INCREMENTAL and prev_tag:
+        candidates.append(stage_cache_entry(stage, tag, prev_tag, 'incremental'))
+    return candidates
+
+
+def pending_stages(tag, prev_tag, stages, cache, log=None):
+    """
+    Restaura do cache as etapas já calculadas para a tag e retorna apenas
+    as que ainda precisam rodar.
+    """
+    pending = []
+    for stage in stages:
+        candidates = cache_candidates(stage, tag, prev_tag)
+        if not candidates:
+            continue
+        if cache is not None and any(cache.restore(*entry) for entry in candidates):
+            log_message(f'    → Etapa "{stage}" da tag "{tag}" restaurada do cache', log)
+            continue
+        pending.append(stage)
+    return pending
+
+
+def store_stage(cache, stage, tag, prev_tag, spotbugs_mode='full'):
+    """
+    Guarda no cache a saída de uma etapa que acabou de rodar com sucesso.
+    spotbugs_mode é o caminho que o SpotBugs seguiu (retorno de run_spotbugs).
+    """
+    if cache is None:
+        return
+    key, outputs = stage_cache_entry(stage, tag, prev_tag, spotbugs_mode)
+    meta = {'spotbugs_mode': spotbugs_mode} if stage == 'spotbugs' else {}
+    cache.store(key, outputs, stage=stage, tag=tag, prev_tag=prev_tag, **meta)
+
+
+@TRACER.traced('clone')
 def clone_or_update_repo():
     """
     Clona o repositório se não existir, ou faz 'git fetch --tags' caso já esteja clonado.
+    Com REPO_REFERENCE, o clone reaproveita os objetos do object store compartilhado.
+    Na aquisição parcial, o clone traz só commits e árvores do branch padrão, sem
+    checkout e sem tags (buscadas depois por fetch_candidate_tags).
     """
     if not os.path.isdir(LOCAL_REPO_PATH):
-        print(f'[1/5] Clonando {REPO_URL} em "{LOCAL_REPO_PATH}"…')
-        os.system(f'git clone {REPO_URL}')
+        print(f'[1/7] Clonando {REPO_URL} em "{LOCAL_REPO_PATH}"…')
+        options = []
+        if REPO_REFERENCE:
+            options += ['--reference-if-able', os.path.abspath(REPO_REFERENCE)]
+        if ACQUIRE_MODE == 'partial':
+            options += [f'--filter={PARTIAL_CLONE_FILTER}', '--no-checkout', '--no-tags', '--single-branch']
+        if options:
+            # com um caminho local o git copiaria os objetos, ignorando o store e o filtro
+            options.append('--no-local')
+        run_command(['git', 'clone', *options, REPO_URL, LOCAL_REPO_PATH])
+    elif ACQUIRE_MODE == 'partial':
+        print(f'[1/7] Repositório já existe em "{LOCAL_REPO_PATH}" (aquisição parcial).')
     else:
-        print(f'[1/5] Repositório já existe em "{LOCAL_REPO_PATH}". Atualizando tags…')
+        print(f'[1/7] Repositório já existe em "{LOCAL_REPO_PATH}". Atualizando tags…')
         # Para fazer fetch apenas das tags mais recentes
-        subprocess.run(['git', 'fetch', '--tags'], cwd=LOCAL_REPO_PATH, check=True)
+        run_command(['git', 'fetch', '--tags'], cwd=LOCAL_REPO_PATH)
 
 
-def get_last_n_tags(n=20):
+@TRACER.traced('fetch-tags')
+def fetch_candidate_tags(semver_only=False, min_version=None, max_version=None, skip_prereleases=False):
     """
-    Retorna uma lista com os nomes das últimas n tags (releases),
-    ordenadas da mais recente para a mais antiga, usando a data do committer.
+    Aquisição parcial: lista as tags do remoto com "git ls-remote" e busca só as
+    que passam nos filtros de seleção e ainda não existem localmente. Vêm os
+    commits e árvores do histórico delas (a escolha das últimas n usa a data dos
+    commits), mas não o conteúdo dos arquivos.
     """
-    print(f'[2/5] Obtendo últimas {n} releases (tags) do repositório…')
-    git = Git(LOCAL_REPO_PATH)
-    all_tags = git.repo.tags  # lista de strings com todas as tags
-    tags_with_dates = []
+    print('    → Listando as tags do remoto…')
+    result = subprocess.run(
+        ['git', 'ls-remote', '--tags', '--refs', 'origin'],
+        cwd=LOCAL_REPO_PATH, check=True, capture_output=True, text=True
+    )
+    remote = []
+    for line in result.stdout.splitlines():
+        sha, ref = line.split('\t', 1)
+        remote.append(TagRef(ref[len('refs/tags/'):], sha, None))
+    candidates = filter_tags(remote, semver_only, min_version, max_version, skip_prereleases)
 
-    for tag in all_tags:
-        try:
-            commit = git.get_commit_from_tag(tag.name)
-            tags_with_dates.append((tag.name, commit.committer_date))
-        except Exception:
-            # Caso haja tag sem commit válido, ignora
+    result = subprocess.run(['git', 'tag', '--list'], cwd=LOCAL_REPO_PATH,
+                            check=True, capture_output=True, text=True)
+    local = set(result.stdout.split())
+    missing = [tag.name for tag in candidates if tag.name not in local]
+    print(f'    → {len(candidates)} de {len(remote)} tags passam nos filtros, {len(missing)} a buscar')
+    if missing:
+        run_command(['git', 'fetch', '--no-tags', 'origin',
+                     *(f'+refs/tags/{name}:refs/tags/{name}' for name in missing)], cwd=LOCAL_REPO_PATH)
+
+
+@TRACER.traced('prefetch')
+def prefetch_java_blobs(intervals, log=None):
+    """
+    Aquisição parcial: o RefactoringMiner lê o repositório com JGit, que não busca
+    objetos sob demanda. Antes dele, traz em lote as versões de antes e de depois
+    de cada .java alterado nos commits (sem merges) dos intervalos (prev_tag, tag).
+    Se todos já existem localmente, o git não busca nada.
+    """
+    oids = set()
+    for prev_tag, tag in intervals:
+        result = subprocess.run(
+            ['git', 'log', '--raw', '--no-renames', '--no-merges', '--no-abbrev', '--format=',
+             f'{prev_tag}..{tag}', '--', '*.java'],
+            cwd=LOCAL_REPO_PATH, check=True, capture_output=True, text=True
+        )
+        for line in result.stdout.splitlines():
+            # ":100644 100644 <blob antes> <blob depois> M\t<caminho>"
+            before, after = line.split()[2:4]
+            oids.update(oid for oid in (before, after) if oid.strip('0'))
+    if not oids:
+        return
+    log_message(f'    → Buscando {len(oids)} versões de arquivos .java para o RefactoringMiner…', log)
+    oids = sorted(oids)
+    for start in range(0, len(oids), PREFETCH_BATCH):
+        run_command(['git', '-c', 'fetch.negotiationAlgorithm=noop', 'fetch', '--no-tags',
+                     '--no-write-fetch-head', 'origin', *oids[start:start + PREFETCH_BATCH]],
+                    cwd=LOCAL_REPO_PATH, log=log)
+
+
+def parse_version(text):
+    """
+    Converte "v5.3", "6.7.0" ou "6.0-rc1" em ((major, minor, patch), pré-release).
+    Retorna None se o texto não seguir o formato de versão.
+    """
+    m = SEMVER_TAG.match(text)
+    if not m:
+        return None
+    parts = [int(p) for p in m.group('version').split('.')]
+    while len(parts) < 3:
+        parts.append(0)
+    return tuple(parts), m.group('pre') or ''
+
+
+def version_arg(text):
+    """Tipo de --min-version/--max-version: aceita só textos no formato de versão."""
+    if parse_version(text) is None:
+        raise argparse.ArgumentTypeError(f'versão inválida: {text!r} (esperado [v]MAJOR.MINOR[.PATCH], ex: 5.3)')
+    return text
+
+
+def list_tags(repo_path=None):
+    """
+    Lista todas as tags com o SHA e a data do committer do commit apontado,
+    da mais recente para a mais antiga, com uma única chamada ao git.
+    Tags anotadas são resolvidas para o commit; tags que não apontam para
+    commits ficam de fora.
+    """
+    repo_path = repo_path or LOCAL_REPO_PATH
+    result = subprocess.run(
+        ['git', 'log', '--no-walk=sorted', '--tags', '--decorate-refs=refs/tags/',
+         '--format=%H%x09%ct%x09%D'],
+        cwd=repo_path, check=True, capture_output=True, text=True
+    )
+    tags = []
+    for line in result.stdout.splitlines():
+        sha, date, refs = line.split('\t', 2)
+        for ref in refs.split(', '):
+            if ref.startswith('tag: '):
+                tags.append(TagRef(ref[len('tag: '):], sha, int(date)))
+    return tags
+
+
+def filter_tags(tags, semver_only=False, min_version=None, max_version=None, skip_prereleases=False):
+    """
+    Aplica os filtros de seleção de tags. min_version/max_version são inclusivos
+    e implicam semver_only.
+    """
+    low = parse_version(min_version)[0] if min_version else None
+    high = parse_version(max_version)[0] if max_version else None
+    selected = []
+    for tag in tags:
+        parsed = parse_version(tag.name)
+        if parsed is None:
+            if semver_only or low or high:
+                continue
+            selected.append(tag)
             continue
+        version, pre = parsed
+        if skip_prereleases and pre:
+            continue
+        if low and version < low:
+            continue
+        if high and version > high:
+            continue
+        selected.append(tag)
+    return selected
+
 
-    # Ordena por committer_date desc → [ (tag, date), ... ]
-    tags_sorted = sorted(tags_with_dates, key=lambda x: x[1], reverse=True)
-    last_tags = [tag for tag, _ in tags_sorted[:n]][::-1]
+@TRACER.traced('tags')
+def get_last_n_tags(n=20, semver_only=False, min_version=None, max_version=None, skip_prereleases=False):
+    """
+    Retorna uma lista com os nomes das últimas n tags (releases),
+    ordenadas da mais antiga para a mais recente, usando a data do committer.
+    """
+    print(f'[2/7] Obtendo últimas {n} releases (tags) do repositório…')
+    tags = filter_tags(list_tags(), semver_only, min_version, max_version, skip_prereleases)
+    last_tags = [tag.name for tag in tags[:n]][::-1]
     print(f'    → Tags selecionadas: {last_tags}')
     return last_tags
 
 
-def checkout_tag(tag):
+@TRACER.traced('checkout')
+def checkout_tag(tag, repo_path=None, log=None):
     """
     Dá checkout na tag especificada dentro do repositório local.
     """
-    print(f'[3/5] Fazendo checkout na tag "{tag}"…')
-    subprocess.run(['git', 'checkout', tag], cwd=LOCAL_REPO_PATH, check=True)
+    log_message(f'[3/7] Fazendo checkout na tag "{tag}"…', log)
+    run_command(['git', 'checkout', tag], cwd=repo_path or LOCAL_REPO_PATH, log=log)
+
+
+@TRACER.traced('worktree')
+def create_worktree(tag, log=None):
+    """
+    Cria um git worktree isolado para a tag em "WORKTREES_DIR/<tag>", permitindo
+    que várias tags sejam buildadas e analisadas ao mesmo tempo.
+    Retorna o caminho absoluto do worktree.
+    """
+    path = os.path.abspath(os.path.join(WORKTREES_DIR, tag))
+    if os.path.isdir(path):
+        # Sobra de uma execução interrompida
+        remove_worktree(path)
+    os.makedirs(WORKTREES_DIR, exist_ok=True)
+    run_command(['git', 'worktree', 'add', '--force', '--detach', path, tag], cwd=LOCAL_REPO_PATH, log=log)
+    return path
 
 
-def build_project():
+def remove_worktree(path):
+    """
+    Remove o worktree criado por create_worktree.
+    """
+    subprocess.run(['git', 'worktree', 'remove', '--force', path], cwd=LOCAL_REPO_PATH,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    shutil.rmtree(path, ignore_errors=True)
+    subprocess.run(['git', 'worktree', 'prune'], cwd=LOCAL_REPO_PATH)
+
+
+def stages_need(stages, requirement):
+    """
+    Indica se alguma das etapas precisa de "sources", "jar" ou "history".
+    """
+    return any(requirement in STAGE_REQUIREMENTS[stage] for stage in stages)
+
+
+def build_command():
+    """
+    Monta o comando de build com o build cache do Gradle habilitado e apontando
+    para GRADLE_BUILD_CACHE_DIR, de modo que tarefas já executadas em outra tag
+    (ou em outro worktree) sejam reaproveitadas.
+    """
+    cache_dir = os.path.abspath(GRADLE_BUILD_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    init_script = os.path.join(cache_dir, 'init-build-cache.gradle')
+    if not os.path.exists(init_script):
+        with open(init_script, 'w', encoding='utf-8') as f:
+            f.write(
+                'settingsEvaluated { settings ->\n'
+                '    settings.buildCache {\n'
+                f'        local {{ directory = new File({cache_dir!r}) }}\n'
+                '    }\n'
+                '}\n'
+            )
+    return BUILD_CMD + ['--build-cache', '--init-script', init_script]
+
+
+def build_project(repo_path, log=None):
     """
     Roda o comando de build (Gradle) pulando os testes.
     """
-    print(f'[4/5] Buildando o projeto (skip tests)…')
-    # Observação: assume que o script "./gradlew" está na raiz do LOCAL_REPO_PATH
-    subprocess.run(BUILD_CMD, cwd=LOCAL_REPO_PATH, check=True)
-    print(f'[4.1/5] Build realizado!')
+    log_message(f'[4/7] Buildando o projeto (skip tests)…', log)
+    # Observação: assume que o script "./gradlew" está na raiz do repo_path
+    run_command(build_command(), cwd=repo_path, log=log)
+    log_message(f'    → Build realizado!', log)
 
 
-def run_spotbugs(tag):
+@TRACER.traced('spotbugs')
+def run_spotbugs(tag, repo_path, log=None, prev_tag=None):
     """
     Executa o SpotBugs no diretório de classes compiladas, apontando para o plugin FindSecBugs.
     Salva o XML de saída em "spotbugs_<tag>.xml" na pasta atual onde o script foi chamado.
+    Com SPOTBUGS_INCREMENTAL e o XML de prev_tag disponível, roda em modo incremental.
+    Retorna o caminho seguido, "incremental" ou "full" (parte da chave do cache).
     """
-    print(f'[5/7] Executando SpotBugs (FindSecBugs) para a tag "{tag}"…')
-    # Ajuste este path conforme a estrutura do build do traccar:
-    # normalmente, classes compiladas ficam em: build/classes/java/main
-    classes_dir = os.path.join(LOCAL_REPO_PATH,'target', f'tracker-server.jar')
-    output_file = '/spotbugs'
-    dir_path = os.path.dirname(output_file)
-    os.makedirs(dir_path, exist_ok=True)
+    if SPOTBUGS_INCREMENTAL and prev_tag and os.path.exists(spotbugs_output_path(prev_tag)):
+        if all(incremental_spotbugs.has_source_root(LOCAL_REPO_PATH, t, JAVA_SOURCE_ROOT) for t in (prev_tag, tag)):
+            run_spotbugs_incremental(prev_tag, tag, repo_path, log)
+            return 'incremental'
+        # sem a raiz dos fontes o diff sairia vazio e o XML anterior seria copiado como se nada mudasse
+        log_message(f'    → "{JAVA_SOURCE_ROOT}" não existe em "{prev_tag}" ou "{tag}" '
+                    f'(ver --java-source-root); rodando o SpotBugs completo', log)
+
+    log_message(f'[5/7] Executando SpotBugs (FindSecBugs) para a tag "{tag}"…', log)
+    # SPOTBUGS_TARGET (--jar) é relativo à raiz do repositório
+    classes_dir = os.path.join(repo_path, SPOTBUGS_TARGET)
 
-    base_dir = Path('spotbugs')
+    base_dir = Path(SPOTBUGS_OUTPUT_DIR)
 
     # Cria todo o caminho se não existir
     base_dir.mkdir(parents=True, exist_ok=True)
 
     # Agora monte o arquivo dentro desse diretório
-    output_file = f"-xml={base_dir}/spotbugs_{tag[1:]}.xml"
+    # (grava em .tmp e renomeia: o modo incremental da próxima tag nunca lê um XML pela metade)
+    output_path = spotbugs_output_path(tag)
+    output_file = f"-xml={output_path}.tmp"
 
-    cmd = [
-        'spotbugs',
-        '-textui',
-        '-effort:max',
+    args = [
+        *SPOTBUGS_FLAGS,
         output_file,
         classes_dir
     ]
-    subprocess.run(cmd, check=True)
-    print(f'    → SpotBugs finalizado, saída em "{output_file}"')
+    run_java_tool('spotbugs', SPOTBUGS_JAR, args, [SPOTBUGS_CMD, *args], log)
+    os.replace(f'{output_path}.tmp', output_path)
+    log_message(f'    → SpotBugs finalizado, saída em "{output_path}"', log)
+    return 'full'
+
+
+def run_spotbugs_incremental(prev_tag, tag, repo_path, log=None):
+    """
+    Reanalisa só as classes cujo fonte mudou entre prev_tag e tag, mais as que
+    citam alguma delas, e copia do XML de prev_tag os bugs das demais classes.
+    """
+    log_message(f'[5/7] Executando SpotBugs incremental de "{prev_tag}" → "{tag}"…', log)
+    classes_dir = os.path.join(repo_path, SPOTBUGS_TARGET)
+    prev_xml = spotbugs_output_path(prev_tag)
+    output_path = spotbugs_output_path(tag)
+
+    changed, removed = incremental_spotbugs.changed_classes(LOCAL_REPO_PATH, prev_tag, tag, JAVA_SOURCE_ROOT)
+    affected = changed | incremental_spotbugs.dependent_classes(LOCAL_REPO_PATH, tag, changed | removed,
+                                                                JAVA_SOURCE_ROOT)
+    if not affected and not removed:
+        shutil.copyfile(prev_xml, output_path)
+        log_message(f'    → Nenhuma classe alterada, saída copiada de "{prev_xml}"', log)
+        return
 
+    targets = incremental_spotbugs.binary_classes(classes_dir, affected)
+    log_message(f'    → {len(changed)} alterada(s), {len(removed)} removida(s), '
+                f'{len(affected)} a reanalisar ({len(targets)} classes no jar)', log)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        partial_xml = None
+        if targets:
+            partial_xml = os.path.join(tmp_dir, 'partial.xml')
+            args = [
+                *SPOTBUGS_FLAGS,
+                '-onlyAnalyze', ','.join(targets),
+                f'-xml={partial_xml}',
+                classes_dir
+            ]
+            run_java_tool('spotbugs', SPOTBUGS_JAR, args, [SPOTBUGS_CMD, *args], log)
+        total = incremental_spotbugs.merge_reports(partial_xml, prev_xml, output_path, affected | removed)
+    log_message(f'    → SpotBugs finalizado, {total} bugs em "{output_path}"', log)
 
-def run_refactoringminer(prev_tag, tag):
+
+@TRACER.traced('refactoringminer')
+def run_refactoringminer(prev_tag, tag, log=None):
     """
     Executa o RefactoringMiner comparando o prev_tag com a tag atual.
     Gera um JSON "refactoring_<prev_tag>_to_<tag>.json" na pasta corrente.
+    Sempre usa o repositório principal: o RefactoringMiner só lê o histórico,
+    então pode rodar em paralelo sem worktree próprio.
     """
-    print(f'[6/6] Executando RefactoringMiner de "{prev_tag}" → "{tag}"…')
-    output_folder = f'refactoring-miner'
-    dir_path = os.path.join(output_folder)
-    os.makedirs(dir_path, exist_ok=True)
+    log_message(f'[6/7] Executando RefactoringMiner de "{prev_tag}" → "{tag}"…', log)
+    os.makedirs(REFACTORING_MINER_OUTPUT_DIR, exist_ok=True)
+    output_json = refactoring_output_path(prev_tag, tag)
+    if ACQUIRE_MODE == 'partial':
+        prefetch_java_blobs([(prev_tag, tag)], log)
 
     cmd = [
         REFACTORING_MINER_JAR,
-        '-bt',
+        *REFACTORING_MINER_FLAGS,
         LOCAL_REPO_PATH, prev_tag, tag,
-        '-json', f'{output_folder}/refactoring_{prev_tag}_to_{tag}.json',
+        '-json', output_json,
+    ]
+    run_command(cmd, log=log)
+    log_message(f'    → RefactoringMiner finalizado, saída em "{output_json}"', log)
+
+
+def commits_between(prev_tag, tag):
+    """
+    SHAs dos commits alcançáveis a partir de tag e não de prev_tag (prev_tag..tag).
+    """
+    result = subprocess.run(
+        ['git', 'rev-list', f'{prev_tag}..{tag}'],
+        cwd=LOCAL_REPO_PATH, check=True, capture_output=True, text=True
+    )
+    return result.stdout.split()
+
+
+def split_refactorings(batch_json, intervals):
+    """
+    Distribui os commits do JSON em lote entre os arquivos
+    "refactoring_<a>_to_<b>.json" de cada intervalo, no mesmo formato
+    {"commits": [...]} gerado pelo RefactoringMiner. Os commits são lidos em
+    streaming; commits fora dos intervalos pedidos são descartados.
+    """
+    owner = {}
+    for prev_tag, tag in intervals:
+        for sha in commits_between(prev_tag, tag):
+            owner[sha] = (prev_tag, tag)
+
+    files = {}
+    counts = {interval: 0 for interval in intervals}
+    try:
+        for interval in intervals:
+            f = open(refactoring_output_path(*interval) + '.tmp', 'w', encoding='utf-8')
+            f.write('{\n"commits": [')
+            files[interval] = f
+        for commit in iter_commits(batch_json):
+            interval = owner.get(commit.get('sha1'))
+            if interval is None:
+                continue
+            f = files[interval]
+            f.write(',\n' if counts[interval] else '\n')
+            f.write(json.dumps(commit, indent='\t', ensure_ascii=False))
+            counts[interval] += 1
+        for interval, f in files.items():
+            f.write('\n]\n}\n')
+            f.close()
+            os.replace(f.name, refactoring_output_path(*interval))
+    finally:
+        for f in files.values():
+            if not f.closed:
+                f.close()
+            if os.path.exists(f.name):
+                os.remove(f.name)
+    return counts
+
+
+@TRACER.traced('refactoringminer-batch')
+def run_refactoringminer_batched(tags, cache=None, log=None):
+    """
+    Roda o RefactoringMiner uma única vez ("-bc") entre a tag mais antiga e a
+    mais recente que ainda faltam no cache e separa o resultado nos mesmos
+    arquivos "refactoring_<a>_to_<b>.json" do modo por intervalo, atribuindo
+    cada commit ao intervalo prev_tag..tag a que pertence.
+    """
+    intervals = [
+        (prev_tag, tag) for prev_tag, tag in zip(tags[:-1], tags[1:])
+        if pending_stages(tag, prev_tag, ['refactoringminer'], cache, log)
     ]
-    subprocess.run(cmd, check=True)
-    print(f'    → RefactoringMiner finalizado, saída em "{output_folder}/refactoring_{prev_tag}_to_{tag}.json"')
+    if not intervals:
+        return
+    start, end = intervals[0][0], intervals[-1][1]
+    log_message(f'[6/7] Executando RefactoringMiner em lote de "{start}" → "{end}" '
+                f'({len(intervals)} intervalos)…', log)
+    os.makedirs(REFACTORING_MINER_OUTPUT_DIR, exist_ok=True)
+    if ACQUIRE_MODE == 'partial':
+        prefetch_java_blobs(intervals, log)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        batch_json = os.path.join(tmp, 'refactoring_batch.json')
+        cmd = [
+            REFACTORING_MINER_JAR,
+            '-bc',
+            LOCAL_REPO_PATH, resolve_commit(start), resolve_commit(end),
+            '-json', batch_json,
+        ]
+        run_command(cmd, log=log)
+        counts = split_refactorings(batch_json, intervals)
+
+    for (prev_tag, tag), n in counts.items():
+        # mesma chave do modo por intervalo: o conteúdo de cada arquivo é equivalente
+        store_stage(cache, 'refactoringminer', tag, prev_tag)
+        log_message(f'    → {n} commits em "{refactoring_output_path(prev_tag, tag)}"', log)
 
 
-def run_ck_metrics(tag):
+@TRACER.traced('ck')
+def run_ck_metrics(tag, repo_path, log=None):
     """
     Executa a ferramenta CK nas fontes do projeto e gera um CSV com as métricas.
     O CSV será salvo em "CK_OUTPUT_DIR/<tag>/ck_metrics.csv".
     """
-    print(f'[7/7] Executando CK metrics para a tag "{tag}"…')
-    output_dir = os.path.join(CK_OUTPUT_DIR, tag)
+    log_message(f'[7/7] Executando CK metrics para a tag "{tag}"…', log)
+    output_dir = ck_output_dir(tag)
     os.makedirs(output_dir, exist_ok=True)
     output_csv = os.path.join(output_dir, 'ck_metrics.csv')
 
     # A forma de invocação do CK varia conforme a versão.
     # Abaixo supõe-se que o jar do CK aceita parâmetros "--project" (pasta do projeto)
     # e "--output" (arquivo CSV de saída). Ajuste se sua versão usar flags diferentes.
-    cmd = [
-        'java', '-jar', CK_METRICS_JAR,
-        f'{LOCAL_REPO_PATH}/src/main/java/org/traccar',
-        'true', '0', 'true',
+    args = [
+        os.path.join(repo_path, CK_SOURCE_DIR),
+        *CK_FLAGS,
          output_csv
     ]
-    subprocess.run(cmd, check=True)
-    print(f'    → CK metrics gerado em "{output_csv}"')
+    run_java_tool('ck', CK_METRICS_JAR, args, ['java', '-jar', CK_METRICS_JAR, *args], log)
+    log_message(f'    → CK metrics gerado em "{output_csv}"', log)
 
 
-def main():
-    # 1) Clonar ou atualizar o repositório
-    clone_or_update_repo()
+def process_tag(tag, prev_tag, stages, repo_path=None, log=None, cache=None):
+    """
+    Roda build e as etapas selecionadas para uma tag já disponível em repo_path.
+    O build só acontece se alguma etapa precisar do jar compilado.
+    Cada etapa concluída é guardada no cache, então uma execução que falhar
+    depois retoma a partir da última etapa completa.
+    """
+    repo_path = repo_path or LOCAL_REPO_PATH
+    # 4) Build do projeto (ignorando testes)
+    if stages_need(stages, 'jar'):
+        with TRACER.span('build', tag):
+            build_project(repo_path, log)
 
-    # 2) Obter as últimas 20 tags
-    tags = get_last_n_tags(19)
+    # 5) Rodar SpotBugs + FindSecBugs
+    if 'spotbugs' in stages:
+        mode = run_spotbugs(tag, repo_path, log, prev_tag)
+        store_stage(cache, 'spotbugs', tag, prev_tag, mode)
 
-    prev_tag = None
-    for tag in tags:
+    # 6) Rodar RefactoringMiner comparando com a tag anterior
+    if prev_tag and 'refactoringminer' in stages:
+        run_refactoringminer(prev_tag, tag, log)
+        store_stage(cache, 'refactoringminer', tag, prev_tag)
+
+    # 7) Rodar CK Metrics
+    if 'ck' in stages:
+        run_ck_metrics(tag, repo_path, log)
+        store_stage(cache, 'ck', tag, prev_tag)
+
+
+def process_tag_isolated(tag, prev_tag, stages, cache=None, log_name=None):
+    """
+    Versão de process_tag para o modo paralelo: cria um worktree próprio para a tag
+    e grava toda a saída em "LOGS_DIR/<log_name ou tag>.log".
+    """
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    log_path = os.path.join(LOGS_DIR, f'{log_name or tag}.log')
+    with open(log_path, 'w', encoding='utf-8') as log:
+        stages = pending_stages(tag, prev_tag, stages, cache, log)
+        if not stages:
+            return log_path
+        if not stages_need(stages, 'sources'):
+            # só histórico (RefactoringMiner): não precisa de worktree
+            process_tag(tag, prev_tag, stages, LOCAL_REPO_PATH, log, cache)
+            return log_path
+        worktree = create_worktree(tag, log)
         try:
-            # 3) Checkout na tag atual
-            checkout_tag(tag)
+            process_tag(tag, prev_tag, stages, worktree, log, cache)
+        finally:
+            remove_worktree(worktree)
+    return log_path
 
-            # 4) Build do projeto (ignorando testes)
-            build_project()
 
-            # 5) Rodar SpotBugs + FindSecBugs
-            # run_spotbugs(tag)
+def run_sequential(tags, stages, cache=None):
+    """
+    Modo original: uma tag por vez no checkout único em LOCAL_REPO_PATH.
+    """
+    prev_tag = None
+    for tag in tags:
+        try:
+            tag_stages = pending_stages(tag, prev_tag, stages, cache)
+            if tag_stages:
+                # 3) Checkout na tag atual (só se alguma etapa lê os fontes)
+                if stages_need(tag_stages, 'sources'):
+                    checkout_tag(tag)
 
-            # 6) Rodar RefactoringMiner comparando com a tag anterior
-            if prev_tag:
-                run_refactoringminer(prev_tag, tag)
-            #
-            # # 7) Rodar CK Metrics
-            # run_ck_metrics(tag)
+                process_tag(tag, prev_tag, tag_stages, cache=cache)
 
             # Atualiza prev_tag para a próxima iteração
             prev_tag = tag
@@ -199,5 +803,550 @@ def main():
             sys.exit(1)
 
 
+def run_parallel(tags, stages, jobs, cache=None):
+    """
+    Modo paralelo: cada tag roda em seu próprio worktree, com no máximo `jobs`
+    tags sendo processadas ao mesmo tempo. A saída de cada tag vai para
+    "LOGS_DIR/<tag>.log".
+    """
+    print(f'[3/7] Processando {len(tags)} tags com {jobs} workers (logs em "{LOGS_DIR}/")…')
+    failed = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(process_tag_isolated, tag, prev_tag, stages, cache): tag
+            for prev_tag, tag in zip([None] + tags[:-1], tags)
+        }
+        for future in as_completed(futures):
+            tag = futures[future]
+            try:
+                log_path = future.result()
+                print(f'    → Tag "{tag}" finalizada (log em "{log_path}")')
+            except subprocess.CalledProcessError as e:
+                print(f'ERRO na tag "{tag}": comando retornou código {e.returncode}.')
+                print(f'      Comando: {" ".join(e.cmd)}')
+                failed.append(tag)
+
+    if failed:
+        print(f'ERRO: {len(failed)} tag(s) falharam: {failed}')
+        sys.exit(1)
+
+
+# ----------------------------
+#  MODO DAG (--dag)
+# ----------------------------
+
+def run_logged(name, func, *args):
+    """
+    Executa func(*args, log) gravando a saída em "LOGS_DIR/<name>.log".
+    """
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    with open(os.path.join(LOGS_DIR, f'{name}.log'), 'w', encoding='utf-8') as log:
+        return func(*args, log)
+
+
+def dag_prepare(tag, stages, worktrees, log):
+    """
+    Cria o worktree da tag e, se alguma etapa precisar do jar, builda o projeto.
+    """
+    worktrees[tag] = create_worktree(tag, log)
+    if stages_need(stages, 'jar'):
+        with TRACER.span('build', tag):
+            build_project(worktrees[tag], log)
+
+
+def dag_stage(stage, tag, prev_tag, worktrees, cache, log):
+    """
+    Roda uma etapa de análise e guarda a saída no cache.
+    """
+    mode = 'full'
+    if stage == 'spotbugs':
+        mode = run_spotbugs(tag, worktrees[tag], log, prev_tag)
+    elif stage == 'refactoringminer':
+        run_refactoringminer(prev_tag, tag, log)
+    elif stage == 'ck':
+        run_ck_metrics(tag, worktrees[tag], log)
+    store_stage(cache, stage, tag, prev_tag, mode)
+
+
+def dag_cleanup(tag, worktrees):
+    path = worktrees.pop(tag, None)
+    if path:
+        remove_worktree(path)
+
+
+@TRACER.traced('post-process')
+def run_script(script, args, log):
+    """
+    Roda um script de scripts/ com o mesmo interpretador, a partir da pasta dele.
+    """
+    run_command([sys.executable, script, *args], cwd=SCRIPTS_DIR, log=log)
+
+
+def build_dag(tags, stages, cache, scheduler, post_process=False, rm_batched=False):
+    """
+    Monta as tasks de todas as tags no escalonador. Cada etapa declara as saídas
+    que produz (os mesmos caminhos do cache de artefatos) e os scripts de pós-
+    processamento declaram essas saídas como entradas, então começam assim que
+    os arquivos de que precisam ficam prontos.
+    """
+    worktrees = {}
+    outputs = {stage: {} for stage in STAGES}
+    for prev_tag, tag in zip([None] + tags[:-1], tags):
+        for stage in stages:
+            entry = stage_cache_entry(stage, tag, prev_tag)
+            if entry is not None:
+                outputs[stage][tag] = os.path.normpath(entry[1][0])
+
+        tag_stages = [s for s in stages if not (rm_batched and s == 'refactoringminer')]
+        pending = pending_stages(tag, prev_tag, tag_stages, cache)
+        local = [stage for stage in pending if 'sources' in STAGE_REQUIREMENTS[stage]]
+        prepare = f'prepare-{tag}'
+        if local:
+            resources = {'jvm': 1, 'heap_mb': JVM_HEAP_MB['build']} if stages_need(local, 'jar') else {}
+            scheduler.add(Task(prepare, run_logged, (prepare, dag_prepare, tag, local, worktrees),
+                               outputs=[prepare], resources=resources))
+        for stage in pending:
+            name = f'{stage}-{tag}'
+            inputs = [prepare] if stage in local else []
+            if stage == 'spotbugs' and SPOTBUGS_INCREMENTAL and prev_tag:
+                # espera o XML da tag anterior, do qual herda os bugs
+                inputs.append(outputs['spotbugs'][prev_tag])
+            scheduler.add(Task(
+                name, run_logged, (name, dag_stage, stage, tag, prev_tag, worktrees, cache),
+                inputs=inputs,
+                outputs=[outputs[stage][tag]],
+                resources={'jvm': 1, 'heap_mb': JVM_HEAP_MB[stage]},
+            ))
+        if local:
+            scheduler.add(Task(f'cleanup-{tag}', dag_cleanup, (tag, worktrees),
+                               after=[f'{stage}-{tag}' for stage in local], always=True))
+
+    if rm_batched and 'refactoringminer' in stages:
+        missing = [
+            refactoring_output_path(prev_tag, tag) for prev_tag, tag in zip(tags[:-1], tags[1:])
+            if pending_stages(tag, prev_tag, ['refactoringminer'], cache)
+        ]
+        if missing:
+            name = 'refactoringminer-batch'
+            scheduler.add(Task(name, run_logged, (name, run_refactoringminer_batched, tags, cache),
+                               outputs=[os.path.normpath(p) for p in missing],
+                               resources={'jvm': 1, 'heap_mb': JVM_HEAP_MB['refactoringminer']}))
+
+    if not post_process:
+        return
+
+    def add_script(name, script, args, inputs):
+        scheduler.add(Task(name, run_logged, (name, run_script, script, args), inputs=inputs))
+
+    spotbugs_xml = outputs['spotbugs']
+    refactoring_json = list(outputs['refactoringminer'].values())
+    if spotbugs_xml and refactoring_json:
+        # JSONs dos intervalos que terminam ou começam na tag (chaveados pela tag final)
+        prev_of = dict(zip(tags[1:], tags[:-1]))
+        for tag, xml in spotbugs_xml.items():
+            jsons = [j for end, j in outputs['refactoringminer'].items() if tag in (end, prev_of.get(end))]
+            if jsons:
+                add_script(f'normalize_outputs-{tag}', 'normalize_outputs.py',
+                           ['--version', tag.removeprefix('v')], [xml] + jsons)
+    if spotbugs_xml:
+        add_script('analyze_spotbugs_data', 'analyze_spotbugs_data.py', [], list(spotbugs_xml.values()))
+    if refactoring_json:
+        add_script('normalize_refactoring', 'normalize_refactoring.py', [], refactoring_json)
+        add_script('analyze_refactoring_miner_data', 'analyze_refactoring_miner_data.py', [], refactoring_json)
+    if outputs['ck']:
+        add_script('extract-metrics-ck', 'extract-metrics-ck.py', [], list(outputs['ck'].values()))
+
+
+def run_dag(tags, stages, cache, workers, max_jvms, max_heap_mb, post_process=False, rm_batched=False):
+    """
+    Modo --dag: etapas independentes (ex.: RefactoringMiner de (a,b) e CK de b)
+    rodam ao mesmo tempo, limitadas por workers, número de JVMs e heap total.
+    """
+    scheduler = Scheduler(workers, {'jvm': max_jvms, 'heap_mb': max_heap_mb})
+    build_dag(tags, stages, cache, scheduler, post_process, rm_batched)
+    print(f'[3/7] Executando {len(scheduler.tasks)} tasks com {workers} workers '
+          f'(até {max_jvms} JVMs / {max_heap_mb} MB; logs em "{LOGS_DIR}/")…')
+    status, errors = scheduler.run()
+    for name, exc in errors.items():
+        if isinstance(exc, subprocess.CalledProcessError):
+            print(f'ERRO em "{name}": comando retornou código {exc.returncode}.')
+            print(f'      Comando: {" ".join(exc.cmd)}')
+        else:
+            print(f'ERRO em "{name}": {exc!r}')
+    if errors:
+        skipped = [name for name, st in status.items() if st == 'skipped']
+        print(f'ERRO: {len(errors)} task(s) falharam, {len(skipped)} não rodaram.')
+        sys.exit(1)
+
+
+# ----------------------------
+#  FILA DE JOBS (--enqueue / --worker)
+# ----------------------------
+
+def queue_jobs(tags, stages):
+    """
+    Jobs (key, payload) da varredura: um por tag com as etapas que leem os
+    fontes (SpotBugs, CK) e um por intervalo com o RefactoringMiner.
+    """
+    local = [stage for stage in stages if 'sources' in STAGE_REQUIREMENTS[stage]]
+    jobs = []
+    for prev_tag, tag in zip([None] + tags[:-1], tags):
+        if local:
+            jobs.append((f'tag:{tag}:{"+".join(sorted(local))}',
+                         {'tag': tag, 'prev_tag': prev_tag, 'stages': local, 'log': tag}))
+        if prev_tag and 'refactoringminer' in stages:
+            jobs.append((f'interval:{prev_tag}..{tag}',
+                         {'tag': tag, 'prev_tag': prev_tag, 'stages': ['refactoringminer'],
+                          'log': f'{prev_tag}_to_{tag}'}))
+    return jobs
+
+
+def heartbeat_loop(queue, job, worker, stop):
+    """
+    Renova o lease do job a cada terço do lease até o job terminar.
+    """
+    while not stop.wait(queue.lease_seconds / 3):
+        try:
+            if not queue.heartbeat(job, worker):
+                print(f'Aviso: {worker} perdeu o lease do job "{job.key}"')
+                return
+        except sqlite3.Error as e:
+            # fila ocupada ou indisponível por um momento: tenta de novo no próximo ciclo
+            print(f'Aviso: heartbeat do job "{job.key}" falhou: {e}')
+
+
+def worker_loop(queue, worker, cache):
+    """
+    Pega e roda jobs até a fila não ter mais jobs pendentes nem rodando (jobs de
+    outros workers ainda podem voltar para a fila se o lease deles expirar).
+    Retorna quantos jobs este worker concluiu.
+    """
+    done = 0
+    while True:
+        job = queue.claim(worker)
+        if job is None:
+            counts = queue.counts()
+            if not counts.get(job_queue.PENDING) and not counts.get(job_queue.RUNNING):
+                return done
+            time.sleep(QUEUE_POLL_SECONDS)
+            continue
+
+        payload = job.payload
+        print(f'    → {worker}: job "{job.key}" (tentativa {job.attempts})')
+        stop = threading.Event()
+        beat = threading.Thread(target=heartbeat_loop, args=(queue, job, worker, stop), daemon=True)
+        beat.start()
+        try:
+            log_path = process_tag_isolated(payload['tag'], payload['prev_tag'], payload['stages'],
+                                            cache, payload['log'])
+        except KeyboardInterrupt:
+            queue.release(job, worker)
+            raise
+        except Exception as e:
+            if isinstance(e, subprocess.CalledProcessError):
+                error = f'comando retornou código {e.returncode}: {" ".join(map(str, e.cmd))}'
+            else:
+                error = repr(e)
+            queue.fail(job, worker, error)
+            print(f'ERRO no job "{job.key}": {error}')
+        else:
+            queue.complete(job, worker)
+            done += 1
+            print(f'    → Job "{job.key}" finalizado (log em "{log_path}")')
+        finally:
+            stop.set()
+            beat.join()
+
+
+def enqueue_sweep(tags, stages, queue):
+    jobs = queue_jobs(tags, stages)
+    added = queue.enqueue(jobs)
+    print(f'[3/7] {added} de {len(jobs)} jobs enfileirados em "{queue.path}" '
+          f'(os demais já estavam na fila); estado: {queue.counts()}')
+
+
+def queue_path(args):
+    return args.queue or os.path.join(args.output_root or '', job_queue.QUEUE_FILE)
+
+
+def run_worker(args, queue):
+    """
+    Modo --worker: roda jobs da fila com --jobs threads até a varredura acabar.
+    Vários workers (processos ou máquinas com a mesma pasta compartilhada) podem
+    usar a mesma fila; o repositório já precisa ter sido clonado pelo --enqueue.
+    """
+    if not os.path.isdir(LOCAL_REPO_PATH):
+        print(f'ERRO: repositório "{LOCAL_REPO_PATH}" não existe; rode main.py --enqueue antes.')
+        sys.exit(1)
+    cache = None if args.no_cache else ArtifactCache(ARTIFACT_CACHE_DIR)
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    print(f'[3/7] Worker {name} com {args.jobs} thread(s) na fila "{queue.path}"…')
+    workers = [f'{name}:{i}' for i in range(args.jobs)]
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        done = sum(pool.map(lambda worker: worker_loop(queue, worker, cache), workers))
+
+    print(f'    → {done} job(s) concluídos por este worker; fila: {queue.counts()}')
+    failures = queue.failures()
+    if failures:
+        for key, error in failures:
+            print(f'ERRO: job "{key}" falhou: {error}')
+        sys.exit(1)
+
+
+# ----------------------------
+#  MODO MULTI-REPOSITÓRIO (--manifest)
+# ----------------------------
+
+def configure_repository(args):
+    """
+    Aplica os argumentos de repositório (--repo-url, --repo-path, --output-root,
+    --reference, --build-cmd, --jar, --source-dir, --java-source-root) aos globais
+    usados pelas etapas.
+    Com --output-root, todas as saídas (e o clone, se --repo-path não for dado)
+    ficam dentro dessa pasta.
+    """
+    global REPO_URL, LOCAL_REPO_PATH, REPO_REFERENCE, BUILD_CMD, SPOTBUGS_TARGET, CK_SOURCE_DIR
+    global JAVA_SOURCE_ROOT
+    global CK_OUTPUT_DIR, SPOTBUGS_OUTPUT_DIR, REFACTORING_MINER_OUTPUT_DIR, WORKTREES_DIR, LOGS_DIR
+    global ARTIFACT_CACHE_DIR
+    REPO_URL = args.repo_url
+    REPO_REFERENCE = args.reference
+    if args.build_cmd:
+        BUILD_CMD = shlex.split(args.build_cmd)
+    if args.jar:
+        SPOTBUGS_TARGET = args.jar
+    if args.source_dir:
+        CK_SOURCE_DIR = args.source_dir
+    if args.java_source_root:
+        JAVA_SOURCE_ROOT = args.java_source_root.strip('/') + '/'
+    if args.output_root:
+        root = args.output_root
+        LOCAL_REPO_PATH = os.path.join(root, 'repo')
+        CK_OUTPUT_DIR = os.path.join(root, CK_OUTPUT_DIR)
+        SPOTBUGS_OUTPUT_DIR = os.path.join(root, SPOTBUGS_OUTPUT_DIR)
+        REFACTORING_MINER_OUTPUT_DIR = os.path.join(root, REFACTORING_MINER_OUTPUT_DIR)
+        WORKTREES_DIR = os.path.join(root, WORKTREES_DIR)
+        LOGS_DIR = os.path.join(root, LOGS_DIR)
+        ARTIFACT_CACHE_DIR = os.path.join(root, ARTIFACT_CACHE_DIR)
+    if args.repo_path:
+        LOCAL_REPO_PATH = args.repo_path
+
+
+def run_repo_step(step, name, log_path, cmd):
+    """
+    Roda um passo (espelhamento no store ou pipeline) de um repositório do
+    manifesto, com a saída em log_path.
+    """
+    with TRACER.span(step, name), open(log_path, 'w', encoding='utf-8') as log:
+        run_command(cmd, log=log)
+
+
+def run_manifest(args):
+    """
+    Modo --manifest: roda o pipeline de cada repositório do manifesto em um
+    processo próprio, com no máximo --jobs workers ocupados ao mesmo tempo no
+    total (cada repositório ocupa os "jobs" dele). Os fetches para o object
+    store compartilhado rodam um por vez, antes do clone de cada repositório.
+    """
+    try:
+        repos = multi_repo.load_manifest(args.manifest)
+        child_args = {}
+        for repo in repos:
+            child_args[repo.name] = multi_repo.repo_args(repo, args.object_store)
+            # valida as opções de cada repositório antes de rodar qualquer um
+            try:
+                parse_args(child_args[repo.name])
+            except SystemExit:
+                raise ValueError(f'opções inválidas para "{repo.name}": {repo.options}')
+    except (OSError, ValueError) as e:
+        print(f'ERRO no manifesto: {e}')
+        sys.exit(1)
+
+    store = multi_repo.ensure_object_store(args.object_store)
+    # uma thread a mais para o fetch no store não esperar os pipelines
+    scheduler = Scheduler(args.jobs + 1, {'workers': args.jobs, 'store': 1})
+    for repo in repos:
+        out_dir = multi_repo.repo_output_dir(repo.name)
+        os.makedirs(out_dir, exist_ok=True)
+        mirror = f'mirror-{repo.name}'
+        scheduler.add(Task(
+            mirror, run_repo_step,
+            ('mirror', repo.name, os.path.join(out_dir, 'mirror.log'),
+             multi_repo.store_fetch_command(store, repo)),
+            outputs=[mirror], resources={'store': 1},
+        ))
+        jobs = min(int(repo.options.get('jobs', 1)), args.jobs)
+        cmd = [sys.executable, os.path.abspath(__file__), *child_args[repo.name]]
+        scheduler.add(Task(
+            f'pipeline-{repo.name}', run_repo_step,
+            ('pipeline', repo.name, os.path.join(out_dir, 'pipeline.log'), cmd),
+            inputs=[mirror], resources={'workers': jobs},
+        ))
+
+    print(f'[manifesto] {len(repos)} repositórios com até {args.jobs} workers '
+          f'(saídas em "{multi_repo.REPOS_DIR}/<nome>/", object store em "{store}")…')
+    status, errors = scheduler.run()
+    for repo in repos:
+        step = 'mirror' if f'mirror-{repo.name}' in errors else 'pipeline'
+        state = 'FALHOU' if f'{step}-{repo.name}' in errors else 'ok'
+        log_path = os.path.join(multi_repo.repo_output_dir(repo.name), f'{step}.log')
+        print(f'    {repo.name:<30} {state} (log em "{log_path}")')
+    if errors:
+        print(f'ERRO: {len(errors)} repositório(s) falharam.')
+        sys.exit(1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Coleta SpotBugs, RefactoringMiner e CK para as últimas releases.')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='número de tags processadas em paralelo (cada uma em um worktree próprio); '
+                             'com --manifest, limite global de workers somando todos os repositórios')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=['refactoringminer'],
+                        help='etapas de análise a executar para cada tag')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignora o cache de artefatos e refaz todas as etapas')
+    parser.add_argument('--tags', type=int, default=19,
+                        help='quantidade de releases (tags) mais recentes a analisar')
+    parser.add_argument('--semver-only', action='store_true',
+                        help='considera apenas tags no formato [v]MAJOR.MINOR[.PATCH]')
+    parser.add_argument('--min-version', type=version_arg, help='menor versão aceita (inclusiva), ex: 5.3')
+    parser.add_argument('--max-version', type=version_arg, help='maior versão aceita (inclusiva), ex: 6.7.2')
+    parser.add_argument('--skip-prereleases', action='store_true',
+                        help='ignora tags de pré-release (ex.: 6.0-rc1, v5.3-beta)')
+    parser.add_argument('--dag', action='store_true',
+                        help='escalona as etapas em grafo de dependências, rodando as independentes ao mesmo tempo')
+    parser.add_argument('--max-jvms', type=int, default=2,
+                        help='(--dag) máximo de JVMs (Gradle, SpotBugs, CK, RefactoringMiner) simultâneas')
+    parser.add_argument('--max-heap-mb', type=int, default=8192,
+                        help='(--dag) soma máxima estimada de heap das JVMs simultâneas')
+    parser.add_argument('--post-process', action='store_true',
+                        help='(--dag) roda também os scripts de normalização/análise de scripts/')
+    parser.add_argument('--rm-batched', action='store_true',
+                        help='roda o RefactoringMiner uma única vez sobre todo o intervalo de tags '
+                             'e separa o resultado por par de tags')
+    parser.add_argument('--trace',
+                        help='arquivo JSON (formato Chrome trace) com tempo, CPU e memória de cada etapa '
+                             f'(padrão: LOGS_DIR/{TRACE_FILE})')
+    parser.add_argument('--spotbugs-incremental', action='store_true',
+                        help='reanalisa no SpotBugs só as classes alteradas (e dependentes) desde a tag '
+                             'anterior, reaproveitando o XML dela')
+    parser.add_argument('--acquire', choices=('full', 'partial'), default='full',
+                        help='"partial": clone sem o conteúdo dos arquivos (--filter=blob:none) e fetch só das '
+                             'tags que passam nos filtros; o servidor precisa aceitar filtros e pedidos de '
+                             'objetos avulsos (GitHub aceita; num bare local, uploadpack.allowFilter e '
+                             'uploadpack.allowAnySHA1InWant)')
+    parser.add_argument('--enqueue', action='store_true',
+                        help='em vez de rodar, grava os jobs (um por tag e um por intervalo) na fila --queue')
+    parser.add_argument('--worker', action='store_true',
+                        help='roda jobs da fila --queue (com --jobs threads) até a varredura acabar; '
+                             'vários workers podem dividir a mesma fila')
+    parser.add_argument('--queue', help=f'fila SQLite de jobs (padrão: {job_queue.QUEUE_FILE} em --output-root)')
+    parser.add_argument('--lease-seconds', type=int, default=job_queue.LEASE_SECONDS,
+                        help='(--worker) segundos sem heartbeat até o job de um worker parado voltar à fila')
+    parser.add_argument('--manifest',
+                        help='JSON com vários repositórios: roda o pipeline de cada um com saídas em '
+                             f'"{multi_repo.REPOS_DIR}/<nome>/" (formato em multi_repo.py)')
+    parser.add_argument('--object-store', default=multi_repo.OBJECT_STORE_DIR,
+                        help='(--manifest) repositório bare compartilhado com os objetos de todos os repositórios')
+    parser.add_argument('--repo-url', default=REPO_URL, help='URL (ou caminho) do repositório analisado')
+    parser.add_argument('--repo-path', help=f'onde clonar o repositório (padrão: "{LOCAL_REPO_PATH}", '
+                                            'ou "<output-root>/repo")')
+    parser.add_argument('--output-root', help='pasta onde ficam todas as saídas (padrão: pasta atual)')
+    parser.add_argument('--reference', help='repositório cujos objetos o clone reaproveita (git clone --reference)')
+    parser.add_argument('--build-cmd', help=f'comando de build (padrão: "{" ".join(BUILD_CMD)}")')
+    parser.add_argument('--jar', help=f'jar analisado pelo SpotBugs, relativo ao repositório '
+                                      f'(padrão: {SPOTBUGS_TARGET})')
+    parser.add_argument('--source-dir', help=f'pasta de fontes analisada pelo CK, relativa ao repositório '
+                                             f'(padrão: {CK_SOURCE_DIR})')
+    parser.add_argument('--java-source-root',
+                        help='raiz dos fontes Java (onde começam os pacotes), relativa ao repositório; usada '
+                             f'por --spotbugs-incremental para achar as classes alteradas (padrão: {JAVA_SOURCE_ROOT})')
+    parser.add_argument('--warm-jvm', action='store_true',
+                        help='roda SpotBugs e CK em JVMs de longa duração, uma por ferramenta (e por job '
+                             'simultâneo), em vez de um "java" novo por tag; o SpotBugs usa o jar '
+                             f'"{SPOTBUGS_JAR}"')
+    parser.add_argument('--jvm-max-jobs', type=int, default=jvm_runner.MAX_JOBS,
+                        help='(--warm-jvm) execuções por JVM antes de trocá-la por uma nova')
+    parser.add_argument('--jvm-recycle-heap-mb', type=int,
+                        help='(--warm-jvm) heap usado (após o GC) a partir do qual a JVM é trocada '
+                             f'(padrão: {int(jvm_runner.RECYCLE_HEAP_FRACTION * 100)}%% do -Xmx da ferramenta)')
+    return parser.parse_args(argv)
+
+
+def main():
+    global SPOTBUGS_INCREMENTAL, ACQUIRE_MODE, WARM_JVM
+    args = parse_args()
+    SPOTBUGS_INCREMENTAL = args.spotbugs_incremental
+    ACQUIRE_MODE = args.acquire
+    if args.warm_jvm:
+        WARM_JVM = jvm_runner.JvmPool(args.jvm_max_jobs, args.jvm_recycle_heap_mb)
+    configure_repository(args)
+    trace_path = args.trace or os.path.join(LOGS_DIR, TRACE_FILE)
+    if args.worker and not args.trace:
+        # um trace por worker: vários podem rodar na mesma pasta
+        trace_path = os.path.join(LOGS_DIR, f'trace-{socket.gethostname()}-{os.getpid()}.json')
+    try:
+        if args.manifest:
+            run_manifest(args)
+        elif args.worker:
+            run_worker(args, job_queue.JobQueue(queue_path(args), args.lease_seconds))
+        else:
+            run_pipeline(args)
+    finally:
+        if WARM_JVM is not None:
+            WARM_JVM.close()
+            print(f'JVMs aquecidas: {WARM_JVM.started} iniciada(s), {WARM_JVM.recycled} reciclada(s)')
+        # grava o trace mesmo quando uma etapa falha (sys.exit)
+        TRACER.write(trace_path)
+        print('\n' + TRACER.summary())
+        print(f'\nTrace gravado em "{trace_path}" (abrir em chrome://tracing ou ui.perfetto.dev)')
+
+
+def run_pipeline(args):
+    """
+    Executa o pipeline completo no modo escolhido pelos argumentos.
+    """
+    # 1) Clonar ou atualizar o repositório
+    clone_or_update_repo()
+    if ACQUIRE_MODE == 'partial':
+        fetch_candidate_tags(args.semver_only, args.min_version, args.max_version, args.skip_prereleases)
+
+    # 2) Obter as últimas tags
+    tags = get_last_n_tags(args.tags, args.semver_only, args.min_version,
+                           args.max_version, args.skip_prereleases)
+
+    if args.enqueue:
+        enqueue_sweep(tags, args.stages, job_queue.JobQueue(queue_path(args)))
+        return
+
+    cache = None if args.no_cache else ArtifactCache(ARTIFACT_CACHE_DIR)
+
+    post_process = args.post_process
+    if post_process and args.output_root:
+        # os scripts de scripts/ leem e gravam em caminhos fixos ("../spotbugs" etc.)
+        print('Aviso: --post-process é ignorado com --output-root')
+        post_process = False
+
+    if args.dag:
+        run_dag(tags, args.stages, cache, args.jobs, args.max_jvms, args.max_heap_mb,
+                post_process, args.rm_batched)
+        return
+
+    stages = args.stages
+    if args.rm_batched and 'refactoringminer' in stages:
+        try:
+            run_refactoringminer_batched(tags, cache)
+        except subprocess.CalledProcessError as e:
+            print(f'ERRO: comando retornou código {e.returncode}.')
+            print(f'      Comando: {" ".join(e.cmd)}')
+            sys.exit(1)
+        stages = [stage for stage in stages if stage != 'refactoringminer']
+
+    if args.jobs > 1:
+        run_parallel(tags, stages, args.jobs, cache)
+    else:
+        run_sequential(tags, stages, cache)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,146 @@
+"""
+Modo multi-repositório (main.py --manifest): roda o pipeline completo sobre vários
+repositórios listados em um manifesto JSON, com um limite global de workers.
+
+Formato do manifesto:
+    {
+      "defaults": {"stages": ["refactoringminer", "ck"], "tags": 10, "semver_only": true},
+      "repositories": [
+        {"name": "traccar", "url": "https://github.com/traccar/traccar.git"},
+        {"url": "/srv/git/outro-projeto.git", "jobs": 2, "dag": true,
+         "source_dir": "src/main/java", "jar": "build/libs/outro.jar",
+         "build_cmd": "./gradlew assemble"}
+      ]
+    }
+
+Cada chave (fora "name" e "url") vira o argumento de mesmo nome de main.py
+("semver_only": true -> --semver-only, "stages": [...] -> --stages a b); as do
+repositório sobrescrevem as de "defaults". O nome padrão é o da URL sem ".git".
+URLs que são caminhos locais (ex.: repositórios bare de teste) são relativas à
+pasta do manifesto. "jobs" é também quantos workers do limite global o
+repositório ocupa enquanto roda.
+
+Cada repositório roda em um processo main.py próprio, com todas as saídas em
+"REPOS_DIR/<nome>/" (clone em "repo/", spotbugs/, refactoring-miner/,
+ck_metrics_output/, logs/, worktrees/ e cache de artefatos). Antes do clone, o
+histórico é buscado para um repositório bare compartilhado (o object store), com
+as refs em "refs/repos/<nome>/"; o clone usa o store como --reference, então
+forks e repositórios com histórico em comum baixam e guardam cada objeto uma vez.
+Os clones dependem dos objetos do store: não apagar refs dele nem rodar
+"git gc --prune" depois de removê-las.
+"""
+import json
+import os
+import re
+import subprocess
+from collections import namedtuple
+
+# Pasta com uma subpasta de saídas por repositório
+REPOS_DIR = 'repos'
+
+# Repositório bare com os objetos de todos os repositórios do manifesto
+OBJECT_STORE_DIR = '.git-object-store'
+
+# Argumentos de main.py definidos pelo próprio modo manifesto
+RESERVED_OPTIONS = {'repo_url', 'repo_path', 'output_root', 'reference', 'manifest', 'object_store', 'trace'}
+
+REPO_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+RepoSpec = namedtuple('RepoSpec', ['name', 'url', 'options'])
+
+
+def repo_name(url):
+    """"https://github.com/traccar/traccar.git" -> "traccar"."""
+    name = url.rstrip('/').rsplit('/', 1)[-1].rsplit(':', 1)[-1]
+    return name[:-4] if name.endswith('.git') else name
+
+
+def load_manifest(path):
+    """
+    Lê o manifesto e retorna a lista de RepoSpec, na ordem do arquivo.
+    Levanta ValueError se o manifesto for inválido.
+    """
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {'repositories': manifest}
+    defaults = manifest.get('defaults', {})
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    repos = []
+    seen = set()
+    for entry in manifest.get('repositories', []):
+        if isinstance(entry, str):
+            entry = {'url': entry}
+        if 'url' not in entry:
+            raise ValueError(f'{path}: repositório sem "url": {entry}')
+        url = entry['url']
+        local = os.path.join(base_dir, url)
+        if '://' not in url and os.path.exists(local):
+            url = os.path.abspath(local)
+        name = entry.get('name') or repo_name(url)
+        if not REPO_NAME.match(name):
+            raise ValueError(f'{path}: nome de repositório inválido: {name!r}')
+        if name in seen:
+            raise ValueError(f'{path}: repositório "{name}" aparece mais de uma vez')
+        seen.add(name)
+
+        options = {**defaults, **{k: v for k, v in entry.items() if k not in ('name', 'url')}}
+        reserved = RESERVED_OPTIONS & set(options)
+        if reserved:
+            raise ValueError(f'{path}: "{name}" não pode definir {sorted(reserved)} (definidos pelo modo manifesto)')
+        repos.append(RepoSpec(name, url, options))
+    if not repos:
+        raise ValueError(f'{path}: nenhum repositório no manifesto')
+    return repos
+
+
+def option_args(options):
+    """{"semver_only": True, "stages": ["ck"], "tags": 5} -> argumentos de main.py."""
+    args = []
+    for key, value in options.items():
+        flag = '--' + key.replace('_', '-')
+        if value is True:
+            args.append(flag)
+        elif value is False or value is None:
+            continue
+        elif isinstance(value, list):
+            args += [flag, *map(str, value)]
+        else:
+            args += [flag, str(value)]
+    return args
+
+
+def repo_output_dir(name, repos_dir=REPOS_DIR):
+    return os.path.join(repos_dir, name)
+
+
+def repo_args(repo, store, repos_dir=REPOS_DIR):
+    """Argumentos de main.py para rodar o pipeline de um repositório do manifesto."""
+    return [
+        *option_args(repo.options),
+        '--repo-url', repo.url,
+        '--output-root', repo_output_dir(repo.name, repos_dir),
+        '--reference', store,
+    ]
+
+
+def ensure_object_store(path=OBJECT_STORE_DIR):
+    """Cria o repositório bare do object store se ainda não existir. Retorna o caminho absoluto."""
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        subprocess.run(['git', 'init', '--quiet', '--bare', path], check=True)
+    return path
+
+
+def store_fetch_command(store, repo):
+    """
+    Comando que traz branches e tags do repositório para o store, em
+    "refs/repos/<nome>/heads/*" e "refs/repos/<nome>/tags/*". Sem --no-tags o git
+    criaria "refs/tags/*" no store, e tags homônimas de forks entrariam em conflito.
+    """
+    prefix = f'refs/repos/{repo.name}'
+    return [
+        'git', '--git-dir', store, 'fetch', '--no-tags', '--force', repo.url,
+        f'+refs/heads/*:{prefix}/heads/*', f'+refs/tags/*:{prefix}/tags/*',
+    ]
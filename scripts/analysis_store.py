@@ -0,0 +1,329 @@
+"""
+Banco SQLite local com as saídas de CK, SpotBugs e RefactoringMiner de todas as releases.
+
+Tabelas (releases sempre sem o "v", ex.: "5.3"):
+  classes       -- class_id -> class_name, cópia do índice de class_index.py
+  ck_class      -- métricas CK por classe e release
+  ck_method     -- métricas CK por método e release
+  spotbugs      -- findings normalizados (mesmas colunas de normalize_outputs)
+  refactorings  -- uma linha por localização (lado left/right) de cada refatoração,
+                   com o intervalo from_release -> to_release
+  sources       -- arquivos já ingeridos (mtime/tamanho), para reingestão incremental
+  refactoring_counts (view) -- class, qtd_refactorings por intervalo, como normalize_refactoring
+
+Toda tabela tem class_id (classes internas/anônimas usam o ID da classe de nível
+superior) e as consultas cruzam as ferramentas por ele.
+
+Uso:
+    python analysis_store.py ingest
+    python analysis_store.py query rising-cbo --from 5.3 --to 5.4
+"""
+import argparse
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+from ck_columnar import CK_DIR, PARQUET_DIR, csv_path, parquet_path, read_ck_metrics
+from class_index import class_from_path, open_index
+from refactoring_reader import iter_refactorings
+from spotbugs_reader import iter_rows
+
+DB_PATH = '../analysis.db'
+SB_DIR = '../spotbugs'
+RF_DIR = '../refactoring-miner'
+
+CK_CLASS_COLUMNS = ['class', 'type', 'cbo', 'fanin', 'fanout', 'wmc', 'dit', 'noc', 'rfc', 'lcom', 'loc']
+CK_METHOD_COLUMNS = ['class', 'method', 'line', 'cbo', 'wmc', 'rfc', 'loc',
+                     'returnsqty', 'variablesqty', 'parametersqty', 'maxnestedblocksqty']
+
+# Incrementar ao mudar o SCHEMA: bancos antigos são recriados (e reingeridos)
+SCHEMA_VERSION = 2
+TABLES = ('classes', 'ck_class', 'ck_method', 'spotbugs', 'refactorings', 'sources')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classes (
+    class_id INTEGER PRIMARY KEY, class_name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ck_class (
+    release TEXT NOT NULL, class TEXT NOT NULL, type TEXT,
+    cbo INTEGER, fanin INTEGER, fanout INTEGER, wmc INTEGER, dit INTEGER,
+    noc INTEGER, rfc INTEGER, lcom INTEGER, loc INTEGER, class_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_ck_class_release_class ON ck_class (release, class_id);
+CREATE INDEX IF NOT EXISTS ix_ck_class_class ON ck_class (class_id);
+CREATE INDEX IF NOT EXISTS ix_ck_class_release_name ON ck_class (release, class);
+
+CREATE TABLE IF NOT EXISTS ck_method (
+    release TEXT NOT NULL, class TEXT NOT NULL, method TEXT, line INTEGER,
+    cbo INTEGER, wmc INTEGER, rfc INTEGER, loc INTEGER, returnsqty INTEGER,
+    variablesqty INTEGER, parametersqty INTEGER, maxnestedblocksqty INTEGER, class_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_ck_method_release_class ON ck_method (release, class_id);
+
+CREATE TABLE IF NOT EXISTS spotbugs (
+    release TEXT NOT NULL, class TEXT, bug_type TEXT, priority INTEGER, category TEXT,
+    sourcefile TEXT, sourcepath TEXT, start_line INTEGER, end_line INTEGER, class_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_spotbugs_release_class ON spotbugs (release, class_id);
+CREATE INDEX IF NOT EXISTS ix_spotbugs_class ON spotbugs (class_id);
+
+CREATE TABLE IF NOT EXISTS refactorings (
+    from_release TEXT NOT NULL, to_release TEXT NOT NULL, ref_id INTEGER NOT NULL,
+    commit_sha TEXT, refactoring_type TEXT, description TEXT,
+    side TEXT, file_path TEXT, class TEXT, class_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_refactorings_interval_class ON refactorings (from_release, to_release, class_id);
+CREATE INDEX IF NOT EXISTS ix_refactorings_to_class ON refactorings (to_release, class_id);
+CREATE INDEX IF NOT EXISTS ix_refactorings_class ON refactorings (class_id);
+
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY, mtime REAL NOT NULL, size INTEGER NOT NULL
+);
+
+CREATE VIEW IF NOT EXISTS refactoring_counts AS
+    SELECT from_release, to_release, class_id, class, COUNT(DISTINCT ref_id) AS qtd_refactorings
+    FROM refactorings GROUP BY from_release, to_release, class_id, class;
+"""
+
+RF_PATTERN = re.compile(r'refactoring_v?(?P<v1>[0-9]+(?:\.[0-9]+)*)_to_v?(?P<v2>[0-9]+(?:\.[0-9]+)*)\.json$')
+SB_PATTERN = re.compile(r'spotbugs_v?(?P<v>[0-9]+(?:\.[0-9]+)*)\.xml$')
+
+
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+        # esquema antigo: recria tudo; a próxima ingestão recarrega os arquivos
+        conn.execute('DROP VIEW IF EXISTS refactoring_counts')
+        for table in TABLES:
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _unchanged(conn, path):
+    """Mesmo mtime/tamanho da última ingestão; um arquivo ausente só é "igual" se não estava registrado."""
+    row = conn.execute('SELECT mtime, size FROM sources WHERE path = ?', (os.path.abspath(path),)).fetchone()
+    if not os.path.exists(path):
+        return row is None
+    st = os.stat(path)
+    return row is not None and row[0] == st.st_mtime and row[1] == st.st_size
+
+
+def _mark_ingested(conn, path):
+    if not os.path.exists(path):
+        conn.execute('DELETE FROM sources WHERE path = ?', (os.path.abspath(path),))
+        return
+    st = os.stat(path)
+    conn.execute('INSERT OR REPLACE INTO sources (path, mtime, size) VALUES (?, ?, ?)',
+                 (os.path.abspath(path), st.st_mtime, st.st_size))
+
+
+def _sync_classes(conn, index):
+    with conn:
+        conn.executemany('INSERT OR IGNORE INTO classes (class_id, class_name) VALUES (?, ?)',
+                         enumerate(index.names))
+
+
+def _ck_sources(release_dir, ck_dir, parquet_dir):
+    """Todos os arquivos que read_ck_metrics pode ler para a release (CSV e Parquet, classe e método)."""
+    return [path for granularity in ('class', 'method')
+            for path in (csv_path(release_dir, granularity, ck_dir),
+                         parquet_path(release_dir, granularity, parquet_dir))]
+
+
+def ingest_ck(conn, release_dir, index, ck_dir=CK_DIR, force=False, parquet_dir=PARQUET_DIR):
+    release = release_dir.lstrip('v')
+    sources = _ck_sources(release_dir, ck_dir, parquet_dir)
+    if not any(os.path.exists(p) for p in sources):
+        return False
+    if not force and all(_unchanged(conn, p) for p in sources):
+        return False
+    with conn:
+        conn.execute('DELETE FROM ck_class WHERE release = ?', (release,))
+        conn.execute('DELETE FROM ck_method WHERE release = ?', (release,))
+        for table, granularity, columns in (('ck_class', 'class', CK_CLASS_COLUMNS),
+                                            ('ck_method', 'method', CK_METHOD_COLUMNS)):
+            try:
+                df = read_ck_metrics(release_dir, granularity, columns=columns,
+                                     ck_dir=ck_dir, parquet_dir=parquet_dir)
+            except FileNotFoundError:
+                continue
+            df.insert(0, 'release', release)
+            df['class_id'] = index.ids(df['class'])
+            df.to_sql(table, conn, if_exists='append', index=False, chunksize=5000)
+        for path in sources:
+            _mark_ingested(conn, path)
+    return True
+
+
+def ingest_spotbugs(conn, xml_path, index, force=False):
+    m = SB_PATTERN.search(os.path.basename(xml_path))
+    if not m or (not force and _unchanged(conn, xml_path)):
+        return False
+    release = m.group('v')
+    with conn:
+        conn.execute('DELETE FROM spotbugs WHERE release = ?', (release,))
+        conn.executemany(
+            'INSERT INTO spotbugs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((release, r['class'], r['bug_type'], r['priority'], r['category'], r['sourcefile'],
+              r['sourcepath'], r['start_line'], r['end_line'],
+              None if r['class'] is None else index.id_of(r['class'])) for r in iter_rows(xml_path))
+        )
+        _mark_ingested(conn, xml_path)
+    return True
+
+
+def ingest_refactorings(conn, json_path, index, force=False):
+    m = RF_PATTERN.search(os.path.basename(json_path))
+    if not m or (not force and _unchanged(conn, json_path)):
+        return False
+    v1, v2 = m.group('v1'), m.group('v2')
+
+    def rows():
+        for ref_id, (sha, rf) in enumerate(iter_refactorings(json_path)):
+            for side in ('left', 'right'):
+                for loc in rf.get(f'{side}SideLocations', []):
+                    fp = loc.get('filePath', '')
+                    cls = class_from_path(fp)
+                    yield (v1, v2, ref_id, sha, rf.get('type'), rf.get('description'),
+                           side, fp, cls, index.id_of(cls))
+
+    with conn:
+        conn.execute('DELETE FROM refactorings WHERE from_release = ? AND to_release = ?', (v1, v2))
+        conn.executemany('INSERT INTO refactorings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows())
+        _mark_ingested(conn, json_path)
+    return True
+
+
+def ingest_all(conn, ck_dir=CK_DIR, sb_dir=SB_DIR, rf_dir=RF_DIR, force=False):
+    with open_index() as index:
+        for d in sorted(os.listdir(ck_dir)):
+            if os.path.isdir(os.path.join(ck_dir, d)) and ingest_ck(conn, d, index, ck_dir, force):
+                print(f'CK {d} ingerido')
+        for fname in sorted(os.listdir(sb_dir)):
+            if fname.endswith('.xml') and ingest_spotbugs(conn, os.path.join(sb_dir, fname), index, force):
+                print(f'SpotBugs {fname} ingerido')
+        for fname in sorted(os.listdir(rf_dir)):
+            if fname.endswith('.json') and ingest_refactorings(conn, os.path.join(rf_dir, fname), index, force):
+                print(f'RefactoringMiner {fname} ingerido')
+        _sync_classes(conn, index)
+    conn.execute('ANALYZE')
+
+
+# ----------------------------
+#  CONSULTAS
+# ----------------------------
+
+def intervals(conn):
+    """Intervalos (from_release, to_release) presentes no banco."""
+    return conn.execute('SELECT DISTINCT from_release, to_release FROM refactorings').fetchall()
+
+
+def refactorings_with_bugs(conn, v1, v2):
+    """Equivalente SQL do merge de analyze_heavy: class, qtd_refactorings, bugs_<v1>, bugs_<v2>."""
+    sql = f"""
+        WITH b1 AS (SELECT class_id, COUNT(*) AS n FROM spotbugs WHERE release = :v1 GROUP BY class_id),
+             b2 AS (SELECT class_id, COUNT(*) AS n FROM spotbugs WHERE release = :v2 GROUP BY class_id)
+        SELECT r.class, r.qtd_refactorings, b1.n AS "bugs_{v1}", b2.n AS "bugs_{v2}"
+        FROM refactoring_counts r
+        JOIN b1 ON b1.class_id = r.class_id
+        JOIN b2 ON b2.class_id = r.class_id
+        WHERE r.from_release = :v1 AND r.to_release = :v2
+        ORDER BY r.qtd_refactorings DESC, r.class
+    """
+    return pd.read_sql_query(sql, conn, params={'v1': v1, 'v2': v2})
+
+
+def ck_refactorings(conn, v):
+    """Equivalente SQL do primeiro CSV de data_analysis: classes do CK da release com
+    refactoring_count e a lista de tipos. Como em normalize_outputs, usa o lado direito
+    das refatorações de todo intervalo que começa ou termina em v.
+    """
+    sql = """
+        WITH rf AS (
+            SELECT class_id, refactoring_type FROM refactorings
+            WHERE side = 'right' AND (from_release = :v OR to_release = :v)
+              AND class_id IN (SELECT class_id FROM ck_class WHERE release = :v)
+        ), types AS (
+            SELECT DISTINCT class_id, refactoring_type FROM rf ORDER BY class_id, refactoring_type
+        )
+        SELECT k.class_name AS class, c.refactoring_count, t.refactorings
+        FROM (SELECT class_id, COUNT(*) AS refactoring_count FROM rf GROUP BY class_id) c
+        JOIN (SELECT class_id, GROUP_CONCAT(refactoring_type, ';') AS refactorings
+              FROM types GROUP BY class_id) t ON t.class_id = c.class_id
+        JOIN classes k ON k.class_id = c.class_id
+        ORDER BY k.class_name
+    """
+    return pd.read_sql_query(sql, conn, params={'v': v})
+
+
+def bugs_by_class(conn, v):
+    """bug_count e bug_types por classe da release (segundo CSV de data_analysis)."""
+    sql = """
+        WITH types AS (
+            SELECT DISTINCT class_id, bug_type FROM spotbugs WHERE release = :v ORDER BY class_id, bug_type
+        )
+        SELECT k.class_name AS class, c.bug_count, t.bug_types
+        FROM (SELECT class_id, COUNT(*) AS bug_count FROM spotbugs WHERE release = :v GROUP BY class_id) c
+        JOIN (SELECT class_id, GROUP_CONCAT(bug_type, ';') AS bug_types FROM types GROUP BY class_id) t
+          ON t.class_id = c.class_id
+        JOIN classes k ON k.class_id = c.class_id
+    """
+    return pd.read_sql_query(sql, conn, params={'v': v})
+
+
+def rising_cbo_new_bugs(conn, v1, v2):
+    """Classes cujo CBO subiu de v1 para v2 e que ganharam bugs no mesmo intervalo.
+    Só classes de nível superior: os bugs das internas contam para a externa.
+    """
+    sql = """
+        WITH b AS (
+            SELECT release, class_id, COUNT(*) AS n FROM spotbugs
+            WHERE release IN (:v1, :v2) GROUP BY release, class_id
+        )
+        SELECT c2.class, c1.cbo AS cbo_before, c2.cbo AS cbo_after,
+               COALESCE(b1.n, 0) AS bugs_before, b2.n AS bugs_after
+        FROM ck_class c2
+        JOIN ck_class c1 ON c1.class = c2.class AND c1.release = :v1
+        JOIN b b2 ON b2.class_id = c2.class_id AND b2.release = :v2
+        LEFT JOIN b b1 ON b1.class_id = c2.class_id AND b1.release = :v1
+        WHERE c2.release = :v2 AND instr(c2.class, '$') = 0
+          AND c2.cbo > c1.cbo AND b2.n > COALESCE(b1.n, 0)
+        ORDER BY c2.cbo - c1.cbo DESC
+    """
+    return pd.read_sql_query(sql, conn, params={'v1': v1, 'v2': v2})
+
+
+QUERIES = {
+    'rising-cbo': rising_cbo_new_bugs,
+    'refactorings-bugs': refactorings_with_bugs,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(__doc__)
+    parser.add_argument('--db', default=DB_PATH, help='caminho do banco SQLite')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_ingest = sub.add_parser('ingest', help='carrega CK, SpotBugs e RefactoringMiner no banco')
+    p_ingest.add_argument('--force', action='store_true', help='reingere mesmo arquivos sem alteração')
+    p_query = sub.add_parser('query', help='executa uma consulta entre duas releases')
+    p_query.add_argument('name', choices=sorted(QUERIES))
+    p_query.add_argument('--from', dest='v1', required=True, help='release inicial, ex: 5.3')
+    p_query.add_argument('--to', dest='v2', required=True, help='release final, ex: 5.4')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == 'ingest':
+        ingest_all(conn, force=args.force)
+    else:
+        df = QUERIES[args.name](conn, args.v1, args.v2)
+        print(df.to_string(index=False))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
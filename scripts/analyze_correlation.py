@@ -0,0 +1,263 @@
+"""
+Correlação entre refatorações e variação de bugs por classe, por intervalo e no
+painel agregado.
+
+Lê os merges de analyze_heavy / build_panel (merged_refactorings_spotbugs_<v1>_to_<v2>.csv,
+colunas class, qtd_refactorings, bugs_<v1>, bugs_<v2>) e calcula, entre
+qtd_refactorings e delta_bugs = bugs_<v2> - bugs_<v1>:
+  - Spearman (rho) e Kendall (tau-b), com empates pela média dos postos;
+  - intervalo de confiança por bootstrap (percentil) das duas estatísticas;
+  - p-valor bicaudal por permutação (delta_bugs embaralhado entre as classes).
+"pooled" junta as linhas de todos os intervalos (cada linha conta como uma observação).
+
+As réplicas são calculadas em blocos, como operações de matriz, sem laço por réplica:
+  - bootstrap: cada réplica é um vetor de pesos multinomiais sobre as linhas
+    originais; postos, Spearman ponderado e tau-b (forma quadrática pesos x sinais
+    dos pares) saem dos pesos, sem montar as amostras reamostradas;
+  - permutação: os postos não mudam, só são reordenados por índices de permutação.
+Cada bloco tem a sua semente (SeedSequence.spawn), então o resultado é o mesmo com
+qualquer número de processos (--workers).
+
+Uso:
+    python analyze_correlation.py
+    python analyze_correlation.py --resamples 10000 --workers 4 --seed 42
+"""
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+MERGED_DIR = '../merged_spotbugs_refactoring_miner'
+OUTPUT_PATH = '../correlation_refactorings_bugs.csv'
+
+N_RESAMPLES = 10_000
+# réplicas por bloco (cada bloco é uma tarefa do pool)
+BATCH_SIZE = 1_000
+CONFIDENCE = 0.95
+# limite de células (réplicas x pares) das matrizes da permutação do Kendall
+MAX_PAIR_CELLS = 20_000_000
+
+POOLED = 'pooled'
+
+MERGED_PATTERN = re.compile(
+    r'merged_refactorings_spotbugs_(?P<v1>[0-9]+(?:\.[0-9]+)*)_to_(?P<v2>[0-9]+(?:\.[0-9]+)*)\.csv$')
+
+
+def version_key(v):
+    return tuple(int(p) for p in v.lstrip('v').split('.'))
+
+
+def load_intervals(merged_dir=MERGED_DIR):
+    """[(from_release, to_release, qtd_refactorings, delta_bugs)] em ordem de versão."""
+    intervals = []
+    for fname in os.listdir(merged_dir):
+        m = MERGED_PATTERN.match(fname)
+        if not m:
+            continue
+        v1, v2 = m.group('v1'), m.group('v2')
+        df = pd.read_csv(os.path.join(merged_dir, fname))
+        x = df['qtd_refactorings'].to_numpy(dtype=float)
+        y = (df[f'bugs_{v2}'] - df[f'bugs_{v1}']).to_numpy(dtype=float)
+        intervals.append((v1, v2, x, y))
+    intervals.sort(key=lambda iv: (version_key(iv[1]), version_key(iv[0])))
+    return intervals
+
+
+def _groups(values):
+    """Índice do grupo de empate (valores distintos em ordem crescente) e a matriz indicadora."""
+    _, inverse = np.unique(values, return_inverse=True)
+    inverse = inverse.ravel()
+    onehot = np.zeros((len(values), inverse.max() + 1))
+    onehot[np.arange(len(values)), inverse] = 1
+    return inverse, onehot
+
+
+def _weighted_ranks(weights, groups, onehot):
+    """
+    Postos médios de cada linha original em cada réplica (linhas de weights) e o
+    peso de cada grupo de empate. Uma linha com peso w aparece w vezes na réplica,
+    sempre empatada consigo mesma.
+    """
+    sizes = weights @ onehot
+    ranks = np.cumsum(sizes, axis=1) - sizes + (sizes + 1) / 2
+    return ranks[:, groups], sizes
+
+
+def _spearman(weights, rx, ry):
+    n = weights.sum(axis=1)
+    mx = (weights * rx).sum(axis=1) / n
+    my = (weights * ry).sum(axis=1) / n
+    dx = rx - mx[:, None]
+    dy = ry - my[:, None]
+    cov = (weights * dx * dy).sum(axis=1)
+    var_x = (weights * dx * dx).sum(axis=1)
+    var_y = (weights * dy * dy).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return cov / np.sqrt(var_x * var_y)
+
+
+def _tau_b(s, n, sizes_x, sizes_y):
+    """tau-b a partir de S = concordantes - discordantes e dos tamanhos dos grupos de empate."""
+    n0 = n * (n - 1) / 2
+    n1 = (sizes_x * (sizes_x - 1) / 2).sum(axis=1)
+    n2 = (sizes_y * (sizes_y - 1) / 2).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return s / np.sqrt((n0 - n1) * (n0 - n2))
+
+
+class Sample:
+    """Pares (x, y) de um intervalo com o que não muda entre réplicas pré-calculado."""
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.n = len(x)
+        self.gx, self.onehot_x = _groups(x)
+        self.gy, self.onehot_y = _groups(y)
+        # sinal de cada par nas duas variáveis: +1 concordante, -1 discordante, 0 empate
+        self.sign_x = np.sign(x[:, None] - x[None, :]).astype(np.int8)
+        self.sign_y = np.sign(y[:, None] - y[None, :]).astype(np.int8)
+        self.pair_sign = (self.sign_x * self.sign_y).astype(float)
+
+    def statistics(self, weights):
+        """(rho, tau) de cada réplica dada pelos pesos (réplicas x linhas)."""
+        rx, sizes_x = _weighted_ranks(weights, self.gx, self.onehot_x)
+        ry, sizes_y = _weighted_ranks(weights, self.gy, self.onehot_y)
+        rho = _spearman(weights, rx, ry)
+        # S = soma sobre os pares (i, j), i < j, de w_i * w_j * sinal_ij
+        s = 0.5 * np.einsum('bi,bi->b', weights @ self.pair_sign, weights)
+        tau = _tau_b(s, weights.sum(axis=1), sizes_x, sizes_y)
+        return rho, tau
+
+    def permuted_statistics(self, perms):
+        """(rho, tau) com y reordenado por cada linha de perms."""
+        ones = np.ones((1, self.n))
+        rx, sizes_x = _weighted_ranks(ones, self.gx, self.onehot_x)
+        ry, sizes_y = _weighted_ranks(ones, self.gy, self.onehot_y)
+        rho = _spearman(ones, rx, ry[0][perms])
+
+        # os empates não mudam com a permutação: só S varia
+        s = np.empty(len(perms))
+        step = max(1, MAX_PAIR_CELLS // (self.n * self.n))
+        for start in range(0, len(perms), step):
+            p = perms[start:start + step]
+            sign_y = self.sign_y[p[:, :, None], p[:, None, :]]
+            s[start:start + step] = 0.5 * (sign_y * self.sign_x).sum(axis=(1, 2), dtype=np.int64)
+        tau = _tau_b(s, self.n, sizes_x, sizes_y)
+        return rho, tau
+
+
+def resample_block(x, y, replicates, seed):
+    """Um bloco de réplicas: (rho_boot, tau_boot, rho_perm, tau_perm)."""
+    rng = np.random.default_rng(seed)
+    sample = Sample(x, y)
+    n = sample.n
+    weights = rng.multinomial(n, np.full(n, 1 / n), size=replicates).astype(float)
+    rho_boot, tau_boot = sample.statistics(weights)
+    perms = np.argsort(rng.random((replicates, n)), axis=1)
+    rho_perm, tau_perm = sample.permuted_statistics(perms)
+    return rho_boot, tau_boot, rho_perm, tau_perm
+
+
+def _blocks(resamples, batch_size):
+    sizes = [batch_size] * (resamples // batch_size)
+    if resamples % batch_size:
+        sizes.append(resamples % batch_size)
+    return sizes
+
+
+def _p_value(observed, null):
+    null = null[~np.isnan(null)]
+    if np.isnan(observed) or not len(null):
+        return np.nan
+    # tolerância para empates numéricos com o valor observado
+    extreme = np.abs(null) >= abs(observed) - 1e-12
+    return (extreme.sum() + 1) / (len(null) + 1)
+
+
+def correlate(datasets, resamples=N_RESAMPLES, confidence=CONFIDENCE, seed=None,
+              workers=1, batch_size=BATCH_SIZE):
+    """
+    datasets: [(nome, x, y)]. Retorna um DataFrame com uma linha por conjunto.
+    Conjuntos com menos de 3 linhas ou com x/y constante ficam com NaN.
+    """
+    root = np.random.SeedSequence(seed)
+    blocks = _blocks(resamples, batch_size)
+    tasks = []
+    valid = []
+    for name, x, y in datasets:
+        ok = len(x) >= 3 and np.ptp(x) > 0 and np.ptp(y) > 0
+        valid.append(ok)
+        if not ok:
+            continue
+        # uma semente por bloco: o resultado não depende de quantos processos rodam
+        for size, child in zip(blocks, root.spawn(len(blocks))):
+            tasks.append((name, x, y, size, child))
+
+    args = [[t[i] for t in tasks] for i in range(1, 5)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(resample_block, *args, chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        results = list(map(resample_block, *args))
+
+    by_name = {}
+    for (name, *_), result in zip(tasks, results):
+        by_name.setdefault(name, []).append(result)
+
+    alpha = (1 - confidence) / 2
+    rows = []
+    for (name, x, y), ok in zip(datasets, valid):
+        row = {'interval': name, 'n': len(x)}
+        if ok:
+            rho, tau = Sample(x, y).statistics(np.ones((1, len(x))))
+            parts = by_name[name]
+            observed = {'spearman': rho[0], 'kendall': tau[0]}
+            for i, stat in enumerate(('spearman', 'kendall')):
+                boot = np.concatenate([p[i] for p in parts])
+                null = np.concatenate([p[i + 2] for p in parts])
+                low, high = (np.nanquantile(boot, [alpha, 1 - alpha]) if not np.isnan(boot).all()
+                             else (np.nan, np.nan))
+                row.update({stat: observed[stat], f'{stat}_ci_low': low, f'{stat}_ci_high': high,
+                            f'{stat}_p_perm': _p_value(observed[stat], null)})
+        rows.append(row)
+
+    columns = ['interval', 'n']
+    for stat in ('spearman', 'kendall'):
+        columns += [stat, f'{stat}_ci_low', f'{stat}_ci_high', f'{stat}_p_perm']
+    return pd.DataFrame(rows, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Correlação entre refatorações e variação de bugs por classe.')
+    parser.add_argument('--input', default=MERGED_DIR, help='pasta com os merged_refactorings_spotbugs_*.csv')
+    parser.add_argument('--output', default=OUTPUT_PATH, help='CSV com os resultados')
+    parser.add_argument('--resamples', type=int, default=N_RESAMPLES, help='réplicas de bootstrap e de permutação')
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE, help='nível do intervalo de confiança')
+    parser.add_argument('--seed', type=int, help='semente (padrão: aleatória)')
+    parser.add_argument('--workers', type=int, default=1, help='processos para as réplicas')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='réplicas por bloco')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input):
+        raise SystemExit(f'Pasta não encontrada: {args.input}')
+    intervals = load_intervals(args.input)
+    if not intervals:
+        raise SystemExit(f'Nenhum merged_refactorings_spotbugs_*.csv em {args.input}')
+
+    datasets = [(f'{v1}->{v2}', x, y) for v1, v2, x, y in intervals]
+    datasets.append((POOLED, np.concatenate([iv[2] for iv in intervals]),
+                     np.concatenate([iv[3] for iv in intervals])))
+
+    result = correlate(datasets, args.resamples, args.confidence, args.seed, args.workers, args.batch_size)
+    result.to_csv(args.output, index=False)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(result.round(3).to_string(index=False))
+    print(f'Resultados exportados: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,69 +1,54 @@
 # Merge normalized refactoring counts with normalized SpotBugs bug counts per class.
 #
 # This script reads all refactoring count CSV files from the static directory
+import argparse
 import os
-import re
-import pandas as pd
+
+from build_panel import build_panel, interval_merges, write_interval_merges
+from class_index import open_index
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 REF_DIR = os.path.join(BASE_DIR, 'normalized_refactoring')
 SB_DIR  = os.path.join(BASE_DIR, 'normalized_spotbugs_output')
 
-def ref_pattern():
-    return re.compile(r'refactoring_v(?P<v1>[0-9]+(?:\.[0-9]+)*)_to_v?(?P<v2>[0-9]+(?:\.[0-9]+)*)_count\.csv')
+def version_key(v):
+    return tuple(int(p) for p in v.split('.'))
+
 
+def main_sql(db_path):
+    """Gera os mesmos merges consultando o banco de analysis_store.py."""
+    from analysis_store import connect, intervals, refactorings_with_bugs
 
-def aggregate_bugs(sb_path, bug_col_name):
-    df = pd.read_csv(sb_path)
-    df.columns = df.columns.str.lower()
-    if 'class' not in df.columns:
-        raise KeyError(f"Missing 'class' in {sb_path}")
-    counts = df.groupby('class').size().reset_index(name=bug_col_name)
-    return counts
+    conn = connect(db_path)
+    for v1, v2 in sorted(intervals(conn), key=lambda iv: (version_key(iv[0]), version_key(iv[1]))):
+        df_merge = refactorings_with_bugs(conn, v1, v2)
+        out_name = f'merged_refactorings_spotbugs_{v1}_to_{v2}.csv'
+        out_path = os.path.join(BASE_DIR, out_name)
+        df_merge.to_csv(out_path, index=False)
+        print(f'Generated {out_path}')
+    conn.close()
 
 
 def main():
-    try:
-        files = os.listdir(REF_DIR)
-    except FileNotFoundError:
-        print(f"Refactoring directory not found: {REF_DIR}")
+    parser = argparse.ArgumentParser(description='Merge refactoring counts with SpotBugs bug counts per class.')
+    parser.add_argument('--db', help='use the SQLite store built by analysis_store.py instead of the CSVs')
+    parser.add_argument('--ref-dir', default=REF_DIR, help='directory with the refactoring count CSVs')
+    parser.add_argument('--sb-dir', default=SB_DIR, help='directory with the normalized SpotBugs CSVs')
+    args = parser.parse_args()
+    if args.db:
+        main_sql(args.db)
         return
 
-    pattern = ref_pattern()
-    for fname in sorted(files):
-        m = pattern.match(fname)
-        if not m:
-            continue
-        v1, v2 = m.group('v1'), m.group('v2')
-        ref_path = os.path.join(REF_DIR, fname)
-        df_ref = pd.read_csv(ref_path)
-        df_ref.columns = df_ref.columns.str.lower()
-        if 'qtd.refactorings' in df_ref.columns:
-            df_ref.rename(columns={'qtd.refactorings':'qtd_refactorings'}, inplace=True)
-        sb1 = os.path.join(SB_DIR, f'normalized_spotbugs_{v1}.csv')
-        if not os.path.exists(sb1):
-            print(f"Missing SpotBugs for {v1}: {sb1}")
-            continue
-        df_sb1 = aggregate_bugs(sb1, f'bugs_{v1}')
-        df_sb1.to_csv(f'teste_spot_bug{v1}.csv', index=False)
-        sb2 = os.path.join(SB_DIR, f'normalized_spotbugs_{v2}.csv')
-        if not os.path.exists(sb2):
-            print(f"Missing SpotBugs for {v2}: {sb2}")
-            continue
-        df_sb2 = aggregate_bugs(sb2, f'bugs_{v2}')
-        df_sb2.to_csv(f'teste_spot_bug{v2}.csv', index=False)
+    for path in (args.ref_dir, args.sb_dir):
+        if not os.path.isdir(path):
+            print(f"Directory not found: {path}")
+            return
 
-        df_merge = (
-            df_ref[['class','qtd_refactorings']]
-            .merge(df_sb1, on='class', how='inner')
-            .merge(df_sb2, on='class', how='inner')
-        )
-        out_name = f'merged_refactorings_spotbugs_{v1}_to_{v2}.csv'
-        out_path = os.path.join(BASE_DIR, out_name)
-        df_merge.to_csv(out_path, index=False)
+    # every interval comes out of one class x release panel: each CSV is read once
+    with open_index() as index:
+        panel = build_panel(index, ck_dir=None, sb_dir=args.sb_dir, ref_dir=args.ref_dir)
+    for out_path in write_interval_merges(interval_merges(panel), BASE_DIR):
         print(f'Generated {out_path}')
 
 if __name__ == '__main__':
     main()
-
-
@@ -1,41 +1,44 @@
+import argparse
 import json
 from collections import Counter
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
 
-def load_commits(full_path):
-    with open(full_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    if isinstance(data, dict) and 'commits' in data:
-        commits = data['commits']
-    elif isinstance(data, list):
-        commits = data
-    else:
-        commits = []
+from incremental_aggregate import refresh, write_json
+from refactoring_reader import iter_commits
+from render import FigureJob, render_figures
+
+# Contagens já calculadas por JSON (tamanho, mtime e sha256 de cada um): só os
+# arquivos novos ou alterados são relidos (ver incremental_aggregate.py). O manifesto
+# fica na raiz do repositório, qualquer que seja o diretório de execução
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(BASE_DIR, '..', '.refactoring_counts.manifest.json')
+
+def count_file(full_path):
+    """{"commits": n, "types": {tipo: qtd}} de um JSON do RefactoringMiner."""
+    counter = Counter()
+    n_commits = 0
+    for commit in iter_commits(full_path):
+        n_commits += 1
+        for ref in commit.get('refactorings', []):
+            if isinstance(ref, dict):
+                t = ref.get('type', 'Unknown')
+                counter[t] += 1
+    return {'commits': n_commits, 'types': dict(counter)}
+
+def count_refactorings(dir_path, manifest_path=MANIFEST_PATH, rebuild=False):
+    results, stats = refresh(dir_path, '.json', count_file, manifest_path, rebuild)
+    print(f"{dir_path}: {stats}")
 
-    return [c for c in commits if isinstance(c, dict)]
-
-def count_refactorings(dir_path):
     result = {}
-    for fname in sorted(os.listdir(dir_path)):
-        if not fname.endswith('.json'):
-            continue
-
+    for fname, counts in results.items():
         key = fname[:-5]
-        full_path = os.path.join(dir_path, fname)
-        commits = load_commits(full_path)
-
-        counter = Counter()
-        for commit in commits:
-            for ref in commit.get('refactorings', []):
-                if isinstance(ref, dict):
-                    t = ref.get('type', 'Unknown')
-                    counter[t] += 1
+        counter = Counter(counts['types'])
+        n_commits = counts['commits']
 
         total = sum(counter.values())
-        print(f"{key}: {len(commits)} commits, {total} refactorings across {len(counter)} types")
+        print(f"{key}: {n_commits} commits, {total} refactorings across {len(counter)} types")
         for typ, qtd in counter.most_common():
             print(f"   {typ}: {qtd}")
         if not counter:
@@ -57,6 +60,12 @@ def create_graph(file):
 
     type_totals = df.drop(columns='total_refactorings').sum().sort_values(ascending=False)
 
+    render_figures([
+        FigureJob(plot_total_trend, 'total_refactorings_trend.png', df[['total_refactorings']]),
+        FigureJob(plot_top10_types, 'top10_refactoring_types.png', type_totals.head(10)),
+    ])
+
+def plot_total_trend(df, output):
     plt.figure(figsize=(10, 5))
     plt.plot(df.index, df['total_refactorings'], marker='o')
     plt.xticks(rotation=45, ha='right')
@@ -64,10 +73,10 @@ def create_graph(file):
     plt.ylabel('Total de Refatorações')
     plt.title('Total de refatorações por release')
     plt.tight_layout()
-    plt.savefig('total_refactorings_trend.png')
+    plt.savefig(output)
     plt.close()
 
-    top10 = type_totals.head(10)
+def plot_top10_types(top10, output):
     plt.figure(figsize=(10, 5))
     plt.bar(top10.index, top10.values)
     plt.xticks(rotation=45, ha='right')
@@ -75,18 +84,21 @@ def create_graph(file):
     plt.ylabel('Total de ocorrências')
     plt.title('Os 10 tipos de refatoração mais frequentes')
     plt.tight_layout()
-    plt.savefig('top10_refactoring_types.png')
+    plt.savefig(output)
     plt.close()
 
 
 if __name__ == '__main__':
-    stats = count_refactorings('../refactoring-miner')
+    parser = argparse.ArgumentParser(description='Contagem de refatorações por intervalo de versões.')
+    parser.add_argument('--rebuild', action='store_true', help='relê todos os JSONs, ignorando o manifesto')
+    args = parser.parse_args()
+
+    stats = count_refactorings('../refactoring-miner', rebuild=args.rebuild)
 
     import pprint
     pprint.pprint(stats, sort_dicts=False, width=120)
 
     file = '../refactoring_counts.json'
-    with open(file, 'w', encoding='utf-8') as out:
-        json.dump(stats, out, indent=2, ensure_ascii=False)
+    write_json(file, stats, indent=2, ensure_ascii=False)
 
     create_graph(file)
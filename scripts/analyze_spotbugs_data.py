@@ -1,11 +1,53 @@
+import argparse
 import os
-import xml.etree.ElementTree as ET
-from collections import Counter
 import json
+from collections import Counter
 import pandas as pd
 import matplotlib.pyplot as plt
 
-def count_bug_categories(dir_path):
+from incremental_aggregate import refresh, write_json
+from render import FigureJob, render_figures
+from spotbugs_reader import SpotBugsSummary, scan_spotbugs
+
+# Agregados já calculados por XML (tamanho, mtime e sha256 de cada um): só os
+# relatórios novos ou alterados são relidos (ver incremental_aggregate.py). O manifesto
+# fica na raiz do repositório, qualquer que seja o diretório de execução
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(BASE_DIR, '..', '.spotbugs_category_counts.manifest.json')
+
+def _scan_counts(path):
+    """Contagens de um relatório em forma serializável para o manifesto."""
+    summary = scan_spotbugs(path)
+    return {
+        'total': summary.total,
+        'categories': dict(summary.categories),
+        'types': {cat: dict(types) for cat, types in summary.types.items()},
+    }
+
+def _summary_from_counts(counts):
+    summary = SpotBugsSummary()
+    summary.total = counts['total']
+    summary.categories.update(counts['categories'])
+    for cat, types in counts['types'].items():
+        summary.types[cat] = Counter(types)
+    return summary
+
+def summarize_reports(dir_path, manifest_path=MANIFEST_PATH, rebuild=False):
+    """
+    Retorna {"spotbugs_5.3": SpotBugsSummary, ...} dos arquivos .xml em dir_path,
+    usado por count_bug_categories e analyze_correctness. Só os XMLs novos ou
+    alterados desde a última execução são lidos (em streaming); os demais vêm do
+    manifesto. manifest_path=None lê todos sem manifesto.
+    """
+    if manifest_path is None:
+        results = {fname: _scan_counts(os.path.join(dir_path, fname))
+                   for fname in sorted(os.listdir(dir_path)) if fname.endswith('.xml')}
+    else:
+        results, stats = refresh(dir_path, '.xml', _scan_counts, manifest_path, rebuild)
+        print(f"{dir_path}: {stats}")
+    return {os.path.splitext(fname)[0]: _summary_from_counts(counts) for fname, counts in results.items()}
+
+def count_bug_categories(dir_path, summaries=None):
     """
     Lê todos os arquivos .xml em dir_path, extrai o atributo `category`
     de cada <BugInstance> e retorna um dict:
@@ -15,27 +57,18 @@ def count_bug_categories(dir_path):
         ...
       }
     """
-    result = {}
-    for fname in sorted(os.listdir(dir_path)):
-        if not fname.endswith('.xml'):
-            continue
-
-        key = os.path.splitext(fname)[0]
-        full_path = os.path.join(dir_path, fname)
+    if summaries is None:
+        summaries = summarize_reports(dir_path)
 
-        tree = ET.parse(full_path)
-        root = tree.getroot()
-
-        counter = Counter()
-        for bug in root.findall('.//BugInstance'):
-            cat = bug.get('category', 'Unknown')
-            if cat != "EXPERIMENTAL":
-                counter[cat] += 1
-            result[key] = dict(counter)
+    result = {}
+    for key, summary in summaries.items():
+        if summary.total:
+            result[key] = {cat: qtd for cat, qtd in summary.categories.items() if cat != "EXPERIMENTAL"}
 
     return result
 
 def generate_table(full_path):
+    """Monta o FigureJob da tabela de categorias por versão."""
     with open(full_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
@@ -46,6 +79,9 @@ def generate_table(full_path):
     df.index = df.index.str.replace(r'^spotbugs_', '', regex=True)
     df = df.sort_index()
 
+    return FigureJob(plot_table, '../tabelas-graficos/spotbugs_dataframe.png', df)
+
+def plot_table(df, output_path):
     fig, ax = plt.subplots(figsize=(14, 8))
     ax.axis('off')
     tbl = ax.table(
@@ -58,32 +94,26 @@ def generate_table(full_path):
     tbl.set_fontsize(10)
     tbl.scale(1, 1.5)
 
-    output_path = '../tabelas-graficos/spotbugs_dataframe.png'
     plt.savefig(output_path, bbox_inches='tight')
 
-def analyze_correctness(full_path):
+def analyze_correctness(full_path, summaries=None):
+    """Monta o FigureJob da distribuição de tipos de MALICIOUS_CODE por versão."""
     with open(full_path, 'r', encoding='utf-8') as f:
         data_graph = json.load(f)
 
-    xml_dir = '../spotbugs'
-    for fname in sorted(os.listdir(xml_dir)):
-        if not fname.endswith('.xml'):
-            continue
-        version = os.path.splitext(fname)[0]
-        tree = ET.parse(os.path.join(xml_dir, fname))
-        root = tree.getroot()
-        counts = {}
-        for bug in root.findall('.//BugInstance'):
-            if bug.get('category') == 'MALICIOUS_CODE':
-                bug_type = bug.get('type')
-                counts[bug_type] = counts.get(bug_type, 0) + 1
-        data_graph[version] = counts
+    if summaries is None:
+        summaries = summarize_reports('../spotbugs')
+    for version, summary in summaries.items():
+        data_graph[version] = dict(summary.types.get('MALICIOUS_CODE', {}))
 
     df = pd.DataFrame.from_dict(data_graph, orient='index').fillna(0).astype(int)
     df.index.name = 'version'
     df.index = df.index.str.replace(r'^spotbugs_', '', regex=True)
     df = df.sort_index()
 
+    return FigureJob(plot_correctness, '../tabelas-graficos/correctness_types_distribution.png', df)
+
+def plot_correctness(df, output_path):
     ax = df.plot(
         kind='bar',
         stacked=True,
@@ -94,19 +124,24 @@ def analyze_correctness(full_path):
     ax.set_title('Distribuição dos tipos de bugs para a categoria MALICIOUS_CODE ao longo das versões')
     plt.tight_layout()
 
-    output_path = '../tabelas-graficos/correctness_types_distribution.png'
     plt.savefig(output_path, bbox_inches='tight')
 
 if __name__ == '__main__':
-    stats = count_bug_categories('../spotbugs')
+    parser = argparse.ArgumentParser(description='Contagem de bugs do SpotBugs por categoria e versão.')
+    parser.add_argument('--rebuild', action='store_true', help='relê todos os XMLs, ignorando o manifesto')
+    args = parser.parse_args()
+
+    summaries = summarize_reports('../spotbugs', rebuild=args.rebuild)
+    stats = count_bug_categories('../spotbugs', summaries)
     import pprint
     pprint.pprint(stats, width=100, sort_dicts=False)
 
     output_analyze = 'spotbugs_category_counts.json'
-    with open(output_analyze, 'w', encoding='utf-8') as f:
-        json.dump(stats, f, indent=2, ensure_ascii=False)
+    write_json(output_analyze, stats, indent=2, ensure_ascii=False)
 
-    generate_table(output_analyze)
-    analyze_correctness(output_analyze)
+    render_figures([
+        generate_table(output_analyze),
+        analyze_correctness(output_analyze, summaries),
+    ])
 
 
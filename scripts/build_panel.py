@@ -0,0 +1,200 @@
+"""
+Painel longitudinal classe × release com métricas CK, bugs do SpotBugs e refatorações.
+
+Carrega todas as releases uma única vez e monta uma tabela com uma linha por
+(class_id, release) -- grade completa, com zeros onde a classe não tem bugs ou
+refatorações naquela release. As colunas de variação (delta_<métrica>,
+bugs_prev, delta_bugs) saem de groupby/shift sobre a tabela inteira, e os merges
+por intervalo de analyze_heavy são um filtro sobre ela.
+
+Colunas:
+  class_id, release, class, <métricas CK>, in_ck, bugs, refactorings, from_release,
+  prev_release, bugs_prev, delta_bugs, delta_<métrica>
+
+"refactorings" é a contagem do intervalo que termina na release (from_release -> release).
+
+Uso:
+    python build_panel.py                         # grava ../class_release_panel.csv
+    python build_panel.py --merges ../merged_spotbugs_refactoring_miner
+"""
+import argparse
+import os
+import re
+
+import pandas as pd
+
+from ck_columnar import CK_DIR, read_ck_metrics
+from class_index import canonical_class, open_index, with_class_id
+
+SB_DIR = '../normalized_spotbugs_output'
+REF_DIR = '../normalized_refactoring'
+PANEL_PATH = '../class_release_panel.csv'
+
+CK_METRICS = ['loc', 'wmc', 'dit', 'noc', 'cbo', 'lcom', 'rfc']
+
+SB_PATTERN = re.compile(r'normalized_spotbugs_v?(?P<v>[0-9]+(?:\.[0-9]+)*)\.csv$')
+REF_PATTERN = re.compile(r'refactoring_v?(?P<v1>[0-9]+(?:\.[0-9]+)*)_to_v?(?P<v2>[0-9]+(?:\.[0-9]+)*)_count\.csv$')
+
+
+def version_key(v):
+    return tuple(int(p) for p in v.lstrip('v').split('.'))
+
+
+def _lower(df):
+    df.columns = df.columns.str.lower()
+    return df
+
+
+def load_bug_counts(sb_dir, index):
+    """bugs por (class_id, release); classes internas contam para a externa."""
+    frames = []
+    for fname in sorted(os.listdir(sb_dir)):
+        m = SB_PATTERN.match(fname)
+        if not m:
+            continue
+        df = _lower(pd.read_csv(os.path.join(sb_dir, fname),
+                                usecols=lambda c: c.lower() in ('class', 'class_id')))
+        df = with_class_id(df, index)
+        counts = df.groupby('class_id').size().rename('bugs').reset_index()
+        counts['release'] = m.group('v')
+        frames.append(counts)
+    return pd.concat(frames, ignore_index=True) if frames else \
+        pd.DataFrame(columns=['class_id', 'bugs', 'release'])
+
+
+def load_refactoring_counts(ref_dir, index):
+    """refactorings por (class_id, release final do intervalo), com from_release."""
+    frames = []
+    for fname in sorted(os.listdir(ref_dir)):
+        m = REF_PATTERN.match(fname)
+        if not m:
+            continue
+        df = _lower(pd.read_csv(os.path.join(ref_dir, fname)))
+        df = df.rename(columns={'qtd.refactorings': 'qtd_refactorings'})
+        df = with_class_id(df, index)
+        counts = df.groupby('class_id')['qtd_refactorings'].sum().rename('refactorings').reset_index()
+        counts['from_release'] = m.group('v1')
+        counts['release'] = m.group('v2')
+        frames.append(counts)
+    return pd.concat(frames, ignore_index=True) if frames else \
+        pd.DataFrame(columns=['class_id', 'refactorings', 'from_release', 'release'])
+
+
+def load_ck(ck_dir, index, metrics=CK_METRICS):
+    """Métricas CK da classe de nível superior por (class_id, release)."""
+    frames = []
+    for release_dir in sorted(os.listdir(ck_dir)):
+        if not os.path.isdir(os.path.join(ck_dir, release_dir)):
+            continue
+        try:
+            df = read_ck_metrics(release_dir, 'class', columns=['class', *metrics], ck_dir=ck_dir)
+        except FileNotFoundError:
+            continue
+        # internas/anônimas têm métricas próprias no CK; o painel fica com a externa
+        df = df[df['class'] == df['class'].map(canonical_class)]
+        df = with_class_id(df, index).drop(columns='class')
+        df['release'] = release_dir.lstrip('v')
+        frames.append(df.drop_duplicates(['class_id', 'release']))
+    return pd.concat(frames, ignore_index=True) if frames else \
+        pd.DataFrame(columns=['class_id', *metrics, 'release'])
+
+
+def build_panel(index, ck_dir=CK_DIR, sb_dir=SB_DIR, ref_dir=REF_DIR, metrics=CK_METRICS):
+    """Monta o painel (índice (class_id, release), releases em ordem de versão).
+    ck_dir=None deixa as métricas CK de fora.
+    """
+    ck = load_ck(ck_dir, index, metrics) if ck_dir else pd.DataFrame(columns=['class_id', 'release'])
+    metrics = [m for m in metrics if m in ck.columns]
+    bugs = load_bug_counts(sb_dir, index)
+    refs = load_refactoring_counts(ref_dir, index)
+
+    releases = sorted(set(ck['release']) | set(bugs['release']) | set(refs['release'])
+                      | set(refs['from_release']), key=version_key)
+    class_ids = sorted(set(ck['class_id']) | set(bugs['class_id']) | set(refs['class_id']))
+    grid = pd.MultiIndex.from_product([class_ids, releases], names=['class_id', 'release'])
+
+    keys = ['class_id', 'release']
+    panel = (
+        pd.DataFrame(index=grid)
+        .join(ck.assign(in_ck=True).set_index(keys))
+        .join(bugs.set_index(keys))
+        .join(refs.set_index(keys))
+    )
+    panel['in_ck'] = panel['in_ck'].fillna(False).astype(bool)
+    panel['bugs'] = panel['bugs'].fillna(0).astype(int)
+    panel['refactorings'] = panel['refactorings'].fillna(0).astype(int)
+
+    # a grade é completa e ordenada por versão dentro de cada classe, então
+    # shift/diff por grupo comparam sempre com a release imediatamente anterior
+    prev_release = pd.Series([None] + releases[:-1], index=releases)
+    panel['prev_release'] = prev_release.reindex(panel.index.get_level_values('release')).values
+    by_class = panel.groupby(level='class_id', sort=False)
+    panel['bugs_prev'] = by_class['bugs'].shift(1)
+    panel['delta_bugs'] = panel['bugs'] - panel['bugs_prev']
+    for metric in metrics:
+        panel[f'delta_{metric}'] = by_class[metric].diff()
+
+    skipped = refs.loc[refs['from_release'] != refs['release'].map(prev_release), ['from_release', 'release']]
+    for v1, v2 in skipped.drop_duplicates().itertuples(index=False):
+        # o intervalo pula releases: bugs_prev não corresponde a from_release
+        print(f'Aviso: intervalo {v1} -> {v2} não é entre releases consecutivas do painel')
+
+    panel.insert(0, 'class', index.class_names(panel.index.get_level_values('class_id')).values)
+    panel.attrs['releases'] = releases
+    return panel
+
+
+def interval_merges(panel):
+    """Equivalente a analyze_heavy para todos os intervalos de uma vez: classes com
+    refatorações no intervalo e bugs nas duas releases.
+    Retorna (from_release, to_release, class, qtd_refactorings, bugs_from, bugs_to).
+    """
+    rows = panel[
+        (panel['refactorings'] > 0) & (panel['bugs'] > 0) & (panel['bugs_prev'] > 0)
+        & (panel['from_release'] == panel['prev_release'])
+    ]
+    merged = pd.DataFrame({
+        'from_release': rows['from_release'].values,
+        'to_release': rows.index.get_level_values('release'),
+        'class': rows['class'].values,
+        'qtd_refactorings': rows['refactorings'].values,
+        'bugs_from': rows['bugs_prev'].astype(int).values,
+        'bugs_to': rows['bugs'].values,
+    })
+    merged['order'] = merged['to_release'].map(version_key)
+    return (merged.sort_values(['order', 'qtd_refactorings', 'class'], ascending=[True, False, True])
+            .drop(columns='order').reset_index(drop=True))
+
+
+def write_interval_merges(merged, out_dir):
+    """Grava merged_refactorings_spotbugs_<v1>_to_<v2>.csv (colunas class,
+    qtd_refactorings, bugs_<v1>, bugs_<v2>) por intervalo. Retorna os caminhos."""
+    written = []
+    for (v1, v2), df in merged.groupby(['from_release', 'to_release'], sort=False):
+        df = df[['class', 'qtd_refactorings', 'bugs_from', 'bugs_to']].rename(
+            columns={'bugs_from': f'bugs_{v1}', 'bugs_to': f'bugs_{v2}'})
+        path = os.path.join(out_dir, f'merged_refactorings_spotbugs_{v1}_to_{v2}.csv')
+        df.to_csv(path, index=False)
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(__doc__)
+    parser.add_argument('--output', default=PANEL_PATH, help='CSV do painel')
+    parser.add_argument('--merges', help='pasta onde gravar também os merges por intervalo')
+    args = parser.parse_args()
+
+    with open_index() as index:
+        panel = build_panel(index)
+    panel.to_csv(args.output)
+    print(f'Gerado {args.output} ({len(panel)} linhas, {len(panel.attrs["releases"])} releases)')
+
+    if args.merges:
+        os.makedirs(args.merges, exist_ok=True)
+        for path in write_interval_merges(interval_merges(panel), args.merges):
+            print(f'Gerado {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Armazenamento colunar (Parquet) das saídas do CK.
+
+Converte ck_metrics_output/<release>/ck_metrics.csv<granularidade>.csv em
+ck_metrics_parquet/release=<release>/granularity=<granularidade>/part-0.parquet,
+com tipos inferidos (inteiros, floats, booleanos) e nomes de colunas em minúsculas.
+read_ck_metrics lê só as colunas pedidas e aplica os filtros na leitura do Parquet;
+se a release ainda não foi convertida (ou o pyarrow não está instalado), cai para
+o CSV original com usecols.
+iter_ck_batches faz o mesmo em blocos de linhas, com memória limitada.
+
+Uso:
+    python ck_columnar.py                  # converte todas as releases
+    python ck_columnar.py --release v5.3   # converte só uma release
+"""
+import argparse
+import operator
+import os
+
+import pandas as pd
+
+CK_DIR = '../ck_metrics_output'
+PARQUET_DIR = '../ck_metrics_parquet'
+GRANULARITIES = ('class', 'method', 'field', 'variable')
+
+# Linhas por bloco em iter_ck_batches
+BATCH_ROWS = 100_000
+
+_OPS = {
+    '==': operator.eq, '=': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    'in': lambda col, values: col.isin(values),
+    'not in': lambda col, values: ~col.isin(values),
+}
+
+
+def csv_path(release, granularity, ck_dir=CK_DIR):
+    return os.path.join(ck_dir, release, f'ck_metrics.csv{granularity}.csv')
+
+
+def parquet_path(release, granularity, parquet_dir=PARQUET_DIR):
+    return os.path.join(parquet_dir, f'release={release}', f'granularity={granularity}', 'part-0.parquet')
+
+
+def convert_release(release, ck_dir=CK_DIR, parquet_dir=PARQUET_DIR, force=False):
+    """Converte os CSVs de uma release para Parquet. Pula granularidades cujo
+    Parquet já é mais novo que o CSV. Retorna a lista de arquivos gerados.
+    """
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    written = []
+    for granularity in GRANULARITIES:
+        src = csv_path(release, granularity, ck_dir)
+        if not os.path.exists(src):
+            continue
+        dest = parquet_path(release, granularity, parquet_dir)
+        if not force and os.path.exists(dest) and os.path.getmtime(dest) >= os.path.getmtime(src):
+            continue
+        table = pa_csv.read_csv(src)
+        table = table.rename_columns([c.lower() for c in table.column_names])
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = dest + '.tmp'
+        pq.write_table(table, tmp, compression='zstd')
+        os.replace(tmp, dest)
+        written.append(dest)
+    return written
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _apply_filters(df, filters):
+    for col, op, value in filters:
+        df = df[_OPS[op](df[col], value)]
+    return df
+
+
+def read_ck_metrics(release, granularity='class', columns=None, filters=None,
+                    ck_dir=CK_DIR, parquet_dir=PARQUET_DIR):
+    """Lê as métricas do CK de uma release/granularidade como DataFrame.
+
+    columns -- colunas a carregar (minúsculas); None carrega todas
+    filters -- lista de (coluna, operador, valor), ex.: [('type', '==', 'class')]
+
+    Os filtros são aplicados na leitura do Parquet (descartando row groups pelas
+    estatísticas) e as colunas usadas só nos filtros não aparecem no resultado.
+    """
+    filters = list(filters or [])
+    wanted = None if columns is None else list(dict.fromkeys(c.lower() for c in columns))
+    needed = None if wanted is None else list(dict.fromkeys(wanted + [f[0] for f in filters]))
+
+    pq_file = parquet_path(release, granularity, parquet_dir)
+    if os.path.exists(pq_file) and _has_pyarrow():
+        import pyarrow.parquet as pq
+        table = pq.read_table(pq_file, columns=wanted, filters=filters or None)
+        return table.to_pandas()
+
+    src = csv_path(release, granularity, ck_dir)
+    if not os.path.exists(src):
+        raise FileNotFoundError(f'CK não encontrado para {release}/{granularity}: {src}')
+    usecols = None if needed is None else (lambda c: c.lower() in needed)
+    df = pd.read_csv(src, usecols=usecols)
+    df.columns = df.columns.str.lower()
+    df = _apply_filters(df, filters)
+    if wanted is not None:
+        df = df[wanted]
+    return df.reset_index(drop=True)
+
+
+def iter_ck_batches(release, granularity='class', columns=None, batch_rows=BATCH_ROWS,
+                    ck_dir=CK_DIR, parquet_dir=PARQUET_DIR):
+    """Lê as métricas do CK em blocos de até batch_rows linhas (DataFrames com
+    colunas em minúsculas), para arquivos grandes demais para ler de uma vez.
+    Usa o Parquet se a release já foi convertida, senão o CSV.
+    """
+    wanted = None if columns is None else list(dict.fromkeys(c.lower() for c in columns))
+
+    pq_file = parquet_path(release, granularity, parquet_dir)
+    if os.path.exists(pq_file) and _has_pyarrow():
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(pq_file).iter_batches(batch_size=batch_rows, columns=wanted):
+            yield batch.to_pandas()
+        return
+
+    src = csv_path(release, granularity, ck_dir)
+    if not os.path.exists(src):
+        raise FileNotFoundError(f'CK não encontrado para {release}/{granularity}: {src}')
+    usecols = None if wanted is None else (lambda c: c.lower() in wanted)
+    with pd.read_csv(src, usecols=usecols, chunksize=batch_rows) as reader:
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.lower()
+            yield chunk if wanted is None else chunk[wanted]
+
+
+def main():
+    parser = argparse.ArgumentParser(__doc__)
+    parser.add_argument('--release', help='release a converter, ex: v5.3 (padrão: todas)')
+    parser.add_argument('--force', action='store_true', help='reconverte mesmo se o Parquet estiver atualizado')
+    args = parser.parse_args()
+
+    if not _has_pyarrow():
+        raise SystemExit('A conversão para Parquet requer o pacote pyarrow (pip install pyarrow)')
+
+    releases = [args.release] if args.release else sorted(
+        d for d in os.listdir(CK_DIR) if os.path.isdir(os.path.join(CK_DIR, d))
+    )
+    for release in releases:
+        for path in convert_release(release, force=args.force):
+            print(f'Gerado {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Resumo das métricas CK por método e por variável, release a release, com memória limitada.
+
+Os CSVs de método e de variável do CK são bem maiores que o de classe (o de
+variáveis tem ~3 MB por release no traccar e cresce rápido em projetos maiores),
+então são lidos em blocos (iter_ck_batches) e cada bloco só atualiza:
+  - estatísticas corridas por métrica (contagem, média, variância, mín., máx.),
+    combinadas bloco a bloco pela fórmula de Chan et al.;
+  - uma amostra de reservatório por métrica, de onde saem mediana e percentis
+    (exatos até RESERVOIR_SIZE valores, aproximados acima disso);
+  - os top_k maiores métodos/variáveis por métrica (hotspots);
+  - agregados por classe de nível superior (contagem, soma, máximo).
+A memória depende do tamanho do bloco, da amostra e do nº de classes, não do nº de linhas.
+
+Saídas em ../ck_granular_summary/, por granularidade <g> (method, variable):
+  <g>_stats_<release>.csv    -- metric, count, mean, var, min, p50, p90, p99, max
+  <g>_top_<release>.csv      -- metric, rank, class, method[, variable], value
+  <g>_classes_<release>.csv  -- class_id, class, agregados por classe
+  <g>_stats_all_releases.csv -- as estatísticas de todas as releases
+
+Uso:
+    python ck_granular_summary.py
+    python ck_granular_summary.py --release v5.3 --granularity method --top-k 50
+"""
+import argparse
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from ck_columnar import BATCH_ROWS, CK_DIR, iter_ck_batches
+from class_index import open_index, with_class_id
+
+OUTPUT_DIR = '../ck_granular_summary'
+
+RESERVOIR_SIZE = 20_000
+TOP_K = 20
+QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+METHOD_METRICS = ['loc', 'wmc', 'cbo', 'rfc', 'fanin', 'fanout', 'parametersqty',
+                  'variablesqty', 'maxnestedblocksqty', 'loopqty', 'returnsqty']
+
+# keys: colunas que identificam a linha nos hotspots
+# rollup: coluna por classe -> (métrica, agregação)
+SPECS = {
+    'method': {
+        'keys': ['class', 'method'],
+        'metrics': METHOD_METRICS,
+        'rollup': {
+            'methods': ('loc', 'count'), 'loc_sum': ('loc', 'sum'), 'wmc_sum': ('wmc', 'sum'),
+            'wmc_max': ('wmc', 'max'), 'cbo_max': ('cbo', 'max'), 'rfc_max': ('rfc', 'max'),
+            'maxnestedblocksqty_max': ('maxnestedblocksqty', 'max'),
+        },
+    },
+    'variable': {
+        'keys': ['class', 'method', 'variable'],
+        'metrics': ['usage'],
+        'rollup': {'variables': ('usage', 'count'), 'usage_sum': ('usage', 'sum'), 'usage_max': ('usage', 'max')},
+    },
+}
+
+# como juntar o agregado de um bloco com o acumulado
+_COMBINE = {'count': 'sum', 'sum': 'sum', 'max': 'max'}
+
+
+def version_key(v):
+    parts = list(map(int, v.lstrip('v').split('.')))
+    while len(parts) < 3:
+        parts.append(0)
+    return tuple(parts)
+
+
+class RunningStats:
+    """Contagem, média, M2 (soma dos quadrados dos desvios), mín. e máx. de um fluxo de valores."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        n_b = len(values)
+        if not n_b:
+            return
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def variance(self):
+        # populacional (ddof=0), como em extract-metrics-ck.py
+        return self.m2 / self.n if self.n else np.nan
+
+
+class Reservoir:
+    """Amostra uniforme de tamanho fixo de um fluxo (algoritmo R, vetorizado por bloco)."""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.values = np.empty(size)
+        self.seen = 0
+
+    def update(self, values):
+        filled = min(self.seen, self.size)
+        take = min(len(values), self.size - filled)
+        self.values[filled:filled + take] = values[:take]
+        rest = values[take:]
+        if len(rest):
+            # o i-ésimo valor do fluxo (base 0) entra com probabilidade size/(i+1)
+            positions = np.arange(self.seen + take, self.seen + len(values))
+            slots = self.rng.integers(0, positions + 1)
+            keep = slots < self.size
+            self.values[slots[keep]] = rest[keep]
+        self.seen += len(values)
+
+    def quantiles(self, qs):
+        sample = self.values[:min(self.seen, self.size)]
+        if not len(sample):
+            return [np.nan] * len(qs)
+        return np.quantile(sample, qs)
+
+
+class TopK:
+    """As k linhas com maior valor de cada métrica."""
+
+    def __init__(self, k, keys, metrics):
+        self.k = k
+        self.keys = keys
+        self.top = {metric: None for metric in metrics}
+
+    def update(self, chunk):
+        for metric, current in self.top.items():
+            best = chunk.nlargest(self.k, metric)[self.keys + [metric]]
+            self.top[metric] = best if current is None else pd.concat([current, best]).nlargest(self.k, metric)
+
+    def frame(self):
+        frames = []
+        for metric, top in self.top.items():
+            if top is None or top.empty:
+                continue
+            top = top.rename(columns={metric: 'value'}).reset_index(drop=True)
+            top.insert(0, 'rank', range(1, len(top) + 1))
+            top.insert(0, 'metric', metric)
+            frames.append(top)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def summarize_release(release, granularity, index, ck_dir=CK_DIR, top_k=TOP_K,
+                      batch_rows=BATCH_ROWS, seed=0):
+    """
+    Percorre o CSV da release em blocos. Retorna (estatísticas, hotspots,
+    agregados por classe) como DataFrames.
+    """
+    spec = SPECS[granularity]
+    metrics = spec['metrics']
+    stats = {m: RunningStats() for m in metrics}
+    # amostra reprodutível por (release, granularidade)
+    rng = np.random.default_rng([seed, zlib.crc32(f'{release}/{granularity}'.encode())])
+    reservoirs = {m: Reservoir(RESERVOIR_SIZE, rng) for m in metrics}
+    top = TopK(top_k, spec['keys'], metrics)
+    rollup = None
+    rollup_agg = {name: (metric, how) for name, (metric, how) in spec['rollup'].items()}
+    combine = {name: _COMBINE[how] for name, (_, how) in spec['rollup'].items()}
+
+    for chunk in iter_ck_batches(release, granularity, columns=spec['keys'] + metrics,
+                                 batch_rows=batch_rows, ck_dir=ck_dir):
+        for metric in metrics:
+            chunk[metric] = pd.to_numeric(chunk[metric], errors='coerce')
+            values = chunk[metric].dropna().to_numpy(dtype=float)
+            stats[metric].update(values)
+            reservoirs[metric].update(values)
+        top.update(chunk)
+
+        # classes internas/anônimas contam para a classe de nível superior
+        chunk = with_class_id(chunk, index)
+        agg = chunk.groupby('class_id').agg(**rollup_agg)
+        rollup = agg if rollup is None else pd.concat([rollup, agg]).groupby(level=0).agg(combine)
+
+    rows = []
+    for metric in metrics:
+        s = stats[metric]
+        row = {'metric': metric, 'count': s.n, 'mean': s.mean, 'var': s.variance(),
+               'min': s.min if s.n else np.nan, 'max': s.max if s.n else np.nan}
+        row.update(zip(QUANTILES, reservoirs[metric].quantiles(list(QUANTILES.values()))))
+        rows.append(row)
+    columns = ['metric', 'count', 'mean', 'var', 'min', *QUANTILES, 'max']
+    stats_df = pd.DataFrame(rows, columns=columns).round(4)
+
+    if rollup is None:
+        rollup = pd.DataFrame(columns=list(spec['rollup']))
+    rollup = rollup.reset_index().rename(columns={'index': 'class_id'})
+    rollup.insert(1, 'class', index.class_names(rollup['class_id']).values)
+    first = next(iter(spec['rollup']))
+    rollup = rollup.sort_values(first, ascending=False).reset_index(drop=True)
+    return stats_df, top.frame(), rollup
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resumo das métricas CK por método e por variável.')
+    parser.add_argument('--release', nargs='+', help='releases a resumir (padrão: todas)')
+    parser.add_argument('--granularity', nargs='+', choices=list(SPECS), default=list(SPECS))
+    parser.add_argument('--top-k', type=int, default=TOP_K, help='hotspots por métrica')
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS, help='linhas lidas por bloco')
+    parser.add_argument('--ck-dir', default=CK_DIR)
+    parser.add_argument('--output', default=OUTPUT_DIR, help='pasta das saídas')
+    args = parser.parse_args()
+
+    releases = args.release or sorted(
+        (d for d in os.listdir(args.ck_dir) if os.path.isdir(os.path.join(args.ck_dir, d))),
+        key=version_key
+    )
+    os.makedirs(args.output, exist_ok=True)
+
+    with open_index() as index:
+        for granularity in args.granularity:
+            all_stats = []
+            for release in releases:
+                try:
+                    stats, top, rollup = summarize_release(release, granularity, index, args.ck_dir,
+                                                           args.top_k, args.batch_rows)
+                except FileNotFoundError:
+                    print(f'Aviso: nenhum CSV de {granularity} em {release}')
+                    continue
+                stats.to_csv(os.path.join(args.output, f'{granularity}_stats_{release}.csv'), index=False)
+                top.to_csv(os.path.join(args.output, f'{granularity}_top_{release}.csv'), index=False)
+                rollup.to_csv(os.path.join(args.output, f'{granularity}_classes_{release}.csv'), index=False)
+                print(f'{granularity} {release}: {int(stats["count"].max())} linhas, '
+                      f'{len(rollup)} classes')
+                all_stats.append(stats.assign(release=release))
+
+            if all_stats:
+                combined = pd.concat(all_stats, ignore_index=True)
+                combined = combined[['release'] + [c for c in combined.columns if c != 'release']]
+                path = os.path.join(args.output, f'{granularity}_stats_all_releases.csv')
+                combined.to_csv(path, index=False)
+                print(f'CSV combinado exportado: {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Índice de identidade de classes compartilhado entre CK, SpotBugs e RefactoringMiner.
+
+Cada ferramenta nomeia as classes de um jeito: o RefactoringMiner dá o caminho do
+fonte ("src/main/java/org/traccar/Foo.java"), o CK dá o caminho absoluto e o nome
+com "$Anonymous1" para classes anônimas, e o SpotBugs dá o nome binário
+("org.traccar.Foo$Bar"). Todos são reduzidos à classe de nível superior
+("org.traccar.Foo"), que recebe um ID inteiro estável, persistido em
+"class_index.csv" na raiz do projeto (class_id,class_name) e reaproveitado entre
+releases.
+
+Uso:
+    from class_index import open_index
+    with open_index() as index:
+        df['class_id'] = index.ids(df['class'])
+"""
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# na raiz do projeto, independente da pasta de onde o script é chamado
+INDEX_PATH = os.path.join(BASE_DIR, '..', 'class_index.csv')
+SOURCE_ROOT = 'src/main/java/'
+
+
+def class_from_path(path):
+    """Caminho de um .java (relativo ou absoluto) -> nome pontuado da classe."""
+    pos = path.rfind(SOURCE_ROOT)
+    if pos >= 0:
+        path = path[pos + len(SOURCE_ROOT):]
+    if path.endswith('.java'):
+        path = path[:-5]
+    return path.replace('/', '.')
+
+
+def canonical_class(name):
+    """Caminho, nome binário ou nome de classe interna -> classe de nível superior."""
+    if name.endswith('.java') or '/' in name:
+        name = class_from_path(name)
+    return name.split('$', 1)[0]
+
+
+class ClassIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.names = []
+        self._ids = {}
+        self._aliases = {}
+        self._saved = 0
+        if os.path.exists(path):
+            df = pd.read_csv(path, dtype={'class_id': int, 'class_name': str})
+            for class_id, name in zip(df['class_id'], df['class_name']):
+                if class_id != len(self.names):
+                    raise ValueError(f'{path}: class_id fora de sequência ({class_id})')
+                self.names.append(name)
+                self._ids[name] = class_id
+        self._saved = len(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def id_of(self, name):
+        """ID da classe (cria um novo se ainda não existir)."""
+        class_id = self._aliases.get(name)
+        if class_id is None:
+            canonical = canonical_class(name)
+            class_id = self._ids.get(canonical)
+            if class_id is None:
+                class_id = len(self.names)
+                self.names.append(canonical)
+                self._ids[canonical] = class_id
+            self._aliases[name] = class_id
+        return class_id
+
+    def name_of(self, class_id):
+        return self.names[class_id]
+
+    def ids(self, names):
+        """Série de IDs (Int32, nulo onde o nome é nulo) para uma coluna de nomes."""
+        names = pd.Series(names)
+        mapping = {name: self.id_of(name) for name in names.dropna().unique()}
+        return names.map(mapping).astype('Int32')
+
+    def class_names(self, ids):
+        """Série com o nome canônico de cada ID."""
+        return pd.Series(ids).map(pd.Series(self.names, dtype=object))
+
+    def save(self):
+        if self._saved == len(self.names):
+            return
+        tmp = self.path + '.tmp'
+        pd.DataFrame({'class_id': range(len(self.names)), 'class_name': self.names}).to_csv(tmp, index=False)
+        os.replace(tmp, self.path)
+        self._saved = len(self.names)
+
+
+@contextmanager
+def open_index(path=INDEX_PATH):
+    """
+    Abre o índice com trava exclusiva (os scripts de normalização podem rodar em
+    paralelo no modo --dag) e grava os IDs novos ao sair.
+    """
+    with open(path + '.lock', 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        index = ClassIndex(path)
+        yield index
+        index.save()
+
+
+def with_class_id(df, index, column='class'):
+    """Garante a coluna class_id (CSVs gerados antes do índice não a têm)."""
+    if 'class_id' not in df.columns:
+        df = df.assign(class_id=index.ids(df[column]))
+    return df
@@ -5,19 +5,30 @@ Merge CK metrics with Refactoring Miner and SpotBugs outputs.
    showing refactoring count and list.
 2) Outputs ck_refactorings_spotbugs_<version>.csv adding bug count and types.
 
+Classes are joined on class_id (class_index.py), so CK anonymous/inner classes and
+SpotBugs $Inner findings count towards their top-level class.
+
 Usage:
     python merge_refactor_spotbugs.py --version 5.3
+    python merge_refactor_spotbugs.py --version 5.3 --db ../analysis.db   # indexed SQL queries
 """
 import argparse
 import os
 import pandas as pd
 
+from class_index import open_index, with_class_id
+
 def main():
     parser = argparse.ArgumentParser(__doc__)
     parser.add_argument('--version', required=True, help='Version, e.g. 5.3')
+    parser.add_argument('--db', help='SQLite store built by analysis_store.py')
     args = parser.parse_args()
     v = args.version
 
+    if args.db:
+        main_sql(args.db, v)
+        return
+
     path_ck = f'ck_metrics_output/v{v}/ck_metrics.csvclass.csv'
     path_rf = f'normalized_refactoring_output/normalized_refactorings_{v}.csv'
     path_sb = f'normalized_spotbugs_output/normalized_spotbugs_{v}.csv'
@@ -31,25 +42,31 @@ def main():
     df_sb = pd.read_csv(path_sb)
     df_sb.columns = df_sb.columns.str.lower()
 
+    with open_index() as index:
+        df_ck = with_class_id(df_ck, index)
+        df_rf = with_class_id(df_rf, index)
+        df_sb = with_class_id(df_sb, index)
+
     df_rf_agg = (
         df_rf
-        .groupby('class')['refactoring_type']
+        .groupby('class_id')['refactoring_type']
         .agg(refactoring_count='count',
              refactorings=lambda x: ';'.join(sorted(set(x))))
         .reset_index()
     )
 
     df1 = (
-        df_ck[['class']]
-        .merge(df_rf_agg, on='class', how='inner')
+        df_ck[['class_id']].drop_duplicates()
+        .merge(df_rf_agg, on='class_id', how='inner')
     )
+    df1.insert(0, 'class', index.class_names(df1['class_id']))
     out1 = f'ck_refactorings_{v}.csv'
-    df1.to_csv(out1, index=False)
+    df1.drop(columns='class_id').to_csv(out1, index=False)
     print(f'Wrote: {out1}')
 
     df_sb_agg = (
         df_sb
-        .groupby('class')['bug_type']
+        .groupby('class_id')['bug_type']
         .agg(bug_count='count',
              bug_types=lambda x: ';'.join(sorted(set(x))))
         .reset_index()
@@ -57,11 +74,27 @@ def main():
 
     df2 = (
         df1
-        .merge(df_sb_agg, on='class', how='inner')
+        .merge(df_sb_agg, on='class_id', how='inner')
     )
+    df2 = df2.drop(columns='class_id')
+    out2 = f'ck_refactorings_spotbugs_{v}.csv'
+    df2.to_csv(out2, index=False)
+    print(f'Wrote: {out2}')
+
+def main_sql(db_path, v):
+    from analysis_store import bugs_by_class, ck_refactorings, connect
+
+    conn = connect(db_path)
+    df1 = ck_refactorings(conn, v)
+    out1 = f'ck_refactorings_{v}.csv'
+    df1.to_csv(out1, index=False)
+    print(f'Wrote: {out1}')
+
+    df2 = df1.merge(bugs_by_class(conn, v), on='class', how='inner')
     out2 = f'ck_refactorings_spotbugs_{v}.csv'
     df2.to_csv(out2, index=False)
     print(f'Wrote: {out2}')
+    conn.close()
 
 if __name__ == '__main__':
     main()
@@ -1,8 +1,11 @@
+import argparse
 import os
-import glob
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from ck_columnar import read_ck_metrics
+from render import FigureJob, render_figures
+
 def version_key(v):
     parts = list(map(int, v.lstrip('v').split('.')))
     while len(parts) < 3:
@@ -10,6 +13,11 @@ def version_key(v):
     return tuple(parts)
 
 def main():
+    parser = argparse.ArgumentParser(description='Resumo e gráficos das métricas CK por release.')
+    parser.add_argument('--workers', type=int, default=None, help='processos para gerar os gráficos (padrão: nº de CPUs)')
+    parser.add_argument('--force', action='store_true', help='regera todos os gráficos, mesmo sem alteração nos dados')
+    args = parser.parse_args()
+
     root_dir = '../ck_metrics_output'
     metrics = ['loc', 'wmc', 'dit', 'noc', 'cbo', 'lcom', 'rfc']
     stats_keys = {
@@ -25,16 +33,13 @@ def main():
     )
 
     for release in releases:
-        path = os.path.join(root_dir, release)
-        csvs = glob.glob(os.path.join(path, '*.csv'))
-        if not csvs:
+        # lê só as 7 métricas, já filtrando type == 'class' (Parquet se convertido, senão o CSV)
+        try:
+            df = read_ck_metrics(release, 'class', columns=metrics,
+                                 filters=[('type', '==', 'class')], ck_dir=root_dir)
+        except FileNotFoundError:
             print(f'Aviso: nenhum CSV em {release}')
             continue
-        df = pd.read_csv(csvs[0])
-        df.columns = df.columns.str.lower()
-
-        if 'type' in df.columns:
-            df = df[df['type'].str.lower() == 'class']
         if df.empty:
             continue
 
@@ -60,26 +65,45 @@ def main():
     summary_all.to_csv(combined_csv)
     print(f'CSV combinado exportado: {combined_csv}')
 
+    jobs = []
     for m in metrics:
         for key, (label, marker) in stats_keys.items():
-            plt.figure(figsize=(8,4))
-            plt.plot(
-                summary_all.index,
-                summary_all[f'{m}_{key}'],
-                marker=marker,
-                label=f'{m.upper()} {label}'
-            )
-            plt.title(f'Evolução de {m.upper()} – {label} Entre Releases')
-            plt.xlabel('Release')
-            plt.ylabel(label)
-            plt.xticks(rotation=45)
-            plt.legend()
-            plt.tight_layout()
-            fn = f'evolution_{m}_{key}_across_20_releases.png'
-            plt.savefig(fn)
-            plt.close()
-            print(f'Gerado: {fn}')
+            jobs.append(FigureJob(
+                plot_metric_evolution,
+                f'evolution_{m}_{key}_across_20_releases.png',
+                summary_all[[f'{m}_{key}']],
+                {'metric': m, 'label': label, 'marker': marker},
+            ))
+    jobs.append(FigureJob(
+        plot_all_metrics,
+        'evolution_all_metrics_across_20_releases.png',
+        summary_all,
+        {'metrics': metrics, 'stats_keys': stats_keys},
+    ))
+    mean_cols = [f'{m}_mean' for m in metrics]
+    jobs.append(FigureJob(plot_mean_table, 'ck_metrics_mean_summary_table.png', summary_all[mean_cols]))
 
+    render_figures(jobs, workers=args.workers, force=args.force)
+
+def plot_metric_evolution(data, output, metric, label, marker):
+    col = data.columns[0]
+    plt.figure(figsize=(8,4))
+    plt.plot(
+        data.index,
+        data[col],
+        marker=marker,
+        label=f'{metric.upper()} {label}'
+    )
+    plt.title(f'Evolução de {metric.upper()} – {label} Entre Releases')
+    plt.xlabel('Release')
+    plt.ylabel(label)
+    plt.xticks(rotation=45)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(output)
+    plt.close()
+
+def plot_all_metrics(summary_all, output, metrics, stats_keys):
     plt.figure(figsize=(12,6))
     for m in metrics:
         for key, (label, marker) in stats_keys.items():
@@ -96,13 +120,11 @@ def main():
     plt.xticks(rotation=45)
     plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.tight_layout()
-    combined_fn = 'evolution_all_metrics_across_20_releases.png'
-    plt.savefig(combined_fn)
+    plt.savefig(output)
     plt.close()
-    print(f'Gerado: {combined_fn}')
-    mean_cols = [f'{m}_mean' for m in metrics]
-    table_df = summary_all[mean_cols]
 
+def plot_mean_table(table_df, output):
+    mean_cols = list(table_df.columns)
     fig, ax = plt.subplots(figsize=(len(mean_cols)*1.5 + 2, len(table_df)*0.4 + 2))
     ax.axis('off')
     tbl = ax.table(
@@ -116,9 +138,8 @@ def main():
     tbl.set_fontsize(10)
     tbl.scale(1, 1.5)
     plt.tight_layout()
-    table_fn = 'ck_metrics_mean_summary_table.png'
-    fig.savefig(table_fn, dpi=150)
+    fig.savefig(output, dpi=150)
     plt.close(fig)
-    print(f'Gerado tabela de médias: {table_fn}')
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,91 @@
+"""
+Agregados por arquivo mantidos de forma incremental (refactoring_counts.json,
+spotbugs_category_counts.json).
+
+Cada agregado tem um manifesto JSON com, por arquivo de entrada, tamanho, mtime,
+sha256 e o resultado já calculado daquele arquivo. refresh() só chama parse() para
+arquivos novos ou alterados e reaproveita o resultado dos demais; arquivos que
+sumiram da pasta saem do manifesto (e do agregado). Um arquivo com mtime/tamanho
+diferentes mas o mesmo sha256 (ex.: copiado de novo) não é relido.
+
+Formato do manifesto:
+    {"version": 1, "files": {"<nome>": {"size": ..., "mtime_ns": ..., "sha256": "...", "result": ...}}}
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+HASH_BLOCK = 1 << 20
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    """Entradas do manifesto; vazio se não existir ou for de outra versão."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+
+def write_json(path, data, **kwargs):
+    """Grava em .tmp e renomeia: uma execução interrompida não deixa JSON pela metade."""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp, path)
+
+
+class RefreshStats:
+    def __init__(self):
+        self.parsed = []
+        self.reused = 0
+        self.removed = []
+
+    def __str__(self):
+        return (f'{len(self.parsed)} arquivo(s) lido(s), {self.reused} reaproveitado(s), '
+                f'{len(self.removed)} removido(s)')
+
+
+def refresh(input_dir, suffix, parse, manifest_path, rebuild=False):
+    """
+    Atualiza o manifesto de manifest_path com os arquivos "*<suffix>" de input_dir.
+    parse(caminho) devolve o resultado (serializável em JSON) de um arquivo.
+    rebuild=True relê todos. Retorna ({nome: resultado} em ordem de nome, RefreshStats).
+    """
+    previous = {} if rebuild else load_manifest(manifest_path)
+    entries = {}
+    stats = RefreshStats()
+    for fname in sorted(os.listdir(input_dir)):
+        if not fname.endswith(suffix):
+            continue
+        path = os.path.join(input_dir, fname)
+        st = os.stat(path)
+        old = previous.get(fname)
+        if old and old['size'] == st.st_size and old['mtime_ns'] == st.st_mtime_ns:
+            entries[fname] = old
+            stats.reused += 1
+            continue
+        sha = file_sha256(path)
+        if old and old['sha256'] == sha:
+            entries[fname] = {**old, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            stats.reused += 1
+            continue
+        entries[fname] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': sha, 'result': parse(path)}
+        stats.parsed.append(fname)
+    stats.removed = sorted(set(previous) - set(entries))
+
+    write_json(manifest_path, {'version': MANIFEST_VERSION, 'files': entries}, indent=1)
+    return {fname: entry['result'] for fname, entry in entries.items()}, stats
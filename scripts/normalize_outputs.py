@@ -1,47 +1,38 @@
 """
-Normaliza resultados de SpotBugs (XML) e Refactoring Miner (JSON) em CSVs, relacionáveis pelo nome de classe.
+Normaliza resultados de SpotBugs (XML) e Refactoring Miner (JSON) em CSVs, relacionáveis pela
+coluna class_id (índice compartilhado de class_index.py; classes internas usam o ID da externa).
 Uso:
     python normalize_traccar_results.py --version 5.3
 """
 import os
+import re
 import glob
 import argparse
-import xml.etree.ElementTree as ET
-import json
 import pandas as pd
 
+from class_index import class_from_path, open_index
+from refactoring_reader import iter_refactorings
+from spotbugs_reader import ROW_COLUMNS, iter_rows
+
+# refactoring_<tag anterior>_to_<tag>.json (tags com ou sem "v")
+RF_NAME = re.compile(r'refactoring_(?P<prev>.+)_to_(?P<tag>.+)\.json$')
+
+
+def refactoring_jsons(rf_dir, version):
+    """JSONs dos intervalos que começam ou terminam exatamente na versão."""
+    jsons = []
+    for path in sorted(glob.glob(os.path.join(rf_dir, '*.json'))):
+        m = RF_NAME.match(os.path.basename(path))
+        if m and version in (m.group('prev').removeprefix('v'), m.group('tag').removeprefix('v')):
+            jsons.append(path)
+    return jsons
+
 
 def parse_spotbugs(xml_path):
-    """Parse XML SpotBugs e retorna DataFrame com colunas:
+    """Parse XML SpotBugs (em streaming) e retorna DataFrame com colunas:
     class, bug_type, priority, category, sourcefile, sourcepath, start_line, end_line
     """
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-    rows = []
-    for bug in root.findall('.//BugInstance'):
-        bug_type = bug.get('type')
-        priority = bug.get('priority')
-        category = bug.get('category')
-        cls_elem = bug.find('.//Class')
-        cls = cls_elem.get('classname') if cls_elem is not None else None
-        sl = bug.find('.//SourceLine')
-        if sl is None:
-            continue
-        sourcefile = sl.get('sourcefile')
-        sourcepath = sl.get('sourcepath')
-        start = sl.get('start')
-        end = sl.get('end')
-        rows.append({
-            'class': cls,
-            'bug_type': bug_type,
-            'priority': priority,
-            'category': category,
-            'sourcefile': sourcefile,
-            'sourcepath': sourcepath,
-            'start_line': start,
-            'end_line': end,
-        })
-    return pd.DataFrame(rows)
+    return pd.DataFrame(iter_rows(xml_path), columns=ROW_COLUMNS)
 
 
 def parse_refactorings(json_paths):
@@ -50,31 +41,19 @@ def parse_refactorings(json_paths):
     """
     rows = []
     for path in json_paths:
-        data = json.load(open(path, encoding='utf-8'))
-        for commit in data.get('commits', []):
-            sha = commit.get('sha1')
-            for rf in commit.get('refactorings', []):
-                rtype = rf.get('type')
-                desc = rf.get('description')
-                for loc in rf.get('rightSideLocations', []):
-                    fp = loc.get('filePath')
-                    # remove prefix up to src/main/java/
-                    prefix = 'src/main/java/'
-                    if fp.startswith(prefix):
-                        cls_path = fp[len(prefix):]
-                    else:
-                        cls_path = fp
-                    # remove extension and convert to dotted
-                    if cls_path.endswith('.java'):
-                        cls_path = cls_path[:-5]
-                    cls = cls_path.replace('/', '.')
-                    rows.append({
-                        'commit': sha,
-                        'refactoring_type': rtype,
-                        'description': desc,
-                        'file_path': fp,
-                        'class': cls,
-                    })
+        for sha, rf in iter_refactorings(path):
+            rtype = rf.get('type')
+            desc = rf.get('description')
+            for loc in rf.get('rightSideLocations', []):
+                fp = loc.get('filePath')
+                cls = class_from_path(fp)
+                rows.append({
+                    'commit': sha,
+                    'refactoring_type': rtype,
+                    'description': desc,
+                    'file_path': fp,
+                    'class': cls,
+                })
     return pd.DataFrame(rows)
 
 
@@ -91,16 +70,21 @@ def main():
     if not os.path.exists(sb_path):
         raise FileNotFoundError(f"SpotBugs XML não encontrado: {sb_path}")
 
-    jsons = [f for f in glob.glob(os.path.join(rf_dir, '*.json')) if f"v{v}" in os.path.basename(f)]
+    jsons = refactoring_jsons(rf_dir, v)
     if not jsons:
         raise FileNotFoundError(f"Nenhum JSON de refatoração encontrado para {v} em {rf_dir}")
 
     df_sb = parse_spotbugs(sb_path)
+    df_rf = parse_refactorings(jsons)
+    with open_index() as index:
+        df_sb['class_id'] = index.ids(df_sb['class'])
+        if not df_rf.empty:
+            df_rf['class_id'] = index.ids(df_rf['class'])
+
     out_sb = f'normalized_spotbugs_{v}.csv'
     df_sb.to_csv(out_sb, index=False)
     print(f'Exportado {out_sb}')
 
-    df_rf = parse_refactorings(jsons)
     out_rf = f'normalized_refactorings_{v}.csv'
     df_rf.to_csv(out_rf, index=False)
     print(f'Exportado {out_rf}')
@@ -0,0 +1,329 @@
+"""
+Serviço HTTP/JSON local com consultas sobre os resultados da análise.
+
+Carrega uma vez o painel classe × release (build_panel: métricas CK, bugs e
+refatorações) e os fingerprints dos relatórios do SpotBugs (spotbugs_diff), e
+responde das estruturas em memória:
+
+  GET /releases                                   releases do painel
+  GET /top?release=6.7.2&metric=wmc&k=10          top-k classes por métrica em uma release
+  GET /class?name=org.traccar.Main                histórico de uma classe em todas as releases
+  GET /bug-types?from=6.6&to=6.7.0                por tipo de bug: introduzidos, corrigidos, persistentes
+  GET /bug-types?release=6.7.2                    bugs por tipo em uma release
+  GET /stats                                      estado do cache e da última carga
+
+As respostas ficam em um cache LRU (--cache-size entradas, --cache-ttl segundos).
+No máximo a cada RELOAD_CHECK_SECONDS, uma requisição confere tamanho e mtime dos
+arquivos de entrada; se algum mudou (ou apareceu/sumiu), os dados são recarregados
+e o cache é descartado. Enquanto recarrega, as outras requisições seguem com os
+dados anteriores.
+
+Uso:
+    python query_service.py
+    python query_service.py --port 8765 --cache-size 1024 --cache-ttl 300
+    curl 'http://127.0.0.1:8765/top?release=6.7.2&metric=bugs&k=5'
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from build_panel import CK_DIR, REF_DIR, SB_DIR, build_panel, version_key
+from class_index import canonical_class, open_index
+from spotbugs_diff import SB_DIR as SB_XML_DIR
+from spotbugs_diff import DIFF_COLUMNS, diff_indexes, fingerprint_index, list_reports
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+CACHE_SIZE = 1024
+CACHE_TTL = 300
+
+# Intervalo mínimo (s) entre verificações de mudança nos arquivos de entrada
+RELOAD_CHECK_SECONDS = 5
+
+TOP_K = 10
+MAX_K = 1000
+
+# Colunas do painel que não são métricas consultáveis em /top
+_NOT_METRICS = {'class', 'in_ck', 'from_release', 'prev_release'}
+
+
+class QueryError(Exception):
+    """Erro de parâmetros da consulta (resposta com o status indicado)."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class TTLCache:
+    """Cache LRU com expiração: descarta a entrada menos usada quando passa de
+    max_entries e ignora as mais antigas que ttl segundos."""
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and time.monotonic() - item[0] < self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def source_signature(dirs):
+    """(caminho, tamanho, mtime) de todos os arquivos das pastas: muda se algum arquivo mudar."""
+    signature = []
+    for base in dirs:
+        for dirpath, _, files in os.walk(base):
+            for fname in files:
+                path = os.path.join(dirpath, fname)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                signature.append((path, st.st_size, st.st_mtime_ns))
+    return sorted(signature)
+
+
+class Dataset:
+    """Painel e índices de fingerprints carregados de uma vez."""
+
+    def __init__(self, ck_dir, sb_dir, ref_dir, sb_xml_dir):
+        with open_index() as index:
+            self.panel = build_panel(index, ck_dir=ck_dir, sb_dir=sb_dir, ref_dir=ref_dir)
+        self.releases = self.panel.attrs['releases']
+        self.metrics = [c for c in self.panel.columns
+                        if c not in _NOT_METRICS and pd.api.types.is_numeric_dtype(self.panel[c])]
+        by_release = self.panel.reset_index(level='class_id')
+        self.by_release = {release: rows for release, rows in by_release.groupby(level='release', sort=False)}
+        classes = self.panel['class'].groupby(level='class_id').first()
+        self.class_ids = dict(zip(classes.values, classes.index))
+        self.fingerprints = {v: fingerprint_index(path) for v, path in list_reports(sb_xml_dir)}
+        self.loaded_at = time.time()
+
+    def top(self, release, metric, k):
+        if release not in self.by_release:
+            raise QueryError(f'release desconhecida: {release}', 404)
+        if metric not in self.metrics:
+            raise QueryError(f'métrica desconhecida: {metric} (disponíveis: {", ".join(self.metrics)})')
+        rows = self.by_release[release]
+        rows = rows[rows[metric].notna()].nlargest(k, metric)
+        return {'release': release, 'metric': metric,
+                'classes': records(rows[['class_id', 'class', metric]])}
+
+    def class_history(self, name):
+        class_id = self.class_ids.get(name, self.class_ids.get(canonical_class(name)))
+        if class_id is None:
+            raise QueryError(f'classe desconhecida: {name}', 404)
+        history = self.panel.xs(class_id, level='class_id')
+        return {'class_id': int(class_id), 'class': history['class'].iloc[0],
+                'history': records(history.drop(columns='class').reset_index())}
+
+    def bug_types(self, release=None, from_release=None, to_release=None):
+        if release:
+            index = self._fingerprints(release)
+            counts = Counter()
+            for fp, n in index.items():
+                counts[fp[0]] += n
+            return {'release': release,
+                    'bug_types': [{'bug_type': t, 'bugs': n} for t, n in counts.most_common()]}
+        if not (from_release and to_release):
+            raise QueryError('informe "release" ou "from" e "to"')
+        details = diff_indexes(self._fingerprints(from_release), self._fingerprints(to_release))
+        by_type = details.groupby('bug_type')[DIFF_COLUMNS].sum().reset_index()
+        by_type = by_type.sort_values(['introduced', 'fixed', 'bug_type'], ascending=[False, False, True])
+        return {'from': from_release, 'to': to_release, 'bug_types': records(by_type)}
+
+    def _fingerprints(self, release):
+        if release not in self.fingerprints:
+            raise QueryError(f'sem relatório do SpotBugs para a release {release}', 404)
+        return self.fingerprints[release]
+
+
+def records(df):
+    """DataFrame -> lista de dicts com tipos nativos (NaN vira null)."""
+    rows = df.to_dict(orient='records')
+    for row in rows:
+        for key, value in row.items():
+            if hasattr(value, 'item'):
+                value = value.item()
+            if isinstance(value, float) and math.isnan(value):
+                value = None
+            row[key] = value
+    return rows
+
+
+class QueryService:
+    """Dados atuais, cache de respostas e recarga quando as entradas mudam."""
+
+    def __init__(self, ck_dir=CK_DIR, sb_dir=SB_DIR, ref_dir=REF_DIR, sb_xml_dir=SB_XML_DIR,
+                 cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL):
+        self.sources = (ck_dir, sb_dir, ref_dir, sb_xml_dir)
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.generation = 0
+        self.reloads = 0
+        self.reload_error = None
+        self._reload_lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._signature = source_signature(self.sources)
+        self.data = Dataset(*self.sources)
+
+    def maybe_reload(self):
+        """Recarrega se as entradas mudaram; só uma thread recarrega por vez."""
+        if time.monotonic() - self._checked_at < RELOAD_CHECK_SECONDS:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            signature = source_signature(self.sources)
+            if signature == self._signature:
+                return
+            try:
+                data = Dataset(*self.sources)
+            except Exception as e:  # arquivo pela metade etc.: tenta de novo na próxima verificação
+                self.reload_error = f'{type(e).__name__}: {e}'
+                print(f'Aviso: recarga falhou ({self.reload_error}); mantendo os dados anteriores')
+                return
+            self.data = data
+            self._signature = signature
+            self.generation += 1
+            self.reloads += 1
+            self.reload_error = None
+            self.cache.clear()
+            print(f'Dados recarregados ({len(data.releases)} releases)')
+        finally:
+            self._reload_lock.release()
+
+    def query(self, path, params):
+        """Resposta (dict) da consulta; levanta QueryError para parâmetros inválidos."""
+        data = self.data
+        if path == '/releases':
+            return {'releases': data.releases, 'spotbugs_releases': sorted(data.fingerprints, key=version_key)}
+        if path == '/top':
+            release = _param(params, 'release', required=True)
+            metric = _param(params, 'metric', default='bugs')
+            try:
+                k = int(_param(params, 'k', default=TOP_K))
+            except ValueError:
+                raise QueryError('"k" deve ser um inteiro')
+            if not 1 <= k <= MAX_K:
+                raise QueryError(f'"k" deve estar entre 1 e {MAX_K}')
+            return data.top(release, metric, k)
+        if path == '/class':
+            return data.class_history(_param(params, 'name', required=True))
+        if path == '/bug-types':
+            return data.bug_types(_param(params, 'release'), _param(params, 'from'), _param(params, 'to'))
+        if path == '/stats':
+            return {'generation': self.generation, 'reloads': self.reloads, 'reload_error': self.reload_error,
+                    'loaded_at': data.loaded_at, 'cache_entries': len(self.cache),
+                    'cache_hits': self.cache.hits, 'cache_misses': self.cache.misses}
+        raise QueryError(f'consulta desconhecida: {path}', 404)
+
+    def handle(self, path, params):
+        """(status, corpo JSON em bytes), do cache quando possível."""
+        self.maybe_reload()
+        if path == '/stats':
+            return 200, _dumps(self.query(path, params))
+        key = (self.generation, path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        body = self.cache.get(key)
+        if body is None:
+            try:
+                body = _dumps(self.query(path, params))
+            except QueryError as e:
+                return e.status, _dumps({'error': str(e)})
+            self.cache.put(key, body)
+        return 200, body
+
+
+def _param(params, name, required=False, default=None):
+    values = params.get(name)
+    if not values or not values[0]:
+        if required:
+            raise QueryError(f'parâmetro obrigatório: "{name}"')
+        return default
+    return values[0]
+
+
+def _dumps(payload):
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            try:
+                status, body = service.handle(url.path.rstrip('/') or '/', parse_qs(url.query))
+            except Exception as e:
+                status, body = 500, _dumps({'error': f'{type(e).__name__}: {e}'})
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serviço HTTP/JSON de consultas sobre os resultados da análise.')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='máximo de respostas no cache')
+    parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL, help='segundos até uma resposta expirar')
+    parser.add_argument('--ck-dir', default=CK_DIR)
+    parser.add_argument('--sb-dir', default=SB_DIR, help='pasta com os CSVs normalizados do SpotBugs')
+    parser.add_argument('--ref-dir', default=REF_DIR, help='pasta com as contagens de refatorações')
+    parser.add_argument('--spotbugs-dir', default=SB_XML_DIR, help='pasta com os spotbugs_<versão>.xml')
+    args = parser.parse_args()
+
+    print('Carregando os dados…')
+    service = QueryService(args.ck_dir, args.sb_dir, args.ref_dir, args.spotbugs_dir,
+                           args.cache_size, args.cache_ttl)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    print(f'{len(service.data.releases)} releases carregadas; ouvindo em http://{args.host}:{args.port}/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Leitura em streaming dos JSONs do RefactoringMiner.
+
+O arquivo é lido em blocos e cada commit de "commits" é decodificado assim que
+fica completo no buffer, então a memória fica limitada ao maior commit em vez
+do arquivo inteiro. Aceita tanto {"commits": [...]} quanto uma lista de commits
+no topo do arquivo.
+"""
+import json
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _JsonStream:
+    """Buffer incremental sobre um arquivo texto, com leitura de valores JSON
+    completos um de cada vez.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self, size=CHUNK_SIZE):
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > CHUNK_SIZE:
+            # descarta o que já foi consumido
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        """Pula espaços e retorna o próximo caractere ('' no fim do arquivo)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read_more():
+                return ''
+
+    def expect(self, ch):
+        found = self.peek()
+        if found != ch:
+            raise ValueError(f"JSON inválido: esperado {ch!r}, encontrado {found!r} em {self.f.name}")
+        self.pos += 1
+
+    def value(self):
+        """Decodifica o próximo valor JSON, lendo mais do arquivo até ele estar
+        completo no buffer.
+        """
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                obj, end = None, None
+            # um número no fim do buffer pode continuar no próximo bloco
+            if end is not None and (end < len(self.buf) or self.eof):
+                self.pos = end
+                return obj
+            # lê pelo menos o que já está pendente, para não decodificar de novo a cada bloco
+            if not self._read_more(max(CHUNK_SIZE, len(self.buf) - self.pos)) and end is not None:
+                self.pos = end
+                return obj
+
+    def items(self):
+        """Gera os elementos do array que começa na posição atual."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            sep = self.peek()
+            self.pos += 1
+            if sep == ']':
+                return
+            if sep != ',':
+                raise ValueError(f"JSON inválido: esperado ',' ou ']', encontrado {sep!r} em {self.f.name}")
+
+
+def iter_commits(path):
+    """Gera os commits (dicts) de um JSON do RefactoringMiner, um por vez."""
+    with open(path, encoding='utf-8') as f:
+        stream = _JsonStream(f)
+        first = stream.peek()
+        if first == '[':
+            commits = stream.items()
+        elif first == '{':
+            commits = _iter_commits_field(stream)
+        else:
+            return
+        for commit in commits:
+            if isinstance(commit, dict):
+                yield commit
+
+
+def _iter_commits_field(stream):
+    stream.expect('{')
+    while stream.peek() != '}':
+        key = stream.value()
+        stream.expect(':')
+        if key == 'commits' and stream.peek() == '[':
+            yield from stream.items()
+        else:
+            stream.value()
+        if stream.peek() == ',':
+            stream.pos += 1
+
+
+def iter_refactorings(path):
+    """Gera (sha1 do commit, refatoração) para cada refatoração do arquivo."""
+    for commit in iter_commits(path):
+        sha = commit.get('sha1')
+        for ref in commit.get('refactorings', []):
+            if isinstance(ref, dict):
+                yield sha, ref
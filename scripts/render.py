@@ -0,0 +1,124 @@
+"""
+Renderização de gráficos em paralelo e incremental.
+
+Cada figura é descrita por um FigureJob (função de plot, arquivo de saída, dados
+e opções). render_figures distribui as figuras por um pool de processos com o
+backend não interativo Agg e pula as que não mudaram: o hash dos dados, das
+opções e do código da função de plot fica em ".render_manifest.json" na pasta
+de cada figura. Scripts que rodam ao mesmo tempo (modo --dag) gravam o mesmo
+manifesto: cada um só acrescenta as suas entradas, com trava exclusiva.
+"""
+import hashlib
+import inspect
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+matplotlib.use('Agg')
+
+MANIFEST_NAME = '.render_manifest.json'
+
+FigureJob = namedtuple('FigureJob', ['func', 'output', 'data', 'options'])
+FigureJob.__new__.__defaults__ = ({},)
+
+
+def _data_bytes(data):
+    if hasattr(data, 'to_csv'):
+        # DataFrame/Series: o CSV inclui índice e colunas
+        return data.to_csv().encode('utf-8')
+    return json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+
+
+def job_hash(job):
+    digest = hashlib.sha256()
+    digest.update(job.func.__qualname__.encode('utf-8'))
+    try:
+        digest.update(inspect.getsource(job.func).encode('utf-8'))
+    except (OSError, TypeError):
+        pass
+    digest.update(_data_bytes(job.data))
+    digest.update(json.dumps(job.options, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _manifest_path(output):
+    return os.path.join(os.path.dirname(os.path.abspath(output)), MANIFEST_NAME)
+
+
+def _load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_manifest(path, entries):
+    """
+    Acrescenta entries ao manifesto relendo-o com trava exclusiva (outro script
+    pode ter gravado entradas desde a leitura inicial) e o substitui de uma vez.
+    """
+    with open(path + '.lock', 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = _load_manifest(path)
+        manifest.update(entries)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+
+def _render(job):
+    import matplotlib.pyplot as plt
+
+    job.func(job.data, job.output, **job.options)
+    plt.close('all')
+    return job.output
+
+
+def render_figures(jobs, workers=None, force=False):
+    """Gera as figuras que mudaram desde a última execução. Retorna a lista de
+    arquivos gerados (as figuras puladas não entram).
+    """
+    manifests = {}
+    pending = []
+    for job in jobs:
+        mpath = _manifest_path(job.output)
+        if mpath not in manifests:
+            manifests[mpath] = _load_manifest(mpath)
+        h = job_hash(job)
+        name = os.path.basename(job.output)
+        if not force and os.path.exists(job.output) and manifests[mpath].get(name) == h:
+            continue
+        pending.append((job, mpath, name, h))
+
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f'{skipped} figura(s) sem alteração, pulando')
+
+    rendered = []
+    updates = {}
+    try:
+        if pending:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_render, job): (mpath, name, h) for job, mpath, name, h in pending}
+                for future in as_completed(futures):
+                    mpath, name, h = futures[future]
+                    output = future.result()
+                    updates.setdefault(mpath, {})[name] = h
+                    rendered.append(output)
+                    print(f'Gerado: {output}')
+    finally:
+        # grava o que já foi gerado mesmo se alguma figura falhar
+        for mpath, entries in updates.items():
+            _update_manifest(mpath, entries)
+    return rendered
@@ -0,0 +1,135 @@
+"""
+Diff dos relatórios do SpotBugs entre releases consecutivas: bugs introduzidos,
+corrigidos e persistentes por classe e por intervalo.
+
+Comparar só a contagem por classe (bugs_<v1> x bugs_<v2>, como em analyze_heavy)
+esconde um bug corrigido e outro introduzido na mesma classe. Aqui cada
+<BugInstance> vira um fingerprint sem números de linha (spotbugs_reader.bug_fingerprint:
+tipo, classe, método + assinatura, campo) e cada release vira um índice
+{fingerprint: ocorrências}, lido uma única vez. Para cada par consecutivo:
+  introduced = max(0, depois - antes)
+  fixed      = max(0, antes - depois)
+  persisting = min(antes, depois)
+por fingerprint (ocorrências repetidas do mesmo fingerprint, ex.: o mesmo bug em
+duas linhas do mesmo método, são pareadas pela contagem), em tempo linear no
+número de bugs. Os totais são somados por classe de nível superior (class_id).
+
+Saídas em ../spotbugs_diff/:
+  spotbugs_diff_<v1>_to_<v2>.csv          -- class_id, class, bugs_<v1>, bugs_<v2>, introduced, fixed, persisting
+  spotbugs_diff_all_intervals.csv         -- todos os intervalos, com from_release e to_release
+  spotbugs_diff_details_<v1>_to_<v2>.csv  -- (--details) um fingerprint por linha
+
+Uso:
+    python spotbugs_diff.py
+    python spotbugs_diff.py --details
+"""
+import argparse
+import os
+import re
+from collections import Counter
+
+import pandas as pd
+
+from class_index import open_index, with_class_id
+from spotbugs_reader import FINGERPRINT_COLUMNS, bug_fingerprint, iter_bug_instances
+
+SB_DIR = '../spotbugs'
+OUTPUT_DIR = '../spotbugs_diff'
+
+SB_PATTERN = re.compile(r'spotbugs_v?(?P<v>[0-9]+(?:\.[0-9]+)*)\.xml$')
+
+DIFF_COLUMNS = ['introduced', 'fixed', 'persisting']
+
+
+def version_key(v):
+    return tuple(int(p) for p in v.lstrip('v').split('.'))
+
+
+def list_reports(sb_dir=SB_DIR):
+    """[(versão, caminho)] dos spotbugs_<v>.xml, em ordem de versão."""
+    reports = []
+    for fname in os.listdir(sb_dir):
+        m = SB_PATTERN.match(fname)
+        if m:
+            reports.append((m.group('v'), os.path.join(sb_dir, fname)))
+    return sorted(reports, key=lambda r: version_key(r[0]))
+
+
+def fingerprint_index(xml_path):
+    """Counter {fingerprint: ocorrências} de um relatório."""
+    return Counter(bug_fingerprint(bug) for bug in iter_bug_instances(xml_path))
+
+
+def diff_indexes(before, after):
+    """
+    Uma linha por fingerprint presente em alguma das duas releases, com as colunas
+    de FINGERPRINT_COLUMNS e introduced, fixed, persisting.
+    """
+    rows = []
+    for fp in before.keys() | after.keys():
+        b, a = before.get(fp, 0), after.get(fp, 0)
+        rows.append((*fp, max(a - b, 0), max(b - a, 0), min(a, b)))
+    details = pd.DataFrame(rows, columns=FINGERPRINT_COLUMNS + DIFF_COLUMNS)
+    return details.sort_values(FINGERPRINT_COLUMNS).reset_index(drop=True)
+
+
+def iter_diffs(reports):
+    """Gera (v1, v2, detalhes) para cada par consecutivo; cada XML é lido uma vez."""
+    prev = None
+    for version, path in reports:
+        current = fingerprint_index(path)
+        if prev is not None:
+            yield prev[0], version, diff_indexes(prev[1], current)
+        prev = (version, current)
+
+
+def diff_by_class(details, index):
+    """
+    Soma os detalhes por classe de nível superior. Colunas: class_id, class,
+    bugs_from, bugs_to, introduced, fixed, persisting (mais introduzidos primeiro).
+    """
+    df = with_class_id(details, index)
+    by_class = df.groupby('class_id')[DIFF_COLUMNS].sum()
+    by_class.insert(0, 'bugs_from', by_class['fixed'] + by_class['persisting'])
+    by_class.insert(1, 'bugs_to', by_class['introduced'] + by_class['persisting'])
+    by_class = by_class.reset_index()
+    by_class.insert(1, 'class', index.class_names(by_class['class_id']).values)
+    return by_class.sort_values(['introduced', 'fixed', 'class'], ascending=[False, False, True]) \
+        .reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bugs introduzidos, corrigidos e persistentes entre releases.')
+    parser.add_argument('--sb-dir', default=SB_DIR, help='pasta com os spotbugs_<versão>.xml')
+    parser.add_argument('--output', default=OUTPUT_DIR, help='pasta das saídas')
+    parser.add_argument('--details', action='store_true', help='grava também um CSV por fingerprint por intervalo')
+    args = parser.parse_args()
+
+    reports = list_reports(args.sb_dir)
+    if len(reports) < 2:
+        raise SystemExit(f'São necessários ao menos dois relatórios em {args.sb_dir}')
+    os.makedirs(args.output, exist_ok=True)
+
+    frames = []
+    with open_index() as index:
+        for v1, v2, details in iter_diffs(reports):
+            by_class = diff_by_class(details, index)
+            by_class.rename(columns={'bugs_from': f'bugs_{v1}', 'bugs_to': f'bugs_{v2}'}).to_csv(
+                os.path.join(args.output, f'spotbugs_diff_{v1}_to_{v2}.csv'), index=False)
+            if args.details:
+                details.to_csv(os.path.join(args.output, f'spotbugs_diff_details_{v1}_to_{v2}.csv'), index=False)
+            totals = by_class[DIFF_COLUMNS].sum()
+            print(f'{v1} -> {v2}: {totals["introduced"]} introduzidos, {totals["fixed"]} corrigidos, '
+                  f'{totals["persisting"]} persistentes')
+            frames.append(by_class.assign(from_release=v1, to_release=v2))
+
+    combined = pd.concat(frames, ignore_index=True)
+    combined = combined[['from_release', 'to_release'] + [c for c in combined.columns
+                                                          if c not in ('from_release', 'to_release')]]
+    path = os.path.join(args.output, 'spotbugs_diff_all_intervals.csv')
+    combined.to_csv(path, index=False)
+    print(f'CSV combinado exportado: {path}')
+
+
+if __name__ == '__main__':
+    main()
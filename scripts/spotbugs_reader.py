@@ -0,0 +1,116 @@
+"""
+Leitura em streaming dos XMLs do SpotBugs.
+
+Usa ET.iterparse e limpa cada elemento filho do <BugCollection> assim que ele
+termina, então a memória fica limitada a um <BugInstance> por vez, independente
+do tamanho do relatório. Uma única passada por arquivo produz a contagem por
+categoria, a contagem por tipo e as linhas normalizadas.
+
+bug_fingerprint identifica um bug entre releases sem depender de números de linha
+(usado por spotbugs_diff.py).
+"""
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+
+ROW_COLUMNS = [
+    'class', 'bug_type', 'priority', 'category',
+    'sourcefile', 'sourcepath', 'start_line', 'end_line',
+]
+
+FINGERPRINT_COLUMNS = ['bug_type', 'class', 'method', 'signature', 'field']
+
+
+def iter_bug_instances(xml_path):
+    """Gera cada elemento <BugInstance> do XML. O elemento só é válido até o
+    próximo item ser pedido; depois disso ele é descartado.
+    """
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(xml_path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if elem.tag == 'BugInstance':
+            yield elem
+        if depth == 1:
+            # terminou um filho direto do <BugCollection>: descarta tudo que já foi lido
+            root.clear()
+
+
+def bug_to_row(bug):
+    """Converte um <BugInstance> em dict com as colunas de ROW_COLUMNS.
+    Retorna None se o bug não tiver <SourceLine>.
+    """
+    cls_elem = bug.find('.//Class')
+    sl = bug.find('.//SourceLine')
+    if sl is None:
+        return None
+    return {
+        'class': cls_elem.get('classname') if cls_elem is not None else None,
+        'bug_type': bug.get('type'),
+        'priority': bug.get('priority'),
+        'category': bug.get('category'),
+        'sourcefile': sl.get('sourcefile'),
+        'sourcepath': sl.get('sourcepath'),
+        'start_line': sl.get('start'),
+        'end_line': sl.get('end'),
+    }
+
+
+def bug_fingerprint(bug):
+    """Tupla (bug_type, class, method, signature, field) de um <BugInstance>, sem
+    linhas nem bytecode: o mesmo bug em outra release, com o código deslocado, tem o
+    mesmo fingerprint. Usa o <Class>, <Method> e <Field> principais (os primeiros
+    filhos diretos); os ausentes ficam ''. field é "<classe>.<nome>".
+    """
+    cls = bug.find('Class')
+    method = bug.find('Method')
+    field = bug.find('Field')
+    return (
+        bug.get('type'),
+        cls.get('classname', '') if cls is not None else '',
+        method.get('name', '') if method is not None else '',
+        method.get('signature', '') if method is not None else '',
+        f"{field.get('classname', '')}.{field.get('name', '')}" if field is not None else '',
+    )
+
+
+def iter_rows(xml_path):
+    """Gera as linhas normalizadas (ver bug_to_row) de um XML do SpotBugs."""
+    for bug in iter_bug_instances(xml_path):
+        row = bug_to_row(bug)
+        if row is not None:
+            yield row
+
+
+class SpotBugsSummary:
+    """Agregados de um relatório do SpotBugs:
+    total         -- número de <BugInstance>
+    categories    -- Counter {categoria: qtd}
+    types         -- {categoria: Counter {tipo: qtd}}
+    rows          -- linhas normalizadas (só se pedidas em scan_spotbugs)
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.categories = Counter()
+        self.types = defaultdict(Counter)
+        self.rows = []
+
+
+def scan_spotbugs(xml_path, rows=False):
+    """Lê o XML uma única vez e devolve um SpotBugsSummary."""
+    summary = SpotBugsSummary()
+    for bug in iter_bug_instances(xml_path):
+        cat = bug.get('category', 'Unknown')
+        summary.total += 1
+        summary.categories[cat] += 1
+        summary.types[cat][bug.get('type')] += 1
+        if rows:
+            row = bug_to_row(bug)
+            if row is not None:
+                summary.rows.append(row)
+    return summary
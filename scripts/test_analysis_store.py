@@ -0,0 +1,46 @@
+import os
+
+import analysis_store
+from class_index import ClassIndex
+
+CLASS_CSV = 'class,type,cbo,fanin,fanout,wmc,dit,noc,rfc,lcom,loc\norg.x.A,class,1,0,1,2,1,0,3,0,10\n'
+METHOD_HEADER = 'class,method,line,cbo,wmc,rfc,loc,returnsqty,variablesqty,parametersqty,maxnestedblocksqty\n'
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def count(conn, table):
+    return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_ingest_ck_notices_changes_to_the_method_csv(tmp_path):
+    ck_dir = str(tmp_path / 'ck')
+    parquet_dir = str(tmp_path / 'parquet')
+    release = os.path.join(ck_dir, 'v1.2')
+    write(os.path.join(release, 'ck_metrics.csvclass.csv'), CLASS_CSV)
+    write(os.path.join(release, 'ck_metrics.csvmethod.csv'), METHOD_HEADER + 'org.x.A,m/0,3,1,1,1,4,0,1,0,0\n')
+    conn = analysis_store.connect(str(tmp_path / 'analysis.db'))
+    index = ClassIndex(str(tmp_path / 'class_index.csv'))
+
+    def ingest():
+        return analysis_store.ingest_ck(conn, 'v1.2', index, ck_dir, parquet_dir=parquet_dir)
+
+    assert ingest()
+    assert (count(conn, 'ck_class'), count(conn, 'ck_method')) == (1, 1)
+    assert not ingest()
+
+    # só o CSV de métodos muda: a release tem de ser reingerida
+    write(os.path.join(release, 'ck_metrics.csvmethod.csv'),
+          METHOD_HEADER + 'org.x.A,m/0,3,1,1,1,4,0,1,0,0\norg.x.A,n/1,9,1,1,1,2,0,0,1,0\n')
+    assert ingest()
+    assert count(conn, 'ck_method') == 2
+
+    # CSV de métodos removido: as linhas antigas saem do banco
+    os.remove(os.path.join(release, 'ck_metrics.csvmethod.csv'))
+    assert ingest()
+    assert (count(conn, 'ck_class'), count(conn, 'ck_method')) == (1, 0)
+    assert not ingest()
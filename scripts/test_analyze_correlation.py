@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyze_correlation import Sample, _p_value, correlate
+
+
+def naive_spearman(x, y):
+    rx = pd.Series(x).rank().to_numpy()
+    ry = pd.Series(y).rank().to_numpy()
+    return np.corrcoef(rx, ry)[0, 1]
+
+
+def naive_tau_b(x, y):
+    concordant = discordant = ties_x = ties_y = 0
+    n = len(x)
+    for i in range(n):
+        for j in range(i + 1, n):
+            sx, sy = np.sign(x[i] - x[j]), np.sign(y[i] - y[j])
+            if sx == 0 and sy == 0:
+                continue
+            if sx == 0:
+                ties_x += 1
+            elif sy == 0:
+                ties_y += 1
+            elif sx == sy:
+                concordant += 1
+            else:
+                discordant += 1
+    return (concordant - discordant) / np.sqrt((concordant + discordant + ties_x) * (concordant + discordant + ties_y))
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(3)
+    x = rng.integers(0, 5, 40).astype(float)
+    y = (x + rng.integers(-3, 4, 40)).astype(float)
+    return x, y
+
+
+def test_observed_statistics_match_naive_implementation(data):
+    x, y = data
+    rho, tau = Sample(x, y).statistics(np.ones((1, len(x))))
+    assert rho[0] == pytest.approx(naive_spearman(x, y))
+    assert tau[0] == pytest.approx(naive_tau_b(x, y))
+
+
+def test_bootstrap_weights_match_the_resampled_rows(data):
+    x, y = data
+    rng = np.random.default_rng(0)
+    weights = rng.multinomial(len(x), np.full(len(x), 1 / len(x)), size=5)
+    rho, tau = Sample(x, y).statistics(weights.astype(float))
+    for b, w in enumerate(weights):
+        xs, ys = np.repeat(x, w), np.repeat(y, w)
+        assert rho[b] == pytest.approx(naive_spearman(xs, ys))
+        assert tau[b] == pytest.approx(naive_tau_b(xs, ys))
+
+
+def test_permuted_statistics_match_the_shuffled_rows(data):
+    x, y = data
+    perms = np.argsort(np.random.default_rng(1).random((5, len(x))), axis=1)
+    rho, tau = Sample(x, y).permuted_statistics(perms)
+    for b, p in enumerate(perms):
+        assert rho[b] == pytest.approx(naive_spearman(x, y[p]))
+        assert tau[b] == pytest.approx(naive_tau_b(x, y[p]))
+
+
+def test_results_do_not_depend_on_the_number_of_workers(data):
+    x, y = data
+    datasets = [('a', x, y), ('b', y, x[::-1])]
+    single = correlate(datasets, resamples=250, seed=42, workers=1, batch_size=100)
+    pooled = correlate(datasets, resamples=250, seed=42, workers=2, batch_size=100)
+    pd.testing.assert_frame_equal(single, pooled)
+    other = correlate(datasets, resamples=250, seed=43, workers=1, batch_size=100)
+    assert not single.equals(other)
+
+
+def test_intervals_and_p_values(data):
+    x, y = data
+    monotonic = np.arange(30.0)
+    result = correlate([('noisy', x, y), ('monotonic', monotonic, monotonic ** 2)], resamples=500, seed=0)
+    for stat in ('spearman', 'kendall'):
+        assert ((result[f'{stat}_p_perm'] > 0) & (result[f'{stat}_p_perm'] <= 1)).all()
+        assert (result[f'{stat}_ci_low'] <= result[stat]).all()
+        assert (result[stat] <= result[f'{stat}_ci_high']).all()
+    strong = result.set_index('interval').loc['monotonic']
+    assert strong['spearman'] == pytest.approx(1) and strong['kendall'] == pytest.approx(1)
+    # nenhuma permutação chega a 1: p = 1 / (réplicas + 1)
+    assert strong['spearman_p_perm'] == pytest.approx(1 / 501)
+
+
+def test_small_or_constant_samples_give_nan():
+    result = correlate([('small', np.array([1.0, 2.0]), np.array([2.0, 1.0])),
+                        ('constant', np.arange(5.0), np.zeros(5))], resamples=10, seed=0)
+    assert list(result['n']) == [2, 5]
+    assert result.drop(columns=['interval', 'n']).isna().all().all()
+
+
+def test_p_value_counts_ties_with_the_observed_value():
+    assert _p_value(0.5, np.array([0.5, -0.5, 0.1, np.nan])) == pytest.approx(3 / 4)
+    assert np.isnan(_p_value(np.nan, np.array([0.1])))
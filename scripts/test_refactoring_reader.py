@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import refactoring_reader
+from refactoring_reader import iter_commits, iter_refactorings
+
+
+class TrickleFile:
+    """Arquivo que devolve no máximo `step` caracteres por read(), para que todo
+    valor JSON atravesse vários blocos.
+    """
+
+    def __init__(self, path, step):
+        self.f = open(path, encoding='utf-8')
+        self.name = path
+        self.step = step
+
+    def read(self, size=-1):
+        return self.f.read(self.step)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()
+
+
+def commits(n):
+    return [{'repository': 'r', 'sha1': f'{i:040x}', 'url': 'u',
+             'refactorings': [{'type': 'Rename Method', 'description': f'renão "m{i}" \\ x',
+                               'leftSideLocations': [{'filePath': 'src/main/java/A.java', 'startLine': i * 1000}],
+                               'rightSideLocations': [{'filePath': 'src/main/java/B.java', 'startLine': 12345}]}
+                              for _ in range(i % 3)]}
+            for i in range(n)]
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('layout', ['object', 'list'])
+@pytest.mark.parametrize('step', [1, 7, 4096])
+def test_commits_match_json_load_across_chunk_boundaries(tmp_path, monkeypatch, layout, step):
+    data = commits(20)
+    if layout == 'object':
+        data = {'before': [1, {'x': 2.5e10}], 'commits': data, 'after': 123}
+    path = write_json(tmp_path / 'rm.json', data)
+    monkeypatch.setattr(refactoring_reader, 'open', lambda p, encoding: TrickleFile(p, step), raising=False)
+
+    expected = data['commits'] if layout == 'object' else data
+    assert list(iter_commits(path)) == expected
+
+
+def test_commit_larger_than_chunk_size(tmp_path):
+    big = 'x' * (refactoring_reader.CHUNK_SIZE * 3 + 17)
+    data = {'commits': [{'sha1': 'a', 'refactorings': [{'type': 'Extract Method', 'description': big}]},
+                        {'sha1': 'b', 'refactorings': [{'type': 'Move Class', 'description': 'm'}]}]}
+    path = write_json(tmp_path / 'rm.json', data)
+    assert [(sha, ref['type'], len(ref['description'])) for sha, ref in iter_refactorings(path)] == [
+        ('a', 'Extract Method', len(big)), ('b', 'Move Class', 1)]
+
+
+@pytest.mark.parametrize('text', ['', '{}', '{"commits": []}', '[]', '  [ ]  '])
+def test_empty_inputs(tmp_path, text):
+    path = tmp_path / 'rm.json'
+    path.write_text(text, encoding='utf-8')
+    assert list(iter_commits(str(path))) == []
+
+
+@pytest.mark.parametrize('text', ['{"commits": [{"sha1": "a"}, {"sha1": "b"', '[{"sha1": "a"} {"sha1": "b"}]',
+                                  '{"commits" [1]}'])
+def test_invalid_json_raises(tmp_path, text):
+    path = tmp_path / 'rm.json'
+    path.write_text(text, encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_commits(str(path)))
@@ -0,0 +1,32 @@
+import json
+import os
+
+import render
+from render import FigureJob, render_figures
+
+
+def plot_text(data, output):
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(str(data))
+
+
+def plot_while_another_script_finishes(data, output):
+    # outro script (ex.: extract-metrics-ck no modo --dag) grava o manifesto no meio da renderização
+    render._update_manifest(render._manifest_path(output), {'other.png': 'abc'})
+    plot_text(data, output)
+
+
+def test_concurrent_runs_keep_each_others_manifest_entries(tmp_path):
+    a = str(tmp_path / 'a.png')
+    b = str(tmp_path / 'b.png')
+    assert render_figures([FigureJob(plot_text, a, [1, 2])], workers=1) == [a]
+    assert render_figures([FigureJob(plot_while_another_script_finishes, b, [3])], workers=1) == [b]
+
+    manifest_path = tmp_path / render.MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    assert set(manifest) == {'a.png', 'b.png', 'other.png'}
+    assert not [f for f in os.listdir(tmp_path) if f.endswith('.tmp')]
+
+    # a figura de a continua em dia e não é gerada de novo
+    assert render_figures([FigureJob(plot_text, a, [1, 2])], workers=1) == []
+    assert render_figures([FigureJob(plot_text, a, [1, 2, 3])], workers=1) == [a]
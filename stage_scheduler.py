@@ -0,0 +1,156 @@
+"""
+Escalonador simples de etapas em grafo de dependências (DAG).
+
+Cada Task declara os arquivos que lê (inputs) e os que produz (outputs); uma task
+depende de todas as outras que produzem algum dos seus inputs (inputs que nenhuma
+task produz são considerados já existentes). Dependências sem arquivo podem ser
+declaradas em "after"; tasks com always=True (ex.: limpeza) rodam mesmo se essas
+dependências falharem. Tasks independentes rodam ao mesmo tempo, respeitando o
+número de workers e limites por recurso (ex.: {'jvm': 2, 'heap_mb': 8192}).
+Se uma task falha, só as que dependem dela (direta ou indiretamente) deixam de rodar.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+
+class Task:
+    def __init__(self, name, func, args=(), inputs=(), outputs=(), resources=None, after=(), always=False):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.resources = dict(resources or {})
+        self.after = list(after)
+        self.always = always
+
+    def __repr__(self):
+        return f'Task({self.name!r})'
+
+
+class Scheduler:
+    def __init__(self, workers=1, limits=None, on_event=print):
+        self.workers = max(1, workers)
+        self.limits = dict(limits or {})
+        self.on_event = on_event
+        self.tasks = {}
+        self._in_use = {}
+
+    def add(self, task):
+        if task.name in self.tasks:
+            raise ValueError(f'Task duplicada: {task.name}')
+        self.tasks[task.name] = task
+        return task
+
+    def dependencies(self):
+        """Retorna {task: set(tasks das quais depende)}."""
+        producers = {}
+        for task in self.tasks.values():
+            for out in task.outputs:
+                if out in producers:
+                    raise ValueError(f'"{out}" é produzido por {producers[out]} e {task.name}')
+                producers[out] = task.name
+        deps = {}
+        for task in self.tasks.values():
+            names = {producers[i] for i in task.inputs if i in producers}
+            for name in task.after:
+                if name in self.tasks:
+                    names.add(name)
+            names.discard(task.name)
+            deps[task.name] = names
+        self._check_cycles(deps)
+        return deps
+
+    @staticmethod
+    def _check_cycles(deps):
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f'Ciclo de dependências: {" -> ".join(path + [name])}')
+            state[name] = 'visiting'
+            for dep in deps[name]:
+                visit(dep, path + [name])
+            state[name] = 'done'
+
+        for name in deps:
+            visit(name, [])
+
+    def _fits(self, task, running):
+        if not running:
+            # uma task maior que o limite ainda roda, mas sozinha
+            return True
+        for res, amount in task.resources.items():
+            limit = self.limits.get(res)
+            if limit is not None and self._in_use.get(res, 0) + amount > limit:
+                return False
+        return True
+
+    def _acquire(self, task):
+        for res, amount in task.resources.items():
+            self._in_use[res] = self._in_use.get(res, 0) + amount
+
+    def _release(self, task):
+        for res, amount in task.resources.items():
+            self._in_use[res] -= amount
+
+    def run(self):
+        """Executa todas as tasks. Retorna (status, erros): {nome: done/failed/skipped}
+        e {nome: exceção} das que falharam.
+        """
+        deps = self.dependencies()
+        status = {}
+        errors = {}
+        waiting = list(self.tasks)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while waiting or running:
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for name in list(waiting):
+                        task = self.tasks[name]
+                        dep_status = [status.get(d) for d in deps[name]]
+                        if task.always:
+                            # só espera as dependências terminarem, com ou sem sucesso
+                            dep_status = [DONE if s is not None else s for s in dep_status]
+                        if any(s in (FAILED, SKIPPED) for s in dep_status):
+                            waiting.remove(name)
+                            status[name] = SKIPPED
+                            self.on_event(f'    → {name}: pulada (dependência falhou)')
+                            progressed = True
+                            continue
+                        if len(running) >= self.workers or not all(s == DONE for s in dep_status):
+                            continue
+                        if not self._fits(task, running):
+                            continue
+                        waiting.remove(name)
+                        self._acquire(task)
+                        self.on_event(f'    → {name}: iniciada')
+                        running[pool.submit(task.func, *task.args)] = name
+                        progressed = True
+
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    self._release(self.tasks[name])
+                    exc = future.exception()
+                    if exc is None:
+                        status[name] = DONE
+                        self.on_event(f'    → {name}: concluída')
+                    else:
+                        status[name] = FAILED
+                        errors[name] = exc
+                        self.on_event(f'    → {name}: FALHOU ({exc})')
+
+        for name in waiting:
+            status[name] = SKIPPED
+        return status, errors
@@ -0,0 +1,194 @@
+"""
+Instrumentação das etapas do pipeline (tempo de parede, CPU e pico de RSS).
+
+Cada etapa roda dentro de um span (Tracer.span) e cada subprocesso é executado
+por Tracer.run, que espera o filho com os.wait4 para obter o uso de recursos dele.
+O span soma ao próprio tempo de CPU (da thread) o de todos os subprocessos que
+rodaram dentro dele, e guarda o maior pico de RSS entre eles. Funciona com várias
+threads (modos --jobs e --dag): cada thread tem a sua pilha de spans.
+
+write() grava um JSON no formato do Chrome trace (abrir em chrome://tracing ou
+https://ui.perfetto.dev) e summary() monta uma tabela por etapa e por tag.
+"""
+import functools
+import inspect
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# linhas nas listas de (tag, etapa) e de tags mais demoradas do resumo
+TOP_ROWS = 10
+
+
+def _maxrss_mb(rusage):
+    # Linux informa KB; macOS, bytes
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class _Span:
+    def __init__(self, name, tag, args):
+        self.name = name
+        self.tag = tag
+        self.args = args
+        self.child_cpu = 0.0
+        self.max_rss_mb = 0.0
+
+
+class Tracer:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tids = {}
+        self._t0 = time.perf_counter()
+
+    def _now_us(self):
+        return (time.perf_counter() - self._t0) * 1e6
+
+    def _tid(self):
+        ident = threading.get_ident()
+        with self._lock:
+            return self._tids.setdefault(ident, len(self._tids))
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _emit(self, name, cat, start_us, end_us, args):
+        event = {
+            'name': name, 'cat': cat, 'ph': 'X', 'ts': round(start_us), 'dur': round(end_us - start_us),
+            'pid': os.getpid(), 'tid': self._tid(), 'args': args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, tag=None, **args):
+        """
+        Mede uma etapa (ex.: span('build', tag)). Spans podem ser aninhados; o
+        uso dos subprocessos conta para todos os spans abertos na thread.
+        """
+        span = _Span(name, tag, args)
+        stack = self._stack()
+        stack.append(span)
+        start = self._now_us()
+        cpu0 = time.thread_time()
+        status = 'ok'
+        try:
+            yield span
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            stack.pop()
+            cpu = time.thread_time() - cpu0 + span.child_cpu
+            self._emit(name, 'stage', start, self._now_us(), {
+                'tag': tag, 'status': status, 'cpu_s': round(cpu, 3),
+                'max_rss_mb': round(span.max_rss_mb, 1), **span.args,
+            })
+
+    def traced(self, name):
+        """
+        Decorador: executa a função dentro de span(name, tag), com a tag tirada
+        do argumento "tag" da função, se ela tiver um.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                tag = signature.bind_partial(*args, **kwargs).arguments.get('tag')
+                with self.span(name, tag):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def run(self, cmd, cwd=None, stdout=None, stderr=None):
+        """
+        Equivalente a subprocess.run(cmd, check=True), medindo CPU e pico de RSS do filho.
+        """
+        start = self._now_us()
+        proc = subprocess.Popen(cmd, cwd=cwd, stdout=stdout, stderr=stderr)
+        try:
+            _, status, rusage = os.wait4(proc.pid, 0)
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        cpu = rusage.ru_utime + rusage.ru_stime
+        rss = _maxrss_mb(rusage)
+        for span in self._stack():
+            span.child_cpu += cpu
+            span.max_rss_mb = max(span.max_rss_mb, rss)
+        stack = self._stack()
+        self._emit(os.path.basename(str(cmd[0])), 'subprocess', start, self._now_us(), {
+            'tag': stack[-1].tag if stack else None, 'cmd': ' '.join(map(str, cmd)),
+            'returncode': proc.returncode, 'cpu_s': round(cpu, 3), 'max_rss_mb': round(rss, 1),
+        })
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+        return proc
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e['ts'])
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        os.replace(tmp, path)
+
+    def summary(self):
+        """
+        Tabela com tempo de parede, CPU e pico de RSS por etapa, seguida das
+        (tag, etapa) e das tags mais demoradas. Considera só spans de etapa.
+        """
+        with self._lock:
+            stages = [e for e in self.events if e['cat'] == 'stage']
+        if not stages:
+            return 'Nenhuma etapa instrumentada.'
+
+        by_stage = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+        by_tag_stage = defaultdict(lambda: [0.0, 0.0, 0.0])
+        for e in stages:
+            wall = e['dur'] / 1e6
+            row = by_stage[e['name']]
+            row[0] += 1
+            row[1] += wall
+            row[2] += e['args']['cpu_s']
+            row[3] = max(row[3], e['args']['max_rss_mb'])
+            if e['args'].get('tag'):
+                cell = by_tag_stage[(e['args']['tag'], e['name'])]
+                cell[0] += wall
+                cell[1] += e['args']['cpu_s']
+                cell[2] = max(cell[2], e['args']['max_rss_mb'])
+
+        lines = [f'{"etapa":<22}{"execuções":>10}{"parede (s)":>12}{"CPU (s)":>10}{"RSS máx (MB)":>14}']
+        lines.append('-' * len(lines[0]))
+        for name, (count, wall, cpu, rss) in sorted(by_stage.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f'{name:<22}{count:>10}{wall:>12.1f}{cpu:>10.1f}{rss:>14.0f}')
+
+        if by_tag_stage:
+            by_tag = defaultdict(lambda: [0.0, 0.0, 0.0])
+            for (tag, _), (wall, cpu, rss) in by_tag_stage.items():
+                total = by_tag[tag]
+                total[0] += wall
+                total[1] += cpu
+                total[2] = max(total[2], rss)
+
+            lines.append('')
+            lines.append(f'{"tag":<16}{"etapa":<22}{"parede (s)":>12}{"CPU (s)":>10}{"RSS máx (MB)":>14}')
+            lines.append('-' * 74)
+            top = sorted(by_tag_stage.items(), key=lambda kv: -kv[1][0])[:TOP_ROWS]
+            top += [((tag, '(total da tag)'), row)
+                    for tag, row in sorted(by_tag.items(), key=lambda kv: -kv[1][0])[:TOP_ROWS]]
+            for (tag, name), (wall, cpu, rss) in top:
+                lines.append(f'{tag:<16}{name:<22}{wall:>12.1f}{cpu:>10.1f}{rss:>14.0f}')
+        return '\n'.join(lines)
@@ -0,0 +1,123 @@
+import os
+
+import main
+from artifact_cache import ArtifactCache, tool_fingerprint
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_restore_writes_to_the_requested_paths(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    xml = str(tmp_path / 'spotbugs' / 'spotbugs_1.2.xml')
+    ck = str(tmp_path / 'ck' / 'v1.2')
+    write(xml, '<BugCollection/>')
+    write(os.path.join(ck, 'class.csv'), 'class,loc\nA,1\n')
+    key = ArtifactCache.key('stage', commit='abc')
+    cache.store(key, [xml, ck])
+
+    other_xml = str(tmp_path / 'spotbugs' / 'spotbugs_1.2-rc1.xml')
+    other_ck = str(tmp_path / 'ck' / 'v1.2-rc1')
+    assert cache.restore(key, [other_xml, other_ck])
+    assert read(other_xml) == '<BugCollection/>'
+    assert read(os.path.join(other_ck, 'class.csv')) == 'class,loc\nA,1\n'
+
+
+def test_restore_replaces_existing_outputs(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    src = str(tmp_path / 'a' / 'out')
+    write(os.path.join(src, 'x.csv'), 'new')
+    key = ArtifactCache.key('ck', commit='abc')
+    cache.store(key, [src])
+
+    dest = str(tmp_path / 'b' / 'out')
+    write(os.path.join(dest, 'stale.csv'), 'old')
+    assert cache.restore(key, [dest])
+    assert os.listdir(dest) == ['x.csv']
+
+
+def test_restore_misses(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    src = str(tmp_path / 'out.txt')
+    write(src, 'x')
+    key = ArtifactCache.key('stage', commit='abc')
+    assert not cache.restore(key, [src])
+
+    cache.store(key, [src])
+    # número de saídas diferente do guardado
+    assert not cache.restore(key, [src, src + '.2'])
+
+
+def test_old_format_entry_is_a_miss_and_gets_replaced(tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    key = ArtifactCache.key('stage', commit='abc')
+    entry = os.path.join(cache.root, key[:2], key)
+    write(os.path.join(entry, 'meta.json'), '{"outputs": ["elsewhere.txt"]}')
+    write(os.path.join(entry, '0'), 'old')
+    assert not cache.has(key)
+
+    src = str(tmp_path / 'out.txt')
+    write(src, 'new')
+    cache.store(key, [src])
+    dest = str(tmp_path / 'restored.txt')
+    assert cache.restore(key, [dest])
+    assert read(dest) == 'new'
+
+
+def test_tags_on_the_same_commit_each_get_their_outputs(repo_with_shared_commit):
+    cache = ArtifactCache(main.CACHE_DIR)
+    write(main.spotbugs_output_path('v1.2'), '<BugCollection/>')
+    write(os.path.join(main.ck_output_dir('v1.2'), 'ck_metrics.csvclass.csv'), 'class\nA\n')
+    main.store_stage(cache, 'spotbugs', 'v1.2', None)
+    main.store_stage(cache, 'ck', 'v1.2', None)
+
+    assert main.pending_stages('v1.2-rc1', None, ['spotbugs', 'ck'], cache) == []
+    assert read(main.spotbugs_output_path('v1.2-rc1')) == '<BugCollection/>'
+    assert os.path.exists(os.path.join(main.ck_output_dir('v1.2-rc1'), 'ck_metrics.csvclass.csv'))
+
+
+def test_changing_the_analyzed_target_misses_the_cache(repo_with_shared_commit, monkeypatch):
+    cache = ArtifactCache(main.CACHE_DIR)
+    write(main.spotbugs_output_path('v1.2'), '<BugCollection/>')
+    write(os.path.join(main.ck_output_dir('v1.2'), 'ck_metrics.csvclass.csv'), 'class\nA\n')
+    main.store_stage(cache, 'spotbugs', 'v1.2', None)
+    main.store_stage(cache, 'ck', 'v1.2', None)
+    assert main.pending_stages('v1.2', None, ['spotbugs', 'ck'], cache) == []
+
+    target, source_dir = main.SPOTBUGS_TARGET, main.CK_SOURCE_DIR
+    monkeypatch.setattr(main, 'SPOTBUGS_TARGET', os.path.join('core', 'build', 'libs', 'core.jar'))
+    monkeypatch.setattr(main, 'CK_SOURCE_DIR', os.path.join('core', 'src', 'main', 'java'))
+    assert main.pending_stages('v1.2', None, ['spotbugs', 'ck'], cache) == ['spotbugs', 'ck']
+
+    monkeypatch.setattr(main, 'SPOTBUGS_TARGET', target)
+    monkeypatch.setattr(main, 'CK_SOURCE_DIR', source_dir)
+    monkeypatch.setattr(main, 'BUILD_CMD', ['mvn', 'package', '-DskipTests'])
+    assert main.pending_stages('v1.2', None, ['spotbugs', 'ck'], cache) == ['spotbugs']
+
+
+def test_warm_jvm_keys_spotbugs_by_the_jar_that_runs(repo_with_shared_commit, monkeypatch):
+    jar = os.path.join('tools', 'spotbugs.jar')
+    write(jar, 'spotbugs 4.8.5')
+    monkeypatch.setattr(main, 'SPOTBUGS_JAR', jar)
+    monkeypatch.setattr(main, 'WARM_JVM', object())
+    key = main.stage_cache_entry('spotbugs', 'v1.2', None)[0]
+
+    # nova execução com o jar atualizado
+    write(jar, 'spotbugs 4.8.6')
+    tool_fingerprint.cache_clear()
+    assert main.stage_cache_entry('spotbugs', 'v1.2', None)[0] != key
+
+    # sem --warm-jvm o jar não entra na chave
+    monkeypatch.setattr(main, 'WARM_JVM', None)
+    key = main.stage_cache_entry('spotbugs', 'v1.2', None)[0]
+    write(jar, 'spotbugs 4.8.7')
+    tool_fingerprint.cache_clear()
+    assert main.stage_cache_entry('spotbugs', 'v1.2', None)[0] == key
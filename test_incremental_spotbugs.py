@@ -0,0 +1,137 @@
+import os
+import subprocess
+import xml.etree.ElementTree as ET
+
+import main
+from artifact_cache import ArtifactCache
+from incremental_spotbugs import changed_classes, dependent_classes, has_source_root, merge_reports
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+PREVIOUS = """<?xml version="1.0" encoding="UTF-8"?>
+<BugCollection version="4.8.6">
+  <Project projectName="p"/>
+  <BugInstance type="A1" priority="1" category="STYLE"><Class classname="org.x.A"/></BugInstance>
+  <BugInstance type="B2" priority="2" category="STYLE"><Class classname="org.y.B"/></BugInstance>
+  <FindBugsSummary total_bugs="2" priority_1="1" priority_2="1">
+    <PackageStats package="org.x" total_bugs="1" priority_1="1">
+      <ClassStats class="org.x.A" bugs="1" priority_1="1"/>
+    </PackageStats>
+    <PackageStats package="org.y" total_bugs="1" priority_2="1">
+      <ClassStats class="org.y.B" bugs="1" priority_2="1"/>
+    </PackageStats>
+  </FindBugsSummary>
+</BugCollection>
+"""
+
+# A foi reanalisada e não tem mais bugs; o resumo parcial ainda cita a prioridade 1
+PARTIAL = """<?xml version="1.0" encoding="UTF-8"?>
+<BugCollection version="4.8.6">
+  <Project projectName="p"/>
+  <FindBugsSummary total_bugs="0" priority_1="1">
+    <PackageStats package="org.x" total_bugs="1" priority_1="1">
+      <ClassStats class="org.x.A" bugs="1" priority_1="1"/>
+    </PackageStats>
+    <PackageStats package="org.y" total_bugs="1" priority_2="1">
+      <ClassStats class="org.y.B" bugs="1" priority_2="1"/>
+    </PackageStats>
+  </FindBugsSummary>
+</BugCollection>
+"""
+
+
+def test_merge_clears_priorities_that_dropped_to_zero(tmp_path):
+    prev = str(tmp_path / 'prev.xml')
+    partial = str(tmp_path / 'partial.xml')
+    out = str(tmp_path / 'out.xml')
+    write(prev, PREVIOUS)
+    write(partial, PARTIAL)
+
+    assert merge_reports(partial, prev, out, {'org.x.A'}) == 1
+    summary = ET.parse(out).getroot().find('FindBugsSummary')
+    assert summary.get('total_bugs') == '1'
+    assert summary.get('priority_1') is None
+    assert summary.get('priority_2') == '1'
+    packages = {p.get('package'): p for p in summary.iter('PackageStats')}
+    assert packages['org.x'].get('total_bugs') == '0'
+    assert packages['org.x'].get('priority_1') is None
+    assert packages['org.x'].find('ClassStats').get('bugs') == '0'
+    assert packages['org.y'].get('priority_2') == '1'
+
+
+def test_spotbugs_cache_key_follows_the_path_that_ran(repo_with_shared_commit, monkeypatch):
+    cache = ArtifactCache(main.CACHE_DIR)
+    monkeypatch.setattr(main, 'SPOTBUGS_INCREMENTAL', True)
+    write(main.spotbugs_output_path('v1.2'), '<BugCollection/>')
+
+    # XML completo guardado com --spotbugs-incremental ativo (sem XML anterior)
+    main.store_stage(cache, 'spotbugs', 'v1.2', 'v1.2-rc1', 'full')
+    full_key = main.stage_cache_entry('spotbugs', 'v1.2', 'v1.2-rc1')[0]
+    incremental_key = main.stage_cache_entry('spotbugs', 'v1.2', 'v1.2-rc1', 'incremental')[0]
+    assert cache.has(full_key) and not cache.has(incremental_key)
+
+    # serve tanto com o modo incremental quanto sem ele
+    os.remove(main.spotbugs_output_path('v1.2'))
+    assert main.pending_stages('v1.2', 'v1.2-rc1', ['spotbugs'], cache) == []
+    monkeypatch.setattr(main, 'SPOTBUGS_INCREMENTAL', False)
+    assert main.pending_stages('v1.2', 'v1.2-rc1', ['spotbugs'], cache) == []
+    assert read(main.spotbugs_output_path('v1.2')) == '<BugCollection/>'
+
+
+def test_incremental_result_is_not_used_without_incremental_mode(repo_with_shared_commit, monkeypatch):
+    cache = ArtifactCache(main.CACHE_DIR)
+    monkeypatch.setattr(main, 'SPOTBUGS_INCREMENTAL', True)
+    write(main.spotbugs_output_path('v1.2'), '<BugCollection/>')
+    main.store_stage(cache, 'spotbugs', 'v1.2', 'v1.2-rc1', 'incremental')
+    assert main.pending_stages('v1.2', 'v1.2-rc1', ['spotbugs'], cache) == []
+
+    monkeypatch.setattr(main, 'SPOTBUGS_INCREMENTAL', False)
+    assert main.pending_stages('v1.2', 'v1.2-rc1', ['spotbugs'], cache) == ['spotbugs']
+
+
+def test_source_root_outside_the_default_layout(tmp_path, monkeypatch):
+    repo = tmp_path / 'repo'
+    git = ['git', '-c', 'user.name=t', '-c', 'user.email=t@t', '-C', str(repo)]
+    subprocess.run(['git', 'init', '-q', str(repo)], check=True)
+    source = repo / 'core' / 'src' / 'main' / 'java' / 'org' / 'x'
+    write(str(source / 'A.java'), 'class A {}\n')
+    write(str(source / 'B.java'), 'class B { A a; }\n')
+    subprocess.run(git + ['add', '-A'], check=True)
+    subprocess.run(git + ['commit', '-q', '-m', '1'], check=True)
+    subprocess.run(git + ['tag', 'v1'], check=True)
+    write(str(source / 'A.java'), 'class A { int x; }\n')
+    subprocess.run(git + ['commit', '-q', '-am', '2'], check=True)
+    subprocess.run(git + ['tag', 'v2'], check=True)
+
+    root = 'core/src/main/java/'
+    assert not has_source_root(str(repo), 'v2')
+    assert changed_classes(str(repo), 'v1', 'v2') == (set(), set())
+    assert has_source_root(str(repo), 'v2', root)
+    assert changed_classes(str(repo), 'v1', 'v2', root) == ({'org.x.A'}, set())
+    assert dependent_classes(str(repo), 'v2', {'org.x.A'}, root) == {'org.x.A', 'org.x.B'}
+
+    # com a raiz padrão o modo incremental não copia o XML anterior: roda o SpotBugs completo
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, 'LOCAL_REPO_PATH', str(repo))
+    monkeypatch.setattr(main, 'SPOTBUGS_INCREMENTAL', True)
+    write(main.spotbugs_output_path('v1'), PREVIOUS)
+    runs = []
+
+    def fake_spotbugs(tool, jar, args, cmd, log=None):
+        runs.append(args)
+        xml = next(a for a in args if a.startswith('-xml=')).split('=', 1)[1]
+        write(xml, '<BugCollection/>')
+
+    monkeypatch.setattr(main, 'run_java_tool', fake_spotbugs)
+    assert main.run_spotbugs('v2', str(repo), prev_tag='v1') == 'full'
+    assert '-onlyAnalyze' not in runs[0]
@@ -0,0 +1,95 @@
+import pytest
+
+import job_queue
+from job_queue import DONE, FAILED, PENDING, RUNNING, JobQueue
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_queue.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return JobQueue(str(tmp_path / 'queue.db'), lease_seconds=60, max_attempts=2)
+
+
+def test_jobs_are_claimed_once_in_order(queue):
+    assert queue.enqueue([('tag:v1', {'tag': 'v1'}), ('tag:v2', {'tag': 'v2'})]) == 2
+    assert queue.enqueue([('tag:v1', {'tag': 'v1'})]) == 0
+
+    a = queue.claim('a')
+    b = queue.claim('b')
+    assert (a.key, a.payload, a.attempts) == ('tag:v1', {'tag': 'v1'}, 1)
+    assert b.key == 'tag:v2'
+    assert queue.claim('c') is None
+
+
+def test_expired_lease_is_claimed_by_another_worker(queue, clock):
+    queue.enqueue([('tag:v1', {})])
+    job = queue.claim('a')
+    clock.now += 61
+    again = queue.claim('b')
+    assert (again.id, again.attempts) == (job.id, 2)
+
+    # o worker antigo perdeu o job: nada do que ele fizer vale mais
+    assert not queue.heartbeat(job, 'a')
+    assert not queue.complete(job, 'a')
+    assert not queue.fail(job, 'a', 'erro')
+    assert queue.complete(again, 'b')
+    assert queue.counts() == {DONE: 1}
+
+
+def test_heartbeat_keeps_the_lease(queue, clock):
+    queue.enqueue([('tag:v1', {})])
+    job = queue.claim('a')
+    for _ in range(5):
+        clock.now += 50
+        assert queue.heartbeat(job, 'a')
+        assert queue.claim('b') is None
+    clock.now += 61
+    assert queue.claim('b').id == job.id
+
+
+def test_lease_expired_on_the_last_attempt_fails_for_good(queue, clock):
+    queue.enqueue([('tag:v1', {})])
+    queue.claim('a')
+    clock.now += 61
+    queue.claim('b')
+    clock.now += 61
+    assert queue.claim('c') is None
+    assert queue.counts() == {FAILED: 1}
+    assert queue.failures()[0][0] == 'tag:v1'
+
+
+def test_fail_retries_until_max_attempts_and_enqueue_resets(queue):
+    queue.enqueue([('tag:v1', {})])
+    job = queue.claim('a')
+    assert queue.fail(job, 'a', 'primeira')
+    assert queue.counts() == {PENDING: 1}
+    job = queue.claim('a')
+    assert queue.fail(job, 'a', 'segunda')
+    assert queue.failures() == [('tag:v1', 'segunda')]
+
+    # reenfileirar traz de volta só o que falhou de vez, com as tentativas zeradas
+    assert queue.enqueue([('tag:v1', {})]) == 1
+    job = queue.claim('a')
+    assert job.attempts == 1
+    assert queue.counts() == {RUNNING: 1}
+
+
+def test_release_does_not_count_the_attempt(queue):
+    queue.enqueue([('tag:v1', {})])
+    job = queue.claim('a')
+    assert queue.release(job, 'a')
+    assert queue.claim('b').attempts == 1
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from stage_scheduler import DONE, FAILED, SKIPPED, Scheduler, Task
+
+
+class Usage:
+    """Registra o uso simultâneo de cada recurso pelas tasks em execução."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = {}
+        self.peak = {}
+        self.log = []
+
+    def task(self, name, resources):
+        def run():
+            with self.lock:
+                self.log.append(('start', name))
+                for res, amount in resources.items():
+                    self.current[res] = self.current.get(res, 0) + amount
+                    self.peak[res] = max(self.peak.get(res, 0), self.current[res])
+            time.sleep(0.02)
+            with self.lock:
+                self.log.append(('end', name))
+                for res, amount in resources.items():
+                    self.current[res] -= amount
+        return Task(name, run, resources=resources)
+
+
+def scheduler(workers, limits=None):
+    return Scheduler(workers, limits, on_event=lambda msg: None)
+
+
+def test_resource_limits_are_never_exceeded():
+    usage = Usage()
+    s = scheduler(8, {'jvm': 2, 'heap_mb': 3000})
+    for i in range(6):
+        s.add(usage.task(f'ck{i}', {'jvm': 1, 'heap_mb': 1000}))
+    for i in range(4):
+        s.add(usage.task(f'spotbugs{i}', {'jvm': 1, 'heap_mb': 2000}))
+    for i in range(4):
+        s.add(usage.task(f'py{i}', {}))
+
+    status, errors = s.run()
+    assert errors == {} and set(status.values()) == {DONE}
+    assert usage.peak['jvm'] == 2
+    assert usage.peak['heap_mb'] <= 3000
+
+
+def test_workers_limit_concurrency():
+    usage = Usage()
+    s = scheduler(3)
+    for i in range(9):
+        s.add(usage.task(f't{i}', {'slot': 1}))
+    s.run()
+    assert usage.peak['slot'] == 3
+
+
+def test_task_larger_than_the_limit_runs_alone():
+    usage = Usage()
+    s = scheduler(4, {'heap_mb': 4096})
+    s.add(usage.task('big', {'heap_mb': 8192}))
+    for i in range(3):
+        s.add(usage.task(f'small{i}', {'heap_mb': 1024}))
+
+    status, _ = s.run()
+    assert status['big'] == DONE
+    start, end = usage.log.index(('start', 'big')), usage.log.index(('end', 'big'))
+    assert end == start + 1
+
+
+def test_dependencies_order_and_failure_propagation():
+    order = []
+
+    def step(name, fail=False):
+        def run():
+            order.append(name)
+            if fail:
+                raise RuntimeError(name)
+        return run
+
+    s = scheduler(4)
+    s.add(Task('checkout', step('checkout'), outputs=['src']))
+    s.add(Task('ck', step('ck'), inputs=['src'], outputs=['ck.csv']))
+    s.add(Task('spotbugs', step('spotbugs', fail=True), inputs=['src'], outputs=['sb.xml']))
+    s.add(Task('normalize', step('normalize'), inputs=['ck.csv', 'sb.xml']))
+    s.add(Task('cleanup', step('cleanup'), after=['ck', 'spotbugs'], always=True))
+
+    status, errors = s.run()
+    assert status == {'checkout': DONE, 'ck': DONE, 'spotbugs': FAILED, 'normalize': SKIPPED, 'cleanup': DONE}
+    assert list(errors) == ['spotbugs']
+    assert order[0] == 'checkout' and order[-1] == 'cleanup'
+    assert 'normalize' not in order
+
+
+def test_cycles_and_duplicate_outputs_are_rejected():
+    s = scheduler(1)
+    s.add(Task('a', print, inputs=['b.out'], outputs=['a.out']))
+    s.add(Task('b', print, inputs=['a.out'], outputs=['b.out']))
+    with pytest.raises(ValueError, match='Ciclo'):
+        s.run()
+
+    s = scheduler(1)
+    s.add(Task('a', print, outputs=['x']))
+    s.add(Task('b', print, outputs=['x']))
+    with pytest.raises(ValueError):
+        s.dependencies()
@@ -0,0 +1,46 @@
+import os
+import subprocess
+from collections import namedtuple
+
+import pytest
+
+import main
+from artifact_cache import ArtifactCache
+from stage_scheduler import Scheduler
+
+Tag = namedtuple('Tag', ['name'])
+
+
+def names(tags):
+    return [t.name for t in tags]
+
+
+def test_filter_tags_by_version_range():
+    tags = [Tag(n) for n in ['v5.2', 'v5.3', '6.0-rc1', 'v6.0', 'nightly', '6.7.2', '6.8']]
+    selected = main.filter_tags(tags, min_version='5.3', max_version='6.7.2')
+    assert names(selected) == ['v5.3', '6.0-rc1', 'v6.0', '6.7.2']
+    selected = main.filter_tags(tags, min_version='5.3', max_version='6.7.2', skip_prereleases=True)
+    assert names(selected) == ['v5.3', 'v6.0', '6.7.2']
+
+
+def test_version_arguments_are_validated():
+    args = main.parse_args(['--min-version', 'v5.3', '--max-version', '6.7.2'])
+    assert (args.min_version, args.max_version) == ('v5.3', '6.7.2')
+    for bad in (['--min-version', 'foo'], ['--max-version', '']):
+        with pytest.raises(SystemExit):
+            main.parse_args(bad)
+
+
+def test_tags_without_v_prefix_get_their_own_outputs(repo_with_shared_commit):
+    for tag in ('1.2.3', '2.2.3'):
+        subprocess.run(['git', 'tag', tag], cwd=main.LOCAL_REPO_PATH, check=True)
+    assert main.spotbugs_output_path('1.2.3') != main.spotbugs_output_path('2.2.3')
+    assert main.spotbugs_output_path('v5.3') == main.spotbugs_output_path('5.3')
+
+    scheduler = Scheduler(on_event=lambda msg: None)
+    main.build_dag(['1.2.3', '2.2.3'], ['spotbugs', 'refactoringminer'],
+                   ArtifactCache(main.CACHE_DIR), scheduler, post_process=True)
+    task = scheduler.tasks['normalize_outputs-2.2.3']
+    assert task.args[-1] == ['--version', '2.2.3']
+    assert task.inputs == [os.path.normpath(main.spotbugs_output_path('2.2.3')),
+                           os.path.normpath(main.refactoring_output_path('1.2.3', '2.2.3'))]